@@ -1,4 +1,4 @@
 """API v1 endpoints."""
-from app.api.v1.endpoints import health, chat, export
+from app.api.v1.endpoints import health, chat, chat_ws, export, imports, metrics, profiles, search, usage
 
-__all__ = ["health", "chat", "export"]
+__all__ = ["health", "chat", "chat_ws", "export", "imports", "metrics", "profiles", "search", "usage"]
@@ -1,7 +1,8 @@
 """Chat and conversation endpoints."""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
 
 from app.schemas.message import (
     MessageRequest,
@@ -9,13 +10,20 @@ from app.schemas.message import (
     ConversationCreate,
     ConversationResponse
 )
-from app.services import LangChainService, DrawIOGenerator, DesignService
-from app.models.base import get_db
+from app.services.admission import AdmissionRejectedError, get_admission_controller
+from app.services.cancellation import GenerationCancelledError, get_cancellation_registry
+from app.services.chat_pipeline import ChatPipeline, ConversationNotFoundError
+from app.services.usage_ledger import TokenBudgetExceededError
+from app.utils.deadline import DeadlineExceededError, request_deadline
+from app.models.base import get_db, get_read_db, read_or_primary
 from app.models.conversation import Conversation
-from app.models.message import Message
+from app.utils.field_selection import FIELDS_DESCRIPTION, sparse_response
 
 router = APIRouter()
 
+# Status returned for cancelled generations (nginx's "client closed request")
+STATUS_CLIENT_CLOSED_REQUEST = 499
+
 
 @router.post("/conversation", response_model=ConversationResponse)
 async def create_conversation(
@@ -51,36 +59,40 @@ async def create_conversation(
 @router.get("/conversation/{conversation_id}", response_model=ConversationResponse)
 async def get_conversation(
     conversation_id: int,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get conversation details by ID.
 
     Args:
         conversation_id: Conversation ID
-        db: Database session
+        fields: Optional comma-separated fields to return
+        db: Read-only database session
 
     Returns:
         Conversation data
     """
-    conversation = db.query(Conversation).filter(
+    conversation = read_or_primary(db, lambda session: session.query(Conversation).filter(
         Conversation.id == conversation_id
-    ).first()
+    ).first())
 
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
-    return ConversationResponse(
+    return sparse_response(ConversationResponse(
         id=conversation.id,
         title=conversation.title,
         created_at=conversation.created_at,
         status=conversation.status
-    )
+    ), fields)
 
 
 @router.post("/message", response_model=MessageResponse)
 async def send_message(
     request: MessageRequest,
+    http_request: Request,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db)
 ):
     """
@@ -88,129 +100,101 @@ async def send_message(
 
     This endpoint:
     1. Saves user message
-    2. Generates business process flow diagram via LLM
-    3. Saves all generated content
-    4. Returns AI response with diagram
+    2. Generates the business process flow, plus the UI flow and
+       prototype listed in `diagram_types`, concurrently via LLM
+    3. Saves all generated content in one transaction
+    4. Returns AI response with the diagrams
+
+    A UI flow or prototype that fails is returned as
+    `generated_content.<type>.error`; the business flow is still saved.
+
+    Requests pass through admission control first; when the server or the
+    conversation is saturated a 429/503 with `Retry-After` is returned
+    immediately. A conversation or user whose token budget is used up
+    gets a 429 without an LLM call.
+
+    The request runs under a deadline (`deadline_seconds`, by default
+    REQUEST_DEADLINE_SECONDS) shared by the queue wait, the LLM call and
+    the database. When it runs out during generation, a best-effort flow
+    is returned with `generated_content.business_flow.degraded` set; a 504
+    is returned only when there is nothing to fall back on.
+
+    If the client disconnects, or cancels through
+    `POST /message/{client_request_id}/cancel`, the LLM request is aborted,
+    the remaining stages are skipped and a 499 is returned.
+
+    Pass `fields` (e.g. `message_id,generated_content.business_flow.diagram_id`)
+    to skip serialising the diagram XML and raw LLM text.
 
     Args:
         request: Message request with conversation ID
+        http_request: Raw request, watched for client disconnects
+        fields: Optional comma-separated fields to return
         db: Database session
 
     Returns:
         AI response with generated business flow diagram
     """
-    # Initialize services
-    langchain_service = LangChainService()
-    drawio_generator = DrawIOGenerator()
-    design_service = DesignService(db)
-
-    # Get or create conversation
-    if request.conversation_id:
-        conversation = db.query(Conversation).filter(
-            Conversation.id == request.conversation_id
-        ).first()
-        if not conversation:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-    else:
-        conversation = Conversation(
-            title=request.message[:50] + "..." if len(request.message) > 50 else request.message,
-            status="active"
-        )
-        db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-
-    # Save user message
-    user_message = Message(
-        conversation_id=conversation.id,
-        role="user",
-        content=request.message
-    )
-    db.add(user_message)
-    db.commit()
-
+    pipeline = ChatPipeline(db)
     try:
-        # Get conversation history
-        history: List[Message] = db.query(Message).filter(
-            Message.conversation_id == conversation.id
-        ).order_by(Message.created_at).all()
-
-        history_list = [
-            {"role": msg.role, "content": msg.content}
-            for msg in history
-        ]
-
-        # Generate business flow
-        business_flow_data = await langchain_service.generate_business_flow(
-            request.message,
-            history_list
+        response = await get_cancellation_registry().run(
+            _admit_and_process(pipeline, request),
+            request_id=request.client_request_id,
+            is_disconnected=http_request.is_disconnected,
+            stage=lambda: pipeline.stage
         )
-        business_flow_xml = drawio_generator.generate_business_flow_diagram(
-            business_flow_data["business_flow"]
+    except AdmissionRejectedError as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
         )
+    except GenerationCancelledError as e:
+        raise HTTPException(status_code=STATUS_CLIENT_CLOSED_REQUEST, detail=e.detail)
+    return sparse_response(response, fields)
 
-        # Save design
-        from app.models.design import Design
-        design = Design(
-            conversation_id=conversation.id,
-            name=f"Business Flow for conversation {conversation.id}",
-            description=request.message
-        )
-        db.add(design)
-        db.commit()
-        db.refresh(design)
-
-        # Save diagram
-        from app.models.diagram import Diagram
-        business_diagram = Diagram(
-            design_id=design.id,
-            diagram_type="business_flow",
-            title="Business Process Flow",
-            drawio_xml=business_flow_xml,
-            flow_data=business_flow_data["business_flow"]
-        )
-        db.add(business_diagram)
-        db.commit()
 
-        # Generate assistant response
-        business_processes_count = len(
-            business_flow_data["business_flow"].get("processes", [])
-        )
-        decisions_count = len(
-            business_flow_data["business_flow"].get("decisions", [])
-        )
+@router.post("/message/{client_request_id}/cancel")
+async def cancel_message(client_request_id: str):
+    """
+    Cancel a message request that is still being processed.
 
-        assistant_message = f"""Based on your requirements, I've generated a **Business Process Flow** diagram with:
+    Args:
+        client_request_id: `client_request_id` sent with the message
 
-- **{business_processes_count}** process steps
-- **{decisions_count}** decision points
+    Returns:
+        Dictionary with the request ID and `cancelled: true`
 
-The diagram shows the complete flow of your business process, including all actors, processes, and decision branches.
+    Raises:
+        HTTPException: 404 if no such request is running
+    """
+    if not get_cancellation_registry().cancel(client_request_id):
+        raise HTTPException(status_code=404, detail="No running request with this ID")
+    return {"client_request_id": client_request_id, "cancelled": True}
 
-You can view the diagram in the panel and export it as a .drawio file."""
 
-        # Save assistant message
-        bot_message = Message(
-            conversation_id=conversation.id,
-            role="assistant",
-            content=assistant_message
-        )
-        db.add(bot_message)
-        db.commit()
-
-        return MessageResponse(
-            message_id=bot_message.id,
-            conversation_id=conversation.id,
-            message=assistant_message,
-            generated_content={
-                "business_flow": {
-                    "diagram_id": business_diagram.id,
-                    "preview": business_flow_data["raw_response"],
-                    "xml": business_flow_xml
-                }
-            }
-        )
+async def _admit_and_process(pipeline: ChatPipeline, request: MessageRequest) -> MessageResponse:
+    """Wait for an admission slot, then run the generation pipeline, within the deadline."""
+    with request_deadline(request.deadline_seconds):
+        async with get_admission_controller().slot(request.conversation_id):
+            return await _process_message(pipeline, request)
 
+
+async def _process_message(pipeline: ChatPipeline, request: MessageRequest) -> MessageResponse:
+    """Run the generation pipeline for an admitted message request."""
+    try:
+        return await pipeline.run(
+            request.message,
+            request.conversation_id,
+            base_diagram_id=request.base_diagram_id,
+            response_mode=request.response_mode,
+            diagram_types=request.diagram_types
+        )
+    except ConversationNotFoundError:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    except TokenBudgetExceededError as e:
+        raise HTTPException(status_code=429, detail=e.detail)
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=504, detail=e.detail)
     except Exception as e:
-        db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
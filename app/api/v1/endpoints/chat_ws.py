@@ -0,0 +1,242 @@
+"""WebSocket conversation channel with server push."""
+import asyncio
+import uuid
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.config import get_settings
+from app.models.base import get_session_local
+from app.models.conversation import Conversation
+from app.schemas.message import MessageRequest
+from app.services.admission import AdmissionRejectedError, get_admission_controller
+from app.services.cancellation import GenerationCancelledError, get_cancellation_registry
+from app.services.chat_pipeline import ChatPipeline
+from app.services.usage_ledger import TokenBudgetExceededError
+from app.utils.deadline import DeadlineExceededError, request_deadline
+from app.utils.sql_monitor import track_queries
+from app.utils.tracing import get_tracer, use_span
+
+router = APIRouter()
+
+# Close code sent when the conversation does not exist
+CLOSE_NOT_FOUND = 4404
+# Close code sent when the client stops answering heartbeats
+CLOSE_HEARTBEAT_TIMEOUT = 4408
+
+
+class ConversationChannel:
+    """
+    One WebSocket connection bound to a conversation.
+
+    Client messages:
+        {"type": "message", "message": "...", "request_id": "...",
+         "base_diagram_id": 1, "response_mode": "full" | "delta",
+         "deadline_seconds": 60, "diagram_types": ["ui_flow", "prototype"]}
+        {"type": "cancel", "request_id": "..."}  (without request_id: whatever runs)
+        {"type": "ping"} / {"type": "pong"}
+
+    Server events:
+        {"type": "status", "stage": "generating" | "rendering" | "saving"}
+        {"type": "partial_flow", "flow": {...}}
+        {"type": "degraded", "source": "partial_flow" | ...} before a fallback result
+        {"type": "diagram", "diagram_type": "...", "xml": "..." | "error": "..."}
+            as each requested diagram completes, if more than one was asked for
+        {"type": "result", ...MessageResponse fields, "trace_id": "..." if traced}
+        {"type": "cancelled"}, {"type": "error", "detail": "..."}
+        {"type": "ping"} / {"type": "pong"}
+
+    Every event caused by a message carries its request_id. One generation
+    runs at a time per connection.
+    """
+
+    def __init__(self, websocket: WebSocket, conversation_id: int):
+        self.websocket = websocket
+        self.conversation_id = conversation_id
+        self.heartbeat_interval = get_settings().WS_HEARTBEAT_SECONDS
+        self.generation: Optional[asyncio.Task] = None
+        self.generation_request_id: Optional[str] = None
+        self._send_lock = asyncio.Lock()
+        self._last_seen = 0.0
+
+    async def send(self, event: Dict[str, Any]) -> None:
+        """Send an event, serialising concurrent senders."""
+        payload = orjson.dumps(event).decode("utf-8")
+        async with self._send_lock:
+            await self.websocket.send_text(payload)
+
+    async def serve(self) -> None:
+        """Receive client messages until the socket closes."""
+        loop = asyncio.get_running_loop()
+        self._last_seen = loop.time()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        try:
+            while True:
+                try:
+                    data = await self.websocket.receive_json()
+                except ValueError:
+                    self._last_seen = loop.time()
+                    await self.send({"type": "error", "detail": "Messages must be JSON"})
+                    continue
+                self._last_seen = loop.time()
+                await self._handle(data)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            heartbeat.cancel()
+            self._cancel_generation("disconnect")
+
+    def _cancel_generation(self, reason: str) -> None:
+        """Cancel the running generation, recording why."""
+        if self.generation is None or self.generation.done():
+            return
+        if not get_cancellation_registry().cancel(self.generation_request_id, reason):
+            # Not registered yet; nothing has been started that needs accounting
+            self.generation.cancel()
+
+    async def _handle(self, data: Any) -> None:
+        kind = data.get("type") if isinstance(data, dict) else None
+        if kind == "ping":
+            await self.send({"type": "pong"})
+        elif kind == "pong":
+            return
+        elif kind == "cancel":
+            request_id = data.get("request_id")
+            running = self.generation is not None and not self.generation.done()
+            if request_id is not None and (not running or str(request_id) != self.generation_request_id):
+                await self.send({"type": "error", "request_id": str(request_id),
+                                 "detail": "No generation with this request_id is running"})
+                return
+            self._cancel_generation("client")
+        elif kind == "message":
+            request_id = str(data.get("request_id") or uuid.uuid4().hex)
+            if self.generation is not None and not self.generation.done():
+                await self.send({"type": "error", "request_id": request_id,
+                                 "detail": "A message is already being processed"})
+                return
+            try:
+                request = MessageRequest(
+                    message=data.get("message", ""),
+                    conversation_id=self.conversation_id,
+                    base_diagram_id=data.get("base_diagram_id"),
+                    response_mode=data.get("response_mode", "full"),
+                    deadline_seconds=data.get("deadline_seconds"),
+                    diagram_types=data.get("diagram_types")
+                )
+            except ValidationError as e:
+                await self.send({"type": "error", "request_id": request_id,
+                                 "detail": e.errors()[0]["msg"]})
+                return
+            self.generation_request_id = request_id
+            self.generation = asyncio.create_task(self._generate(request, request_id))
+        else:
+            await self.send({"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    async def _generate(self, request: MessageRequest, request_id: str) -> None:
+        """Run the pipeline for one message, pushing events as it progresses."""
+
+        async def on_event(event: Dict[str, Any]) -> None:
+            await self.send({**event, "request_id": request_id})
+
+        # Each message is its own trace, continuing the handshake's traceparent
+        root = get_tracer().start_trace(
+            "ws.message",
+            traceparent=self.websocket.headers.get("traceparent"),
+            conversation_id=self.conversation_id,
+            request_id=request_id
+        )
+        db = get_session_local()()
+        pipeline = ChatPipeline(db, on_event=on_event)
+        try:
+            with use_span(root), self._track_queries(request_id):
+                response = await get_cancellation_registry().run(
+                    self._admit_and_run(pipeline, request),
+                    request_id=request_id,
+                    stage=lambda: pipeline.stage
+                )
+            trace = {"trace_id": root.trace_id} if root is not None else {}
+            await self.send({"type": "result", "request_id": request_id, **trace,
+                             **response.model_dump(mode="json")})
+        except (GenerationCancelledError, asyncio.CancelledError):
+            await self._send_quietly({"type": "cancelled", "request_id": request_id})
+        except AdmissionRejectedError as e:
+            await self._send_quietly({"type": "error", "request_id": request_id,
+                                      "status_code": e.status_code, "detail": e.detail,
+                                      "retry_after": e.retry_after})
+        except TokenBudgetExceededError as e:
+            await self._send_quietly({"type": "error", "request_id": request_id,
+                                      "status_code": 429, "detail": e.detail})
+        except DeadlineExceededError as e:
+            await self._send_quietly({"type": "error", "request_id": request_id,
+                                      "status_code": 504, "detail": e.detail})
+        except Exception as e:
+            await self._send_quietly({"type": "error", "request_id": request_id,
+                                      "detail": f"Error processing request: {str(e)}"})
+        finally:
+            db.close()
+
+    async def _admit_and_run(self, pipeline: ChatPipeline, request: MessageRequest):
+        """Wait for an admission slot, then run the pipeline, within the deadline."""
+        with request_deadline(request.deadline_seconds):
+            async with get_admission_controller().slot(self.conversation_id):
+                return await pipeline.run(
+                    request.message,
+                    self.conversation_id,
+                    base_diagram_id=request.base_diagram_id,
+                    response_mode=request.response_mode,
+                    diagram_types=request.diagram_types
+                )
+
+    def _track_queries(self, request_id: str):
+        """Account for a message's SQL statements like an HTTP request's."""
+        if not get_settings().SQL_MONITOR_ENABLED:
+            return nullcontext()
+        return track_queries(f"WS {self.websocket.url.path} {request_id}")
+
+    async def _send_quietly(self, event: Dict[str, Any]) -> None:
+        try:
+            await self.send(event)
+        except Exception:
+            pass
+
+    async def _heartbeat(self) -> None:
+        """Ping the client periodically and close the socket if it goes silent."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if loop.time() - self._last_seen > 3 * self.heartbeat_interval:
+                await self.websocket.close(code=CLOSE_HEARTBEAT_TIMEOUT)
+                return
+            await self._send_quietly({"type": "ping"})
+
+
+@router.websocket("/ws/{conversation_id}")
+async def conversation_socket(websocket: WebSocket, conversation_id: int):
+    """
+    WebSocket channel for a conversation.
+
+    Accepts chat messages and pushes status events, partial flows while
+    the LLM streams, and the final diagram. See ConversationChannel for the
+    message protocol.
+
+    Args:
+        websocket: WebSocket connection
+        conversation_id: Conversation ID
+    """
+    db = get_session_local()()
+    try:
+        exists = db.query(Conversation.id).filter(
+            Conversation.id == conversation_id
+        ).first()
+    finally:
+        db.close()
+
+    if not exists:
+        await websocket.close(code=CLOSE_NOT_FOUND)
+        return
+
+    await websocket.accept()
+    await ConversationChannel(websocket, conversation_id).serve()
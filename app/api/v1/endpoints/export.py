@@ -1,80 +1,193 @@
 """Export endpoints for downloading diagrams."""
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import Response
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
 
-from app.models.base import get_db
+from app.models.base import get_read_db, read_or_primary
 from app.models.diagram import Diagram
+from app.services.design_service import DesignService
+from app.services.retention_service import RetentionService
+from app.utils.drawio_pages import split_pages
+from app.utils.field_selection import FIELDS_DESCRIPTION, sparse_response
 
 router = APIRouter()
 
 
+def content_disposition(filename: str) -> str:
+    """
+    Build an attachment Content-Disposition header for any filename.
+
+    Headers are latin-1, so non-ASCII names (e.g. Chinese page titles) are
+    sent RFC 5987-encoded, with an ASCII fallback for old clients.
+    """
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "_")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _load_document(db: Session, diagram_id: int) -> Tuple[str, str]:
+    """
+    Load the title and full XML of a diagram, hot or archived.
+
+    Raises:
+        HTTPException: 404 if the diagram does not exist
+    """
+    diagram = read_or_primary(
+        db, lambda session: session.query(Diagram).filter(Diagram.id == diagram_id).first()
+    )
+    if diagram:
+        return diagram.title, diagram.drawio_xml
+
+    # Diagrams of archived conversations are read from cold storage
+    archived = RetentionService(db).load_archived_diagram(diagram_id)
+    if archived is None:
+        raise HTTPException(status_code=404, detail="Diagram not found")
+    return archived["title"], archived["drawio_xml"]
+
+
+def _drawio_response(title: str, drawio_xml: str) -> Response:
+    """Return DrawIO XML as a file download named after the title."""
+    # Create a safe filename
+    safe_title = title.replace(" ", "_").replace("/", "_")
+    filename = f"{safe_title}.drawio"
+
+    return Response(
+        content=drawio_xml,
+        media_type="application/xml",
+        headers={
+            "Content-Disposition": content_disposition(filename)
+        }
+    )
+
+
 @router.get("/drawio/{diagram_id}")
 async def export_drawio(
     diagram_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Export diagram as DrawIO XML file.
 
+    Multi-page diagrams are exported with all of their pages.
+
     Args:
         diagram_id: Diagram ID to export
-        db: Database session
+        db: Read-only database session
 
     Returns:
         DrawIO XML file as downloadable response
     """
-    diagram = db.query(Diagram).filter(Diagram.id == diagram_id).first()
+    return _drawio_response(*_load_document(db, diagram_id))
 
-    if not diagram:
-        raise HTTPException(status_code=404, detail="Diagram not found")
 
-    # Create a safe filename
-    safe_title = diagram.title.replace(" ", "_").replace("/", "_")
-    filename = f"{safe_title}.drawio"
+@router.get("/drawio/{diagram_id}/pages")
+async def list_drawio_pages(
+    diagram_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    List the pages of a diagram without loading their content.
 
-    return Response(
-        content=diagram.drawio_xml,
-        media_type="application/xml",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        }
-    )
+    Args:
+        diagram_id: Diagram ID
+        db: Read-only database session
+
+    Returns:
+        Diagram ID and pages (index, page_id, name)
+    """
+    pages = read_or_primary(db, lambda session: DesignService(session).list_pages(diagram_id) or None)
+    if not pages:
+        # Single-page and archived diagrams have no stored pages
+        _, drawio_xml = _load_document(db, diagram_id)
+        pages = [
+            {"index": index, "page_id": page["page_id"], "name": page["name"]}
+            for index, page in enumerate(split_pages(drawio_xml))
+        ]
+    return {"diagram_id": diagram_id, "pages": pages}
+
+
+@router.get("/drawio/{diagram_id}/pages/{page_index}")
+async def export_drawio_page(
+    diagram_id: int,
+    page_index: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Export one page of a diagram as a standalone DrawIO file.
+
+    The viewer loads the pages of large diagrams through this endpoint
+    one at a time, when they are opened.
+
+    Args:
+        diagram_id: Diagram ID
+        page_index: 0-based page index
+        db: Read-only database session
+
+    Returns:
+        Single-page DrawIO XML file as downloadable response
+    """
+    page = read_or_primary(db, lambda session: DesignService(session).get_page(diagram_id, page_index))
+    if page:
+        title = read_or_primary(db, lambda session: session.query(Diagram.title).filter(
+            Diagram.id == diagram_id
+        ).scalar())
+        return _drawio_response(f"{title or 'diagram'} - {page.name}", page.drawio_xml)
+
+    title, drawio_xml = _load_document(db, diagram_id)
+    pages = split_pages(drawio_xml)
+    if not 0 <= page_index < len(pages):
+        raise HTTPException(status_code=404, detail="Page not found")
+    if len(pages) == 1:
+        return _drawio_response(title, drawio_xml)
+    return _drawio_response(f"{title} - {pages[page_index]['name']}", pages[page_index]["xml"])
 
 
 @router.get("/design/{design_id}/all")
 async def export_all_design_diagrams(
     design_id: int,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db)
 ):
     """
     Export all diagrams for a design (placeholder for ZIP export).
 
     Args:
         design_id: Design ID
-        db: Database session
+        fields: Optional comma-separated fields to return (e.g. diagrams.id)
+        db: Read-only database session
 
     Returns:
         All diagrams for the design
     """
     from app.models.design import Design
 
-    design = db.query(Design).filter(Design.id == design_id).first()
+    def fetch(session: Session):
+        design = session.query(Design).filter(Design.id == design_id).first()
+        if design is None:
+            return None
+        # The listing never needs the XML or flow data, so don't load them
+        diagrams = session.query(Diagram).options(
+            load_only(Diagram.id, Diagram.title, Diagram.diagram_type)
+        ).filter(Diagram.design_id == design_id).all()
+        return {
+            "design_id": design_id,
+            "design_name": design.name,
+            "diagrams": [
+                {
+                    "id": d.id,
+                    "title": d.title,
+                    "type": d.diagram_type
+                }
+                for d in diagrams
+            ]
+        }
 
-    if not design:
+    # Design and diagrams come from the same session, so a lagging replica
+    # cannot return the design without its diagrams
+    listing = read_or_primary(db, fetch)
+    if not listing:
         raise HTTPException(status_code=404, detail="Design not found")
 
-    diagrams = db.query(Diagram).filter(Diagram.design_id == design_id).all()
-
-    return {
-        "design_id": design_id,
-        "design_name": design.name,
-        "diagrams": [
-            {
-                "id": d.id,
-                "title": d.title,
-                "type": d.diagram_type
-            }
-            for d in diagrams
-        ]
-    }
+    return sparse_response(listing, fields)
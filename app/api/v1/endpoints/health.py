@@ -1,6 +1,12 @@
 """Health check endpoint."""
+from typing import Any, Dict
+
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.config import get_settings
 from app.schemas.design import HealthResponse
+from app.services.admission import get_admission_controller
 
 router = APIRouter()
 
@@ -17,3 +23,26 @@ async def health_check() -> HealthResponse:
         status="healthy",
         version="1.0.0"
     )
+
+
+@router.get("/load")
+async def load_status() -> JSONResponse:
+    """
+    Report generation queue depth for load balancers.
+
+    Returns 503 once the wait queue passes ADMISSION_SHED_RATIO of its
+    capacity, so a load balancer can route new traffic elsewhere before
+    requests start being rejected.
+
+    Returns:
+        Active and queued request counts
+    """
+    stats: Dict[str, Any] = get_admission_controller().stats()
+    shed_at = get_settings().ADMISSION_SHED_RATIO * stats["max_queue"]
+    saturated = stats["active"] >= stats["max_concurrent"] and stats["queued"] >= shed_at
+    stats["accepting"] = not saturated
+    return JSONResponse(
+        content=stats,
+        status_code=503 if saturated else 200,
+        headers={"Retry-After": str(stats["retry_after"])} if saturated else None
+    )
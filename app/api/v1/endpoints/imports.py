@@ -0,0 +1,77 @@
+"""Import endpoints for existing .drawio files."""
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.base import get_db
+from app.services.chat_pipeline import ChatPipeline, ConversationNotFoundError
+from app.services.import_service import DrawIOImportService
+from app.utils.drawio_import import DrawIOImportError, DrawIOStreamParser, ImportLimitError
+from app.utils.metrics import metrics
+
+router = APIRouter()
+
+
+@router.post("/drawio")
+async def import_drawio(
+    request: Request,
+    filename: str = Query("diagram.drawio", max_length=255, description="Name of the uploaded file"),
+    conversation_id: Optional[int] = Query(None, description="Conversation to add the diagram to"),
+    db: Session = Depends(get_db)
+):
+    """
+    Import a .drawio file sent as the raw request body.
+
+    The body is parsed while it is received, so large multi-page files
+    with compressed pages never have to be held in memory as a whole.
+    Parsing (including inflating compressed pages) and the import itself
+    run in a worker thread, so a large file does not stall other requests.
+    Uploads above IMPORT_MAX_BYTES are rejected from their Content-Length
+    before anything is read, or as soon as the limit is crossed.
+
+    Args:
+        request: Request whose body is the .drawio XML
+        filename: Name of the uploaded file
+        conversation_id: Optional conversation; a new one is started if omitted
+        db: Database session
+
+    Returns:
+        Conversation and design IDs, per-page summaries and the first page
+        as generated_content
+    """
+    settings = get_settings()
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > settings.IMPORT_MAX_BYTES:
+        metrics.inc("drawio_import_rejected_total", reason="too_large")
+        raise HTTPException(
+            status_code=413,
+            detail=f"File is larger than {settings.IMPORT_MAX_BYTES} bytes"
+        )
+
+    conversation = None
+    if conversation_id:
+        try:
+            conversation = ChatPipeline(db).get_or_create_conversation("", conversation_id)
+        except ConversationNotFoundError:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+    parser = DrawIOStreamParser(
+        max_bytes=settings.IMPORT_MAX_BYTES,
+        max_inflated_bytes=settings.IMPORT_MAX_INFLATED_BYTES,
+        max_cells=settings.IMPORT_MAX_CELLS
+    )
+    try:
+        async for chunk in request.stream():
+            await asyncio.to_thread(parser.feed, chunk)
+        pages = await asyncio.to_thread(parser.close)
+    except ImportLimitError as e:
+        metrics.inc("drawio_import_rejected_total", reason="too_large")
+        raise HTTPException(status_code=413, detail=str(e))
+    except DrawIOImportError as e:
+        metrics.inc("drawio_import_rejected_total", reason="invalid")
+        raise HTTPException(status_code=400, detail=f"Invalid .drawio file: {e}")
+
+    return await asyncio.to_thread(DrawIOImportService(db).import_pages, pages, filename, conversation)
@@ -0,0 +1,22 @@
+"""Metrics endpoint."""
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from app.models.base import get_pool_stats
+from app.utils.metrics import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """
+    Get a snapshot of in-process metrics.
+
+    Returns:
+        Counters, gauges, latency summaries and DB pool utilisation
+    """
+    snapshot = metrics.snapshot()
+    snapshot["db_pools"] = get_pool_stats()
+    return snapshot
@@ -0,0 +1,60 @@
+"""Admin endpoints for per-request CPU profiles."""
+import hmac
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+
+from app.config import get_settings
+from app.utils.request_profiler import get_profile_store
+
+router = APIRouter()
+
+
+def require_admin_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    """
+    Check the X-Profile-Token header against PROFILING_ADMIN_TOKEN.
+
+    Raises:
+        HTTPException: 403 if no token is configured, or the token is
+            missing or wrong
+    """
+    token = get_settings().PROFILING_ADMIN_TOKEN
+    if not token:
+        raise HTTPException(status_code=403, detail="Profile access is disabled: PROFILING_ADMIN_TOKEN is not set")
+    if not hmac.compare_digest(x_profile_token or "", token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin_token)])
+async def list_profiles() -> Dict[str, Any]:
+    """
+    List stored request profiles, newest first.
+
+    Returns:
+        Profile metadata: id, method, path, status_code, duration_ms,
+        samples, trigger and trace_id
+    """
+    return {"profiles": get_profile_store().list()}
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin_token)])
+async def get_profile(profile_id: str):
+    """
+    Download a profile as folded stacks.
+
+    The file can be rendered with flamegraph.pl or opened in speedscope.
+
+    Args:
+        profile_id: Profile ID from the listing or the X-Profile-Id header
+
+    Returns:
+        Folded-stack text file
+
+    Raises:
+        HTTPException: 404 if the profile does not exist
+    """
+    path = get_profile_store().folded_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain; charset=utf-8", filename=f"{profile_id}.folded")
@@ -0,0 +1,45 @@
+"""Full-text search endpoints."""
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.models.base import get_read_db
+from app.services.search_service import SearchService
+
+router = APIRouter()
+
+
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text"),
+    type: Optional[Literal["message", "diagram"]] = Query(None, description="Restrict to one document type"),
+    conversation_id: Optional[int] = Query(None, description="Restrict to one conversation"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Search user messages and diagram node labels.
+
+    Chinese queries are matched by character bigrams, so any phrase of two
+    or more characters is found without word segmentation.
+
+    Args:
+        q: Search text
+        type: Optional document type filter
+        conversation_id: Optional conversation filter
+        page: 1-based page number
+        page_size: Results per page
+        db: Read-only database session
+
+    Returns:
+        Ranked, paginated results with snippets or matched labels
+    """
+    return SearchService(db).search(
+        q,
+        doc_type=type,
+        conversation_id=conversation_id,
+        page=page,
+        page_size=page_size
+    )
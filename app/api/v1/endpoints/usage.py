@@ -0,0 +1,107 @@
+"""LLM usage and token budget endpoints."""
+from datetime import datetime, timedelta
+from typing import Any, Dict, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.base import get_read_db
+from app.services.usage_ledger import UsageService
+
+router = APIRouter()
+
+GroupBy = Literal["conversation", "user", "model", "backend", "purpose", "status", "day"]
+
+
+def _totals(service: UsageService, budget: int, **filters: Any) -> Dict[str, Any]:
+    rows = service.summary("status", **filters)
+    total_tokens = sum(row["total_tokens"] for row in rows)
+    return {
+        "calls": sum(row["calls"] for row in rows),
+        "failed_calls": sum(row["calls"] for row in rows if row["status"] != "ok"),
+        "prompt_tokens": sum(row["prompt_tokens"] for row in rows),
+        "completion_tokens": sum(row["completion_tokens"] for row in rows),
+        "total_tokens": total_tokens,
+        "token_budget": budget or None,
+        "tokens_remaining": max(0, budget - total_tokens) if budget else None,
+    }
+
+
+@router.get("/usage")
+async def usage_summary(
+    group_by: GroupBy = Query("model", description="Aggregation key"),
+    since: Optional[datetime] = Query(None, description="Only calls at or after this UTC time"),
+    until: Optional[datetime] = Query(None, description="Only calls before this UTC time"),
+    conversation_id: Optional[int] = Query(None, description="Restrict to one conversation"),
+    user_id: Optional[int] = Query(None, description="Restrict to one user"),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Aggregate recorded LLM calls.
+
+    Records are written in batches every USAGE_FLUSH_SECONDS, so the
+    latest calls may be missing for a moment.
+
+    Args:
+        group_by: Aggregation key
+        since: Optional lower time bound
+        until: Optional upper time bound
+        conversation_id: Optional conversation filter
+        user_id: Optional user filter
+        limit: Maximum groups, largest token totals first
+        db: Read-only database session
+
+    Returns:
+        Calls, failures, token totals, cache hits and latencies per group
+    """
+    groups = UsageService(db).summary(
+        group_by,
+        since=since,
+        until=until,
+        conversation_id=conversation_id,
+        user_id=user_id,
+        limit=limit
+    )
+    return {"group_by": group_by, "groups": groups}
+
+
+@router.get("/usage/conversations/{conversation_id}")
+async def conversation_usage(conversation_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get the lifetime LLM usage of a conversation against its token budget.
+
+    Args:
+        conversation_id: Conversation ID
+        db: Read-only database session
+
+    Returns:
+        Call and token totals, the budget and the tokens remaining
+    """
+    budget = get_settings().USAGE_CONVERSATION_TOKEN_BUDGET
+    return {
+        "conversation_id": conversation_id,
+        **_totals(UsageService(db), budget, conversation_id=conversation_id),
+    }
+
+
+@router.get("/usage/users/{user_id}")
+async def user_usage(user_id: int, db: Session = Depends(get_read_db)):
+    """
+    Get a user's LLM usage within the budget window against their token budget.
+
+    Args:
+        user_id: User ID
+        db: Read-only database session
+
+    Returns:
+        Call and token totals, the budget and the tokens remaining
+    """
+    settings = get_settings()
+    since = datetime.utcnow() - timedelta(hours=settings.USAGE_USER_BUDGET_WINDOW_HOURS)
+    return {
+        "user_id": user_id,
+        "window_hours": settings.USAGE_USER_BUDGET_WINDOW_HOURS,
+        **_totals(UsageService(db), settings.USAGE_USER_TOKEN_BUDGET, since=since, user_id=user_id),
+    }
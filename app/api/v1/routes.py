@@ -1,6 +1,7 @@
 """API v1 routes configuration."""
 from fastapi import APIRouter
-from app.api.v1.endpoints import health, chat, export
+from app.config import get_settings
+from app.api.v1.endpoints import health, chat, chat_ws, export, imports, metrics, profiles, search, usage
 
 api_router = APIRouter()
 
@@ -9,6 +10,23 @@ api_router.include_router(health.router, tags=["health"])
 
 # Chat endpoints
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(chat_ws.router, prefix="/chat", tags=["chat"])
 
 # Export endpoints
 api_router.include_router(export.router, prefix="/export", tags=["export"])
+
+# Import endpoints
+api_router.include_router(imports.router, prefix="/import", tags=["import"])
+
+# Search endpoints
+api_router.include_router(search.router, tags=["search"])
+
+# Usage endpoints
+api_router.include_router(usage.router, tags=["usage"])
+
+# Metrics endpoints
+api_router.include_router(metrics.router, tags=["metrics"])
+
+# Admin endpoints, only when profiling is enabled
+if get_settings().PROFILING_ENABLED:
+    api_router.include_router(profiles.router, prefix="/admin", tags=["admin"])
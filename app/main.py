@@ -1,12 +1,24 @@
 """FastAPI application entry point for Business Flow Designer."""
-from fastapi import FastAPI
+import asyncio
+import time
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import ORJSONResponse
 from pathlib import Path
 
 from app.api.v1.routes import api_router
 from app.config import get_settings
+from app.models.base import create_schema, is_sqlite
+from app.utils.static_assets import (
+    MXGRAPH_ASSET,
+    AssetManifest,
+    asset_response,
+    html_asset,
+)
+from app.utils.request_profiler import ProfilingMiddleware
+from app.utils.sql_monitor import SQLMonitorMiddleware
+from app.utils.tracing import TracingMiddleware
 
 settings = get_settings()
 
@@ -16,7 +28,8 @@ app = FastAPI(
     description="AI-powered business process flow diagram generator",
     version="2.0.0",
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -26,23 +39,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["traceparent", "X-Trace-Id", "X-Profile-Id", "Server-Timing"],
 )
 
+# Count and time SQL statements per request (no-op unless SQL_MONITOR_ENABLED)
+app.add_middleware(SQLMonitorMiddleware)
+
+# Profile selected requests (no-op unless PROFILING_ENABLED)
+app.add_middleware(ProfilingMiddleware)
+
+# Trace each request (no-op unless TRACING_ENABLED)
+app.add_middleware(TracingMiddleware)
+
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
-# Mount static files for frontend
+# Load, fingerprint and pre-compress frontend assets once at startup
 static_dir = Path(__file__).parent.parent / "frontend" / "static"
-if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+template_path = Path(__file__).parent.parent / "frontend" / "templates" / "index.html"
+asset_manifest = AssetManifest(
+    static_dir,
+    fallbacks={MXGRAPH_ASSET: settings.MXGRAPH_FALLBACK_URL}
+) if static_dir.exists() else None
+# The UI cannot render diagrams without mxGraph; refuse to serve it rather
+# than ship a page that fails in the browser
+missing_assets = asset_manifest.missing([MXGRAPH_ASSET]) if asset_manifest else []
+if asset_manifest and not missing_assets and MXGRAPH_ASSET not in asset_manifest.assets:
+    print(
+        f"Warning: {MXGRAPH_ASSET} is not vendored; the UI loads it from "
+        f"{settings.MXGRAPH_FALLBACK_URL}. Run `python main.py --vendor-assets` to serve it locally."
+    )
+if missing_assets:
+    print(
+        f"ERROR: frontend assets missing: {', '.join(missing_assets)}. "
+        "Run `python main.py --vendor-assets` or set MXGRAPH_FALLBACK_URL; "
+        "the UI is disabled until then."
+    )
+index_page = html_asset(
+    "index.html",
+    asset_manifest.rewrite_html(template_path.read_text(encoding="utf-8"))
+    if asset_manifest else template_path.read_text(encoding="utf-8")
+) if template_path.exists() else None
+
+
+@app.api_route("/static/{asset_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def static_asset(asset_path: str, request: Request):
+    """Serve a static asset; fingerprinted URLs are cached as immutable."""
+    asset, immutable = asset_manifest.lookup(asset_path) if asset_manifest else (None, False)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return asset_response(asset, request, immutable)
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint - serves the main UI."""
-    template_path = Path(__file__).parent.parent / "frontend" / "templates" / "index.html"
-    if template_path.exists():
-        return FileResponse(str(template_path))
+    if missing_assets:
+        return ORJSONResponse(status_code=503, content={
+            "detail": f"Frontend assets missing: {', '.join(missing_assets)}. "
+                      "Run `python main.py --vendor-assets` or set MXGRAPH_FALLBACK_URL."
+        })
+    if index_page is not None:
+        return asset_response(index_page, request, immutable=False)
     return {"message": "DrawIO Agent API", "docs": "/api/docs"}
 
 
@@ -60,3 +118,69 @@ async def startup_event():
     print(f"Debug mode: {settings.DEBUG}")
     print(f"OpenAI Model: {settings.OPENAI_MODEL}")
     print("API documentation available at /api/docs")
+
+    if settings.DB_CREATE_SCHEMA or is_sqlite(settings.DATABASE_URL):
+        await asyncio.to_thread(create_schema)
+
+    if settings.STARTUP_WARMUP:
+        await warm_up()
+
+    if settings.RETENTION_ENABLED:
+        asyncio.create_task(retention_loop())
+
+    if settings.USAGE_LEDGER_ENABLED:
+        from app.services.usage_ledger import get_usage_ledger
+        app.state.usage_flusher = asyncio.create_task(get_usage_ledger().run())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Write buffered usage records before the process exits."""
+    flusher = getattr(app.state, "usage_flusher", None)
+    if flusher is not None:
+        flusher.cancel()
+        try:
+            await flusher
+        except asyncio.CancelledError:
+            pass
+
+
+async def warm_up():
+    """Load the LLM stack and open LLM and database connections."""
+    started = time.perf_counter()
+
+    # Importing the service loads LangChain and the OpenAI client
+    from app.services.langchain_service import LangChainService  # noqa: F401
+    from app.services.llm_router import get_llm_router
+    from app.models.base import warm_up_pool
+
+    llm_results, db_result = await asyncio.gather(
+        get_llm_router().warm_up(timeout=settings.STARTUP_WARMUP_TIMEOUT),
+        asyncio.to_thread(warm_up_pool),
+        return_exceptions=True
+    )
+    if isinstance(db_result, Exception):
+        print(f"Database warm-up failed: {db_result}")
+        db_result = 0
+    if isinstance(llm_results, Exception):
+        print(f"LLM warm-up failed: {llm_results}")
+        llm_results = {}
+    print(
+        f"Warm-up finished in {time.perf_counter() - started:.2f}s "
+        f"(db connections: {db_result}, llm backends: {llm_results})"
+    )
+
+
+async def retention_loop():
+    """Periodically compact old conversations into cold storage."""
+    from app.services.retention_service import run_compaction
+
+    while True:
+        await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+        try:
+            stats = await asyncio.to_thread(run_compaction)
+        except Exception as e:
+            print(f"Retention compaction failed: {e}")
+            continue
+        if stats:
+            print(f"Retention compaction: {stats}")
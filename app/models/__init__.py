@@ -1,20 +1,33 @@
 """SQLAlchemy models."""
-from app.models.base import Base, get_db
+from app.models.base import Base, get_db, get_read_db
 from app.models.user import User
 from app.models.conversation import Conversation
 from app.models.message import Message
 from app.models.design import Design
-from app.models.diagram import Diagram
+from app.models.diagram import Diagram, DiagramPage
+from app.models.search import SearchDocument, SearchPosting
+from app.models.similarity import FlowSignature, FlowBucket
+from app.models.archive import ConversationArchive, ArchivedDiagram
+from app.models.usage import LLMUsage
 
 __all__ = [
     "Base",
     "get_db",
+    "get_read_db",
     "engine",  # Available via lazy import
     "User",
     "Conversation",
     "Message",
     "Design",
     "Diagram",
+    "DiagramPage",
+    "SearchDocument",
+    "SearchPosting",
+    "FlowSignature",
+    "FlowBucket",
+    "ConversationArchive",
+    "ArchivedDiagram",
+    "LLMUsage",
 ]
 
 
@@ -0,0 +1,39 @@
+"""Cold storage models for compacted conversations."""
+from sqlalchemy import Column, Integer, LargeBinary, DateTime, Index, ForeignKey
+from sqlalchemy.sql import func
+from app.models.base import Base
+
+
+class ConversationArchive(Base):
+    """Compressed messages, designs and diagrams of an archived conversation."""
+
+    __tablename__ = "conversation_archives"
+
+    conversation_id = Column(
+        Integer,
+        ForeignKey("conversations.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    payload = Column(LargeBinary(2 ** 32 - 1), nullable=False)  # zlib-compressed JSON (LONGBLOB)
+    message_count = Column(Integer, nullable=False)
+    diagram_count = Column(Integer, nullable=False)
+    raw_bytes = Column(Integer, nullable=False)
+    compressed_bytes = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, server_default=func.now())
+
+
+class ArchivedDiagram(Base):
+    """Maps diagram IDs to the archive holding them, for lookups by ID."""
+
+    __tablename__ = "archived_diagrams"
+
+    diagram_id = Column(Integer, primary_key=True, autoincrement=False)
+    conversation_id = Column(
+        Integer,
+        ForeignKey("conversation_archives.conversation_id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    __table_args__ = (
+        Index("idx_archived_diagrams_conversation", "conversation_id"),
+    )
@@ -1,8 +1,17 @@
 """Base SQLAlchemy model and database session management."""
-from sqlalchemy import create_engine
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from sqlalchemy import create_engine, event, exc, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from app.config import get_settings
+from app.utils.deadline import install_db_deadline
+from app.utils.sql_monitor import install_sql_monitor
+from app.utils.tracing import install_sql_tracing
 
 # Create base class for models
 Base = declarative_base()
@@ -10,6 +19,130 @@ Base = declarative_base()
 # Global variables for lazy initialization
 _engine = None
 _SessionLocal = None
+_read_engine = None
+_ReadSessionLocal = None
+
+T = TypeVar("T")
+
+
+def _install_idle_ping(engine, idle_seconds: float):
+    """
+    Ping pooled connections on checkout only if they sat idle for a while.
+
+    `pool_pre_ping=True` costs a round-trip on every checkout; connections
+    returned a moment ago are almost always still alive, so only those idle
+    longer than `idle_seconds` are checked.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            # Makes the pool discard this connection and retry with a new one
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+
+
+def is_sqlite(url: str) -> bool:
+    """Return True if a database URL points at SQLite."""
+    return url.startswith("sqlite")
+
+
+def _install_sqlite_pragmas(engine, settings) -> None:
+    """
+    Tune every new SQLite connection.
+
+    WAL lets readers run alongside the single writer, NORMAL sync is
+    durable across application crashes while skipping an fsync per
+    commit, and foreign keys are enforced so ON DELETE CASCADE behaves as
+    on MySQL. Writers wait up to SQLITE_BUSY_TIMEOUT_MS for the write lock
+    instead of failing.
+    """
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+            cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE_MB) * 1024 * 1024}")
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA foreign_keys=ON")
+        finally:
+            cursor.close()
+
+
+def _create_sqlite_engine(url: str):
+    """Create an engine for an embedded SQLite database."""
+    settings = get_settings()
+    database = make_url(url).database
+    in_memory = not database or database == ":memory:"
+    if not in_memory:
+        os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+    if in_memory:
+        # One shared connection keeps an in-memory database alive
+        pool_options: Dict[str, Any] = {"poolclass": StaticPool}
+    else:
+        pool_options = {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        # Store non-ASCII labels as text, like MySQL's JSON type does
+        json_serializer=lambda value: json.dumps(value, ensure_ascii=False),
+        echo=settings.DEBUG,
+        **pool_options
+    )
+    _install_sqlite_pragmas(engine, settings)
+    return engine
+
+
+def _create_engine(url: str):
+    """Create an engine with the pool settings from configuration."""
+    settings = get_settings()
+    if is_sqlite(url):
+        engine = _create_sqlite_engine(url)
+        _install_instrumentation(engine, settings)
+        return engine
+    engine = create_engine(
+        url,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_PRE_PING == "always",
+        echo=settings.DEBUG
+    )
+    if settings.DB_PRE_PING == "idle":
+        _install_idle_ping(engine, settings.DB_PRE_PING_IDLE_SECONDS)
+    _install_instrumentation(engine, settings)
+    return engine
+
+
+def _install_instrumentation(engine, settings) -> None:
+    # Listeners run in registration order and the deadline listener rewrites
+    # SELECTs with a per-call MAX_EXECUTION_TIME hint, so the monitor and
+    # tracing go first and see the statement text as the ORM emitted it
+    if settings.TRACING_ENABLED:
+        install_sql_tracing(engine)
+    if settings.SQL_MONITOR_ENABLED:
+        install_sql_monitor(engine)
+    install_db_deadline(engine)
 
 
 def _ensure_initialized():
@@ -17,16 +150,28 @@ def _ensure_initialized():
     global _engine, _SessionLocal
     if _engine is None:
         settings = get_settings()
-        _engine = create_engine(
-            settings.DATABASE_URL,
-            pool_pre_ping=True,
-            pool_recycle=3600,
-            echo=settings.DEBUG
-        )
+        _engine = _create_engine(settings.DATABASE_URL)
         _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
     return _engine, _SessionLocal
 
 
+def _ensure_read_initialized():
+    """
+    Ensure the read-only engine and session factory are initialized.
+
+    Without DATABASE_READ_URL reads share the primary engine.
+    """
+    global _read_engine, _ReadSessionLocal
+    if _read_engine is None:
+        settings = get_settings()
+        if settings.DATABASE_READ_URL:
+            _read_engine = _create_engine(settings.DATABASE_READ_URL)
+            _ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_read_engine)
+        else:
+            _read_engine, _ReadSessionLocal = _ensure_initialized()
+    return _read_engine, _ReadSessionLocal
+
+
 def get_engine():
     """Get database engine."""
     return _ensure_initialized()[0]
@@ -37,6 +182,16 @@ def get_session_local():
     return _ensure_initialized()[1]
 
 
+def get_read_engine():
+    """Get the read-only database engine."""
+    return _ensure_read_initialized()[0]
+
+
+def has_read_replica() -> bool:
+    """Return True if reads are routed to a separate engine."""
+    return get_read_engine() is not get_engine()
+
+
 def get_db() -> Session:
     """
     Dependency for getting database session.
@@ -52,6 +207,135 @@ def get_db() -> Session:
         db.close()
 
 
+def get_read_db() -> Session:
+    """
+    Dependency for getting a read-only database session.
+
+    Routed to the replica configured in DATABASE_READ_URL, or to the
+    primary when no replica is configured. Only use it for endpoints that
+    do not write.
+
+    Yields:
+        Database session
+    """
+    ReadSessionLocal = _ensure_read_initialized()[1]
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def read_or_primary(db: Session, fetch: Callable[[Session], Optional[T]]) -> Optional[T]:
+    """
+    Run a lookup on a read session, retrying on the primary if not found.
+
+    Replicas lag behind the primary, so a row written moments ago (e.g. a
+    diagram exported right after generation) may not be visible yet.
+
+    Args:
+        db: Read session
+        fetch: Callable running the lookup against a session
+
+    Returns:
+        Lookup result, or None if missing on both
+    """
+    result = fetch(db)
+    if result is None and db.get_bind() is not get_engine():
+        primary_db = get_session_local()()
+        try:
+            result = fetch(primary_db)
+        finally:
+            primary_db.close()
+    return result
+
+
+def warm_up_pool(connections: Optional[int] = None) -> int:
+    """
+    Open pooled connections ahead of the first request.
+
+    Connections are held open together, then returned to the pool, so
+    the first requests after startup skip connect and auth round-trips.
+
+    Args:
+        connections: Connections to open per engine (defaults to DB_POOL_SIZE)
+
+    Returns:
+        Number of connections opened
+    """
+    settings = get_settings()
+    count = min(connections or settings.DB_POOL_SIZE, settings.DB_POOL_SIZE)
+    engines = [get_engine()]
+    if has_read_replica():
+        engines.append(get_read_engine())
+
+    opened = 0
+    for engine in engines:
+        held = []
+        try:
+            for _ in range(count):
+                conn = engine.connect()
+                conn.exec_driver_sql("SELECT 1")
+                held.append(conn)
+        finally:
+            opened += len(held)
+            for conn in held:
+                conn.close()
+    return opened
+
+
+def create_schema() -> None:
+    """
+    Create missing tables and indexes from the ORM models.
+
+    Used for SQLite, where there is no separate schema setup; MySQL
+    deployments normally apply migrations/schema.sql instead. Several
+    workers may start at once, so a table created concurrently by another
+    worker is tolerated.
+    """
+    import app.models  # noqa: F401  (registers every model on Base)
+
+    engine = get_engine()
+    try:
+        Base.metadata.create_all(engine)
+    except exc.OperationalError as e:
+        if "already exists" not in str(e):
+            raise
+        Base.metadata.create_all(engine)
+
+
+def _pool_stats(engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"status": pool.status()}
+    if hasattr(pool, "checkedout"):
+        size = pool.size()
+        checked_out = pool.checkedout()
+        capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+        stats.update({
+            "size": size,
+            "checked_in": pool.checkedin(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "utilisation": round(checked_out / capacity, 3) if capacity else 0.0,
+        })
+    return stats
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get connection pool utilisation for initialized engines.
+
+    Returns:
+        Pool statistics keyed by "primary" and, if separate, "replica"
+    """
+    stats: Dict[str, Any] = {}
+    if _engine is not None:
+        stats["primary"] = _pool_stats(_engine)
+    if _read_engine is not None and _read_engine is not _engine:
+        stats["replica"] = _pool_stats(_read_engine)
+    return stats
+
+
 # Module-level attributes for backward compatibility (lazy evaluation)
 def __getattr__(name):
     if name == "engine":
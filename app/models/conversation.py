@@ -16,7 +16,7 @@ class Conversation(Base):
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     status = Column(
-        Enum("active", "archived", "deleted", name="conversation_status"),
+        Enum("active", "archived", "deleted", name="conversation_status", create_constraint=True),
         default="active"
     )
 
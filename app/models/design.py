@@ -26,5 +26,5 @@ class Design(Base):
     diagrams = relationship("Diagram", back_populates="design", cascade="all, delete-orphan")
 
     __table_args__ = (
-        Index("idx_conversation_id", "conversation_id"),
+        Index("idx_designs_conversation_id", "conversation_id"),
     )
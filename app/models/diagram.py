@@ -1,5 +1,5 @@
 """Diagram model."""
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, Index, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Enum, Index, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.models.base import Base
@@ -17,7 +17,7 @@ class Diagram(Base):
         nullable=False
     )
     diagram_type = Column(
-        Enum("business_flow", name="diagram_type"),
+        Enum("ui_flow", "business_flow", "prototype", name="diagram_type", create_constraint=True),
         nullable=False
     )
     title = Column(String(255), nullable=False)
@@ -28,8 +28,39 @@ class Diagram(Base):
 
     # Relationships
     design = relationship("Design", back_populates="diagrams")
+    pages = relationship(
+        "DiagramPage",
+        back_populates="diagram",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+        order_by="DiagramPage.page_index"
+    )
 
     __table_args__ = (
         Index("idx_design_id", "design_id"),
         Index("idx_diagram_type", "diagram_type"),
     )
+
+
+class DiagramPage(Base):
+    """A page of a multi-page diagram, stored on its own for lazy loading."""
+
+    __tablename__ = "diagram_pages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    diagram_id = Column(
+        Integer,
+        ForeignKey("diagrams.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    page_index = Column(Integer, nullable=False)
+    page_id = Column(String(64), nullable=False)
+    name = Column(String(255), nullable=False)
+    drawio_xml = Column(Text, nullable=False)  # Single-page mxfile
+
+    # Relationships
+    diagram = relationship("Diagram", back_populates="pages")
+
+    __table_args__ = (
+        UniqueConstraint("diagram_id", "page_index", name="uq_diagram_page"),
+    )
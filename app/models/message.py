@@ -17,7 +17,7 @@ class Message(Base):
         nullable=False
     )
     role = Column(
-        Enum("user", "assistant", "system", name="message_role"),
+        Enum("user", "assistant", "system", name="message_role", create_constraint=True),
         nullable=False
     )
     content = Column(Text, nullable=False)
@@ -27,6 +27,6 @@ class Message(Base):
     conversation = relationship("Conversation", back_populates="messages")
 
     __table_args__ = (
-        Index("idx_conversation_id", "conversation_id"),
-        Index("idx_created_at", "created_at"),
+        Index("idx_messages_conversation_id", "conversation_id"),
+        Index("idx_messages_created_at", "created_at"),
     )
@@ -0,0 +1,40 @@
+"""Full-text search index models."""
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Index, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.models.base import Base
+
+
+class SearchDocument(Base):
+    """An indexed message or diagram, with its length for ranking."""
+
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doc_type = Column(String(16), nullable=False)  # "message" or "diagram"
+    doc_id = Column(Integer, nullable=False)
+    conversation_id = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("doc_type", "doc_id", name="uq_search_doc"),
+        Index("idx_search_documents_conversation", "conversation_id"),
+    )
+
+
+class SearchPosting(Base):
+    """Inverted index entry: a term occurring in a document."""
+
+    __tablename__ = "search_postings"
+
+    term = Column(String(32), primary_key=True)
+    document_id = Column(
+        Integer,
+        ForeignKey("search_documents.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    tf = Column(SmallInteger, nullable=False)
+
+    __table_args__ = (
+        Index("idx_search_postings_document", "document_id"),
+    )
@@ -0,0 +1,39 @@
+"""Near-duplicate flow index models (MinHash signatures and LSH buckets)."""
+from sqlalchemy import Column, Integer, String, LargeBinary, Index, ForeignKey, UniqueConstraint
+from app.models.base import Base
+
+
+class FlowSignature(Base):
+    """MinHash signature of a diagram's requirements or node labels."""
+
+    __tablename__ = "flow_signatures"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    diagram_id = Column(
+        Integer,
+        ForeignKey("diagrams.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    kind = Column(String(8), nullable=False)  # "req" or "flow"
+    signature = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("diagram_id", "kind", name="uq_flow_signature"),
+    )
+
+
+class FlowBucket(Base):
+    """LSH bucket membership of a flow signature."""
+
+    __tablename__ = "flow_lsh_buckets"
+
+    bucket = Column(String(32), primary_key=True)
+    signature_id = Column(
+        Integer,
+        ForeignKey("flow_signatures.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+
+    __table_args__ = (
+        Index("idx_flow_lsh_buckets_signature", "signature_id"),
+    )
@@ -0,0 +1,37 @@
+"""LLM usage ledger model."""
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, String
+from app.models.base import Base
+
+
+class LLMUsage(Base):
+    """
+    One LLM call with its token usage and latency.
+
+    Conversation and user IDs are plain columns, not foreign keys, so cost
+    history survives purging and archiving of conversations.
+    """
+
+    __tablename__ = "llm_usage"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    conversation_id = Column(Integer, nullable=True)
+    user_id = Column(Integer, nullable=True)
+    purpose = Column(String(16), nullable=False)  # "generate", "repair", "ui_flow" or "prototype"
+    backend = Column(String(64), nullable=True)
+    model = Column(String(128), nullable=True)
+    status = Column(String(16), nullable=False)  # "ok", "error", "timeout" or "cancelled"
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    total_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=True)
+    cache_hit = Column(Boolean, nullable=True)  # None when the provider does not report caching
+    latency_ms = Column(Integer, nullable=False)
+    first_token_ms = Column(Integer, nullable=True)
+    hedged = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False)  # UTC, set when the call finishes
+
+    __table_args__ = (
+        Index("idx_llm_usage_conversation", "conversation_id"),
+        Index("idx_llm_usage_user_created", "user_id", "created_at"),
+        Index("idx_llm_usage_created", "created_at"),
+    )
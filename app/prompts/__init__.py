@@ -1,10 +1,24 @@
 """Prompt templates for LLM-based generation."""
 from app.prompts.business_flow_prompt import (
     BUSINESS_FLOW_SYSTEM_PROMPT,
-    BUSINESS_FLOW_USER_PROMPT
+    BUSINESS_FLOW_USER_PROMPT,
+    BUSINESS_FLOW_REPAIR_PROMPT
+)
+from app.prompts.design_prompt import (
+    DESIGN_SYSTEM_PROMPT,
+    DESIGN_USER_PROMPT,
+    BUSINESS_FLOW_TASK,
+    UI_FLOW_TASK,
+    PROTOTYPE_TASK
 )
 
 __all__ = [
     "BUSINESS_FLOW_SYSTEM_PROMPT",
     "BUSINESS_FLOW_USER_PROMPT",
+    "BUSINESS_FLOW_REPAIR_PROMPT",
+    "DESIGN_SYSTEM_PROMPT",
+    "DESIGN_USER_PROMPT",
+    "BUSINESS_FLOW_TASK",
+    "UI_FLOW_TASK",
+    "PROTOTYPE_TASK",
 ]
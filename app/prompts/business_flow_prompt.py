@@ -17,14 +17,9 @@ DATA: 数据实体 [flow=从步骤 -> 到步骤]
 
 请用中文生成所有流程步骤、决策点和描述。生成全面的业务流程以捕获所有运营需求。"""
 
-BUSINESS_FLOW_USER_PROMPT = """根据以下需求，生成业务流程图：
-
-需求：{requirements}
-
-对话历史：
-{conversation_history}
-
-请生成包含以下内容的业务流程：
+# Static instructions come first so that consecutive turns share an identical
+# prompt prefix; history and requirements change per turn and go last.
+BUSINESS_FLOW_USER_PROMPT = """请生成包含以下内容的业务流程：
 - 开始/结束点
 - 决策节点
 - 流程步骤
@@ -39,4 +34,28 @@ PROCESS: 结束步骤 [actor=系统]
 注意：
 1. 所有节点名称和描述必须使用中文
 2. 使用清晰的业务术语
-3. 决策点要明确是/否的分支"""
+3. 决策点要明确是/否的分支
+
+参考流程（相似需求已生成的流程，可在此基础上按需求调整）：
+{reference_flow}
+
+对话历史：
+{conversation_history}
+
+根据以下需求，生成业务流程图：
+
+需求：{requirements}"""
+
+# Repair prompt sent with the system prompt when a generated flow is
+# structurally broken; only the broken fragment is regenerated.
+BUSINESS_FLOW_REPAIR_PROMPT = """以下业务流程片段存在结构问题：
+{issues}
+
+有问题的片段：
+{fragment}
+
+请只输出修正后的上述片段（不要输出其他步骤），每个决策都必须同时给出"是"和"否"分支，格式：
+PROCESS: 步骤名称 [actor=角色]
+DECISION: 决策名称 -> 是:步骤A, 否:步骤B
+
+需求：{requirements}"""
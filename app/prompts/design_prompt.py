@@ -0,0 +1,42 @@
+"""Prompt templates for generating several diagram types in one turn."""
+
+# Shared by every diagram type of a turn: the calls run concurrently and
+# differ only in the task appended at the end, so the system prompt,
+# reference, history and requirements form a common prompt-cache prefix.
+DESIGN_SYSTEM_PROMPT = """你是一位资深的产品设计师和业务分析师。
+
+你会根据用户需求，为同一个产品设计以下一种或多种图：
+1. **业务流程图**: 业务操作步骤、决策点和参与者
+2. **UI 流程图**: 产品的页面以及页面之间的跳转
+3. **原型图**: 每个页面的主要界面组件
+
+每次只输出任务要求的那一种图，严格使用要求的行格式，不要输出其他内容。
+所有名称和描述使用中文，同一需求下各图中的页面和步骤名称保持一致。"""
+
+DESIGN_USER_PROMPT = """参考流程（相似需求已生成的业务流程，可作参考）：
+{reference_flow}
+
+对话历史：
+{conversation_history}
+
+需求：{requirements}"""
+
+BUSINESS_FLOW_TASK = """任务：生成业务流程图。
+请按以下格式回答：
+PROCESS: 开始步骤 [actor=用户]
+PROCESS: 处理步骤 [actor=系统]
+DECISION: 决策名称 -> 是:下一个步骤, 否:替代步骤
+PROCESS: 结束步骤 [actor=系统]
+决策点要明确是/否的分支。"""
+
+UI_FLOW_TASK = """任务：生成 UI 流程图（页面跳转）。
+请按以下格式回答：
+SCREEN: 页面名称 [description="页面用途"]
+NAV: 来源页面 -> 目标页面 [action="触发操作"]
+先列出所有页面，再列出跳转；跳转只能引用已列出的页面。"""
+
+PROTOTYPE_TASK = """任务：生成原型图（每个页面的界面组件）。
+请按以下格式回答，每个页面后紧跟它的组件，按从上到下的顺序：
+SCREEN: 页面名称
+COMPONENT: 组件类型 | 组件文字
+组件类型使用 header、text、input、select、button、list、table、image 之一。"""
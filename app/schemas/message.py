@@ -1,6 +1,6 @@
 """Message schemas for API request/response validation."""
 from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
 
@@ -9,6 +9,28 @@ class MessageRequest(BaseModel):
 
     message: str = Field(..., min_length=1, max_length=10000, description="User message content")
     conversation_id: Optional[int] = Field(None, description="Conversation ID (optional for new conversations)")
+    base_diagram_id: Optional[int] = Field(None, description="Diagram currently shown by the client")
+    response_mode: Literal["full", "delta"] = Field(
+        "full",
+        description="'delta' returns only mxCell changes relative to base_diagram_id when possible"
+    )
+    client_request_id: Optional[str] = Field(
+        None,
+        max_length=64,
+        pattern=r"^[A-Za-z0-9_.:-]+$",
+        description="Client-chosen ID that the request can be cancelled by"
+    )
+    deadline_seconds: Optional[float] = Field(
+        None,
+        gt=0,
+        le=600,
+        description="Time budget of the request, overriding REQUEST_DEADLINE_SECONDS"
+    )
+    diagram_types: Optional[List[Literal["business_flow", "ui_flow", "prototype"]]] = Field(
+        None,
+        max_length=3,
+        description="Diagrams to generate concurrently; the business flow is always included"
+    )
 
 
 class MessageResponse(BaseModel):
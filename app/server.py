@@ -0,0 +1,125 @@
+"""Process management for single- and multi-worker serving."""
+import os
+import signal
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.config import Settings
+
+# Minimum seconds between respawns of crashed workers
+_RESPAWN_BACKOFF = 1.0
+
+
+def _uvicorn_config(settings: Settings) -> uvicorn.Config:
+    return uvicorn.Config(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        log_level="debug" if settings.DEBUG else "info",
+    )
+
+
+def run_single(settings: Settings) -> None:
+    """Run a single uvicorn process (with auto-reload in debug mode)."""
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        reload=settings.DEBUG,
+        log_level="debug" if settings.DEBUG else "info",
+    )
+
+
+def run_prefork(settings: Settings) -> None:
+    """
+    Run `settings.WORKERS` uvicorn workers sharing one listening socket.
+
+    The application is imported once in the master before forking, so
+    workers start without re-importing FastAPI, SQLAlchemy and LangChain
+    and share those code pages copy-on-write. Database engines and LLM
+    clients are created lazily, so no connection crosses the fork. The
+    master restarts workers that exit unexpectedly and forwards
+    SIGINT/SIGTERM for a graceful shutdown.
+
+    Args:
+        settings: Application settings
+    """
+    config = _uvicorn_config(settings)
+    config.load()
+    sock = config.bind_socket()
+
+    workers: Dict[int, float] = {}
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"Starting {settings.WORKERS} workers on {settings.HOST}:{settings.PORT} (master pid {os.getpid()})")
+    for _ in range(settings.WORKERS):
+        spawn()
+
+    while workers:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        print(f"Worker {pid} exited unexpectedly, restarting")
+        if time.monotonic() - started < _RESPAWN_BACKOFF:
+            time.sleep(_RESPAWN_BACKOFF)
+        spawn()
+
+    sock.close()
+
+
+def run(settings: Settings) -> None:
+    """
+    Start the server in the mode selected by settings.
+
+    Multi-worker mode is used when WORKERS > 1, reload is off and the
+    platform supports fork; otherwise a single process is started.
+
+    Args:
+        settings: Application settings
+    """
+    if settings.WORKERS > 1 and not settings.DEBUG:
+        if hasattr(os, "fork"):
+            run_prefork(settings)
+            return
+        print("fork() is unavailable on this platform; using uvicorn's worker manager", file=sys.stderr)
+        uvicorn.run(
+            "app.main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            workers=settings.WORKERS,
+            log_level="info",
+        )
+        return
+    run_single(settings)
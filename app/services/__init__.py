@@ -1,10 +1,32 @@
-"""Services for business logic."""
-from app.services.langchain_service import LangChainService
-from app.services.drawio_generator import DrawIOGenerator
-from app.services.design_service import DesignService
+"""Services for business logic.
+
+Service classes are imported lazily on first attribute access so that
+importing a lightweight service module (or the package itself) does not
+pull in LangChain and the OpenAI client at application startup.
+"""
+import importlib
+
+_LAZY_IMPORTS = {
+    "LangChainService": "app.services.langchain_service",
+    "DrawIOGenerator": "app.services.drawio_generator",
+    "DesignService": "app.services.design_service",
+    "SearchService": "app.services.search_service",
+    "SimilarFlowService": "app.services.similar_flow_service",
+}
 
 __all__ = [
     "LangChainService",
     "DrawIOGenerator",
     "DesignService",
+    "SearchService",
+    "SimilarFlowService",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
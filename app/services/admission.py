@@ -0,0 +1,261 @@
+"""Admission control and backpressure for generation requests."""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.config import get_settings
+from app.utils.deadline import current_deadline
+from app.utils.metrics import metrics
+from app.utils.shared_store import SharedStore, get_shared_store, shared_store_enabled
+
+# Bucket used for requests that do not belong to a conversation yet
+_NEW_CONVERSATION_KEY = "__new__"
+
+# Shared-store limiter name and poll interval for the cross-worker limit
+_GLOBAL_LEASE_NAME = "admission"
+_GLOBAL_POLL_SECONDS = 0.05
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request cannot be admitted."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Global and per-conversation concurrency limiter with a bounded queue.
+
+    Requests that cannot run immediately wait in a per-conversation queue.
+    When a slot frees up, conversations are served round-robin so one busy
+    conversation cannot starve the others. A full queue, or a conversation
+    that already has its share of running and waiting requests, is
+    rejected immediately so clients fail fast instead of timing out.
+
+    With a shared store (multi-worker mode) each admitted request also
+    takes a lease from a host-wide limiter, so `max_concurrent` holds
+    across all worker processes rather than per worker.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: Optional[int] = None,
+        per_conversation: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_wait: Optional[float] = None,
+        shared_store: Optional[SharedStore] = None,
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrent: Maximum requests running at once
+            per_conversation: Maximum requests running at once per conversation
+            max_queue: Maximum requests waiting for a slot
+            max_wait: Maximum seconds a request waits before it is rejected
+            shared_store: Store enforcing max_concurrent across processes
+        """
+        settings = get_settings()
+        self.max_concurrent = max_concurrent or settings.ADMISSION_MAX_CONCURRENT
+        self.per_conversation = per_conversation or settings.ADMISSION_PER_CONVERSATION
+        self.max_queue = max_queue if max_queue is not None else settings.ADMISSION_MAX_QUEUE
+        self.max_wait = max_wait if max_wait is not None else settings.ADMISSION_MAX_WAIT_SECONDS
+        self.shared_store = shared_store
+
+        self.active = 0
+        self.queued = 0
+        self._active_by_key: Dict[str, int] = {}
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        self._avg_hold = 5.0  # Exponentially weighted slot hold time in seconds
+
+    def _key(self, conversation_id: Optional[int]) -> str:
+        return _NEW_CONVERSATION_KEY if conversation_id is None else str(conversation_id)
+
+    def _has_capacity(self, key: str) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        if key == _NEW_CONVERSATION_KEY:
+            return True
+        return self._active_by_key.get(key, 0) < self.per_conversation
+
+    def _grant(self, key: str) -> None:
+        self.active += 1
+        self._active_by_key[key] = self._active_by_key.get(key, 0) + 1
+        self._update_gauges()
+
+    def _release(self, key: str, held: float) -> None:
+        self.active -= 1
+        remaining = self._active_by_key.get(key, 1) - 1
+        if remaining:
+            self._active_by_key[key] = remaining
+        else:
+            self._active_by_key.pop(key, None)
+        self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+        # The conversation just had its turn; serve the others first
+        if key in self._waiters:
+            self._waiters.move_to_end(key)
+        self._dispatch()
+        self._update_gauges()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiting conversations in round-robin order."""
+        for key in list(self._waiters.keys()):
+            if self.active >= self.max_concurrent:
+                break
+            waiters = self._waiters[key]
+            while waiters and self._has_capacity(key):
+                future = waiters.popleft()
+                if future.done():
+                    continue
+                self.queued -= 1
+                self._grant(key)
+                future.set_result(True)
+                # Move the conversation to the back of the rotation
+                self._waiters.move_to_end(key)
+                break
+            if not waiters:
+                self._waiters.pop(key, None)
+
+    def retry_after(self) -> int:
+        """Estimate in seconds when capacity is likely to be available."""
+        waves = (self.queued + 1) / max(self.max_concurrent, 1)
+        return max(1, math.ceil(waves * self._avg_hold))
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> AdmissionRejectedError:
+        metrics.inc("admission_rejected_total", reason=reason)
+        return AdmissionRejectedError(status_code, detail, self.retry_after())
+
+    @asynccontextmanager
+    async def slot(self, conversation_id: Optional[int] = None) -> AsyncIterator[None]:
+        """
+        Hold a concurrency slot for the duration of the block.
+
+        Args:
+            conversation_id: Conversation the request belongs to, if any
+
+        The wait is bounded by ADMISSION_MAX_WAIT_SECONDS and by the
+        generation budget of the request's deadline.
+
+        Raises:
+            AdmissionRejectedError: 429 if the conversation has too many
+                requests in flight, 503 if the server queue is full or the
+                wait timed out
+        """
+        key = self._key(conversation_id)
+        wait_started = time.monotonic()
+        max_wait = self.max_wait
+        deadline = current_deadline()
+        if deadline is not None:
+            max_wait = min(max_wait, deadline.generation_budget())
+
+        if self._has_capacity(key) and key not in self._waiters:
+            self._grant(key)
+        else:
+            waiting = len(self._waiters.get(key, ()))
+            if key != _NEW_CONVERSATION_KEY and \
+                    self._active_by_key.get(key, 0) + waiting >= 2 * self.per_conversation:
+                raise self._reject(429, "conversation_limit",
+                                   "Too many concurrent requests for this conversation")
+            if self.queued >= self.max_queue:
+                raise self._reject(503, "queue_full", "Server is busy, please retry later")
+
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(key, deque()).append(future)
+            self.queued += 1
+            self._update_gauges()
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=max_wait)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if future.done() and not future.cancelled():
+                    # Granted just as we gave up: hand the slot back
+                    self._release(key, 0.0)
+                else:
+                    future.cancel()
+                    waiters = self._waiters.get(key)
+                    if waiters is not None:
+                        waiters.remove(future)
+                        if not waiters:
+                            self._waiters.pop(key, None)
+                    self.queued -= 1
+                    self._update_gauges()
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._reject(503, "wait_timeout", "Server is busy, please retry later")
+                raise
+
+        lease = None
+        if self.shared_store is not None:
+            try:
+                lease = await self._acquire_global(wait_started + max_wait)
+            except BaseException:
+                self._release(key, 0.0)
+                raise
+            if lease is None:
+                self._release(key, 0.0)
+                raise self._reject(503, "wait_timeout", "Server is busy, please retry later")
+
+        metrics.observe("admission_wait_seconds", time.monotonic() - wait_started)
+        metrics.inc("admission_admitted_total")
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            if lease is not None:
+                self.shared_store.release(_GLOBAL_LEASE_NAME, lease)
+            self._release(key, time.monotonic() - started)
+
+    async def _acquire_global(self, deadline: float) -> Optional[str]:
+        """
+        Take a host-wide lease, polling until the deadline.
+
+        Args:
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            Lease holder id, or None if the deadline passed
+        """
+        while True:
+            lease = self.shared_store.try_acquire(_GLOBAL_LEASE_NAME, self.max_concurrent)
+            if lease is not None:
+                return lease
+            if time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(_GLOBAL_POLL_SECONDS)
+
+    def _update_gauges(self) -> None:
+        metrics.set_gauge("admission_active", self.active)
+        metrics.set_gauge("admission_queued", self.queued)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return current load figures.
+
+        Returns:
+            Dictionary with active, queued and capacity figures
+        """
+        stats = {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "conversations_waiting": len(self._waiters),
+            "retry_after": self.retry_after(),
+        }
+        if self.shared_store is not None:
+            stats["global_active"] = self.shared_store.lease_count(_GLOBAL_LEASE_NAME)
+        return stats
+
+
+@lru_cache()
+def get_admission_controller() -> AdmissionController:
+    """Get the process-wide admission controller."""
+    return AdmissionController(
+        shared_store=get_shared_store() if shared_store_enabled() else None
+    )
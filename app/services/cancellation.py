@@ -0,0 +1,184 @@
+"""Cancellation of in-flight generations on client disconnect or request."""
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.config import get_settings
+from app.utils.metrics import metrics
+from app.utils.shared_store import SharedStore, get_shared_store, shared_store_enabled
+
+T = TypeVar("T")
+
+# Pipeline stages in order; a generation cancelled in one skips the rest.
+# "reused" (a stored flow instead of an LLM call) stands in for "generating".
+STAGES = ("queued", "preparing", "generating", "rendering", "saving")
+
+# Shared-store namespaces: generations running on some worker, and cancel
+# requests waiting to be picked up by the worker running them
+_RUNNING_NAMESPACE = "generation"
+_CANCEL_NAMESPACE = "generation_cancel"
+_SHARED_TTL_SECONDS = 3600.0
+
+
+class GenerationCancelledError(Exception):
+    """Raised when a generation was cancelled by its client."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Generation cancelled ({reason})")
+        self.reason = reason
+        self.detail = str(self)
+
+
+class _Generation:
+    """A running generation task and why it was cancelled, if it was."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str) -> None:
+        if self.reason is None and not self.task.done():
+            self.reason = reason
+            self.task.cancel()
+
+
+class CancellationRegistry:
+    """
+    Generations running in this worker, cancellable by client request ID.
+
+    A generation is watched for client disconnects and for cancel
+    requests. Cancelling its task stops the upstream LLM stream (the
+    router cancels its attempts) and skips the stages not yet started;
+    stages commit only at their end, so nothing half-written is left.
+
+    With the shared store enabled, cancel requests for generations
+    running in another worker process are handed over through the store.
+    """
+
+    def __init__(self, poll_interval: float = 0.5, shared_store: Optional[SharedStore] = None):
+        """
+        Initialize the registry.
+
+        Args:
+            poll_interval: Seconds between disconnect and cancel-flag checks
+            shared_store: Store used to reach the other worker processes
+        """
+        self.poll_interval = poll_interval
+        self.shared_store = shared_store
+        self._running: Dict[str, _Generation] = {}
+
+    def cancel(self, request_id: str, reason: str = "client") -> bool:
+        """
+        Cancel the generation started with a client request ID.
+
+        Args:
+            request_id: Client request ID
+            reason: Recorded cancellation reason
+
+        Returns:
+            True if the generation runs here or, with the shared store, in
+            another worker; False if it is unknown or already finished
+        """
+        generation = self._running.get(request_id)
+        if generation is not None:
+            generation.cancel(reason)
+            return True
+        if self.shared_store is not None and \
+                self.shared_store.get(_RUNNING_NAMESPACE, request_id) is not None:
+            self.shared_store.set(_CANCEL_NAMESPACE, request_id, reason, ttl=_SHARED_TTL_SECONDS)
+            return True
+        return False
+
+    async def run(
+        self,
+        work: Awaitable[T],
+        request_id: Optional[str] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        stage: Optional[Callable[[], str]] = None
+    ) -> T:
+        """
+        Run a generation as a cancellable task.
+
+        Args:
+            work: Coroutine doing the generation
+            request_id: Client request ID for explicit cancellation, if any
+            is_disconnected: Coroutine function returning True once the
+                client has gone away
+            stage: Function returning the stage the generation is in, used
+                to label metrics
+
+        Returns:
+            Result of the work
+
+        Raises:
+            GenerationCancelledError: If the client disconnected or the
+                generation was cancelled through the registry
+        """
+        generation = _Generation(asyncio.ensure_future(work))
+        if request_id is not None:
+            self._running[request_id] = generation
+            if self.shared_store is not None:
+                self.shared_store.set(_RUNNING_NAMESPACE, request_id, os.getpid(),
+                                      ttl=_SHARED_TTL_SECONDS)
+        watcher = None
+        if is_disconnected is not None or (request_id is not None and self.shared_store is not None):
+            watcher = asyncio.create_task(self._watch(generation, request_id, is_disconnected))
+
+        started = time.monotonic()
+        try:
+            return await generation.task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            caller_cancelled = current is not None and current.cancelling() > 0
+            self._record(generation.reason or "caller", stage() if stage else "unknown",
+                         time.monotonic() - started)
+            if caller_cancelled or generation.reason is None:
+                raise
+            raise GenerationCancelledError(generation.reason) from None
+        finally:
+            if watcher is not None:
+                watcher.cancel()
+            if request_id is not None and self._running.get(request_id) is generation:
+                del self._running[request_id]
+                if self.shared_store is not None:
+                    self.shared_store.delete(_RUNNING_NAMESPACE, request_id)
+                    self.shared_store.delete(_CANCEL_NAMESPACE, request_id)
+
+    async def _watch(
+        self,
+        generation: _Generation,
+        request_id: Optional[str],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]]
+    ) -> None:
+        """Cancel the generation once its client disconnects or asks to cancel."""
+        while not generation.task.done():
+            await asyncio.sleep(self.poll_interval)
+            if is_disconnected is not None and await is_disconnected():
+                generation.cancel("disconnect")
+                return
+            if request_id is not None and self.shared_store is not None:
+                reason = self.shared_store.get(_CANCEL_NAMESPACE, request_id)
+                if reason is not None:
+                    generation.cancel(reason)
+                    return
+
+    @staticmethod
+    def _record(reason: str, stage: str, elapsed: float) -> None:
+        """Count a cancellation and the stages it saved."""
+        position = "generating" if stage == "reused" else stage
+        skipped = len(STAGES) - STAGES.index(position) - 1 if position in STAGES else 0
+        metrics.inc("generation_cancelled_total", reason=reason, stage=stage)
+        metrics.inc("generation_stages_skipped_total", skipped)
+        metrics.observe("generation_cancelled_after_seconds", elapsed)
+        print(f"Generation cancelled ({reason}) during {stage} after {elapsed:.2f}s")
+
+
+@lru_cache()
+def get_cancellation_registry() -> CancellationRegistry:
+    """Get the process-wide cancellation registry configured from settings."""
+    return CancellationRegistry(
+        poll_interval=get_settings().CANCEL_POLL_SECONDS,
+        shared_store=get_shared_store() if shared_store_enabled() else None
+    )
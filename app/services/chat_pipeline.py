@@ -0,0 +1,700 @@
+"""Message processing pipeline shared by the HTTP and WebSocket chat APIs."""
+import asyncio
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.config import get_settings
+from app.models.conversation import Conversation
+from app.models.design import Design
+from app.models.diagram import Diagram
+from app.models.message import Message
+from app.schemas.message import MessageResponse
+from app.services.design_service import DesignService
+from app.services.drawio_generator import DrawIOGenerator
+from app.services.retention_service import RetentionService
+from app.services.search_service import SearchService
+from app.services.similar_flow_service import (
+    SimilarFlow,
+    SimilarFlowService,
+    diagram_signatures,
+    format_flow,
+    requirements_signature,
+)
+from app.services.usage_ledger import UsageService, attribute_usage
+from app.utils.deadline import DeadlineExceededError
+from app.utils.drawio_diff import delta_size, diff_diagrams
+from app.utils.metrics import metrics
+from app.utils.tracing import current_span, span
+
+# Coroutine receiving pipeline events (status updates, partial flows)
+EventCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class ConversationNotFoundError(LookupError):
+    """Raised when a message targets a conversation that does not exist."""
+
+
+# Diagram types a message can ask for, in response order, and their titles
+DIAGRAM_TITLES = {
+    "business_flow": "Business Process Flow",
+    "ui_flow": "UI Flow",
+    "prototype": "Prototype",
+}
+
+# Notes prefixed to replies built from a fallback when the deadline ran out
+_DEGRADED_NOTES = {
+    "partial_flow": "The response took too long, so this diagram contains only the steps generated in time.",
+    "base_flow": "The response took too long, so the diagram is unchanged. Please try again.",
+    "similar_flow": "The response took too long, so this is the diagram of the most similar earlier request.",
+    "previous_flow": "The response took too long, so this is the previous diagram of the conversation.",
+}
+
+
+def build_assistant_message(
+    business_flow: Dict[str, Any],
+    degraded: Optional[str] = None,
+    extras: Optional[Dict[str, Optional[Dict[str, Any]]]] = None
+) -> str:
+    """
+    Build the assistant reply summarising a generated business flow.
+
+    Args:
+        business_flow: Parsed business flow
+        degraded: Fallback the flow comes from, if the deadline ran out
+        extras: UI flow / prototype data generated alongside, None for a
+            type that failed
+
+    Returns:
+        Markdown reply text
+    """
+    business_processes_count = len(business_flow.get("processes", []))
+    decisions_count = len(business_flow.get("decisions", []))
+
+    if degraded:
+        reply = f"""{_DEGRADED_NOTES[degraded]}
+
+The diagram has **{business_processes_count}** process steps and **{decisions_count}** decision points."""
+    else:
+        reply = f"""Based on your requirements, I've generated a **Business Process Flow** diagram with:
+
+- **{business_processes_count}** process steps
+- **{decisions_count}** decision points
+
+The diagram shows the complete flow of your business process, including all actors, processes, and decision branches.
+
+You can view the diagram in the panel and export it as a .drawio file."""
+
+    if extras:
+        lines = []
+        for diagram_type, data in extras.items():
+            title = DIAGRAM_TITLES[diagram_type]
+            if data is None:
+                lines.append(f"- **{title}**: could not be generated, please try again")
+            elif diagram_type == "ui_flow":
+                lines.append(f"- **{title}** with **{len(data['screens'])}** screens and "
+                             f"**{len(data['transitions'])}** navigations")
+            else:
+                lines.append(f"- **{title}** of **{len(data['screens'])}** screens")
+        reply += "\n\nAlso generated:\n\n" + "\n".join(lines)
+    return reply
+
+
+def build_diagram_content(
+    diagram_id: int,
+    xml: str,
+    preview: str,
+    base_diagram: Optional[Diagram] = None,
+    pages: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
+    """
+    Build the generated_content entry for a diagram.
+
+    With a base diagram the entry carries a cell-level delta instead of
+    the full XML and raw LLM text, unless the delta would not be smaller.
+    Multi-page diagrams are returned as their first page plus the page
+    list; the client loads the other pages on demand.
+
+    Args:
+        diagram_id: ID of the saved diagram
+        xml: Full DrawIO XML of the diagram
+        preview: Raw LLM response
+        base_diagram: Diagram the client currently shows, if any
+        pages: Pages of the diagram (see DesignService.store_pages)
+
+    Returns:
+        Dictionary with "mode" ("full", "delta" or "paged") and the
+        matching content
+    """
+    if pages and len(pages) > 1:
+        return {
+            "diagram_id": diagram_id,
+            "mode": "paged",
+            "preview": preview,
+            "pages": [
+                {"index": index, "page_id": page["page_id"], "name": page["name"]}
+                for index, page in enumerate(pages)
+            ],
+            "xml": pages[0]["xml"],
+        }
+    # Deltas are only applied to single-page diagrams
+    if base_diagram is not None and not base_diagram.pages:
+        delta = diff_diagrams(base_diagram.drawio_xml, xml)
+        if delta_size(delta) < len(xml):
+            return {
+                "diagram_id": diagram_id,
+                "mode": "delta",
+                "delta": {"base_diagram_id": base_diagram.id, **delta},
+            }
+    return {
+        "diagram_id": diagram_id,
+        "mode": "full",
+        "preview": preview,
+        "xml": xml,
+    }
+
+
+class ChatPipeline:
+    """
+    Turn a user message into a saved business flow diagram, optionally
+    with a UI flow and a prototype.
+
+    Stages: save the user message, generate the diagrams via the LLM,
+    render DrawIO XML, save design, diagrams and assistant reply in one
+    transaction. Progress is
+    reported through an optional event callback so that push channels can
+    show status and partial flows while the LLM is still streaming.
+    """
+
+    def __init__(self, db: Session, on_event: Optional[EventCallback] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            db: Database session
+            on_event: Optional coroutine receiving progress events
+        """
+        self.db = db
+        self.on_event = on_event
+        self.stage = "queued"
+        self._partial_signature = None
+
+    async def emit(self, event: Dict[str, Any]) -> None:
+        """
+        Send an event to the listener, if any.
+
+        Status events also advance `stage`. Emitting always yields to the
+        event loop, so a cancelled generation stops before the next stage.
+        """
+        if event.get("type") == "status":
+            self.stage = event["stage"]
+        if self.on_event is not None:
+            await self.on_event(event)
+        else:
+            await asyncio.sleep(0)
+
+    def get_or_create_conversation(self, message: str, conversation_id: Optional[int]) -> Conversation:
+        """
+        Load the target conversation or start a new one titled after the message.
+
+        Archived conversations are restored from cold storage first.
+
+        Raises:
+            ConversationNotFoundError: If conversation_id does not exist or
+                the conversation was deleted
+        """
+        db = self.db
+        if conversation_id:
+            conversation = db.query(Conversation).filter(
+                Conversation.id == conversation_id
+            ).first()
+            if not conversation or conversation.status == "deleted":
+                raise ConversationNotFoundError(conversation_id)
+            if conversation.status == "archived":
+                RetentionService(db).restore_conversation(conversation)
+            return conversation
+
+        conversation = Conversation(
+            title=message[:50] + "..." if len(message) > 50 else message,
+            status="active"
+        )
+        db.add(conversation)
+        db.commit()
+        db.refresh(conversation)
+        return conversation
+
+    def get_base_diagram(self, conversation_id: int, base_diagram_id: Optional[int]) -> Optional[Diagram]:
+        """Load the client's current diagram if it belongs to the conversation."""
+        if not base_diagram_id:
+            return None
+        return self.db.query(Diagram).join(Design).filter(
+            Diagram.id == base_diagram_id,
+            Diagram.diagram_type == "business_flow",
+            Design.conversation_id == conversation_id
+        ).first()
+
+    async def _on_llm_progress(self, text: str) -> None:
+        """Emit a partial flow whenever a new complete line changes it."""
+        if self.on_event is None or not text.endswith("\n"):
+            return
+        from app.services.langchain_service import LangChainService
+
+        flow = LangChainService.parse_partial_flow(text)
+        signature = (len(flow["processes"]), len(flow["decisions"]))
+        if signature != self._partial_signature and any(signature):
+            self._partial_signature = signature
+            await self.emit({"type": "partial_flow", "flow": flow})
+
+    async def lookup_similar(
+        self,
+        message: str,
+        history_list: List[Dict[str, str]],
+        conversation_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Tuple[Optional[SimilarFlow], bool]:
+        """
+        Find the stored flow most similar to the message.
+
+        Only flows of the same user (or, without one, the same conversation)
+        are considered; see SimilarFlowService. The message is MinHashed in a
+        worker thread so long messages do not stall the event loop.
+
+        Args:
+            message: User requirements
+            history_list: Conversation history including the current message
+            conversation_id: Conversation the message belongs to
+            user_id: User the conversation belongs to, if any
+
+        Returns:
+            The similar flow (None if there is none) and whether it is close
+            enough to be reused without calling the LLM, which is only done
+            on the first turn of a conversation
+        """
+        settings = get_settings()
+        similar = None
+        first_turn = sum(1 for msg in history_list if msg["role"] == "user") <= 1
+        with span("similar_flow.lookup") as lookup_span:
+            if settings.SIMILAR_FLOW_ENABLED:
+                signature = await asyncio.to_thread(requirements_signature, message)
+                similar = SimilarFlowService(self.db).find_similar(
+                    message,
+                    min_similarity=settings.SIMILAR_FLOW_EXAMPLE_THRESHOLD,
+                    user_id=user_id,
+                    conversation_id=conversation_id,
+                    signature=signature
+                )
+            reuse = bool(similar and first_turn and similar.similarity >= settings.SIMILAR_FLOW_REUSE_THRESHOLD)
+            lookup_span.set_attributes(
+                similarity=similar.similarity if similar else None,
+                outcome="reuse" if reuse else ("example" if similar else "miss")
+            )
+        return similar, reuse
+
+    async def generate_flow(
+        self,
+        langchain_service: Any,
+        message: str,
+        history_list: List[Dict[str, str]],
+        base_flow: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[int] = None,
+        lookup: Optional[Tuple[Optional[SimilarFlow], bool]] = None,
+        shared_prompt: bool = False,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Produce the business flow, reusing a near-duplicate earlier flow if possible.
+
+        On the first turn of a conversation, a stored flow whose
+        requirements are nearly identical is returned without calling the
+        LLM. A less similar flow is passed to the LLM as a few-shot example.
+        When the client refines a diagram it shows (e.g. an imported one),
+        that diagram's flow is passed as the reference instead.
+
+        If the request's deadline runs out during the LLM call, a degraded
+        flow is returned instead (see degraded_flow).
+
+        Args:
+            langchain_service: LangChainService instance
+            message: User requirements
+            history_list: Conversation history including the current message
+            base_flow: Flow of the diagram being refined, if any
+            conversation_id: Conversation the message belongs to
+            lookup: Result of lookup_similar, if already done
+            shared_prompt: Use the multi-diagram prompt (see
+                LangChainService.generate_business_flow)
+            user_id: User the conversation belongs to, if any
+
+        Returns:
+            Dictionary with business_flow, raw_response, backend,
+            reused_diagram_id (None when generated) and degraded (None
+            unless a fallback was used)
+
+        Raises:
+            DeadlineExceededError: If the deadline ran out and there is
+                nothing to fall back on
+        """
+        similar, reuse = None, False
+        if not base_flow:
+            similar, reuse = lookup or await self.lookup_similar(
+                message, history_list, conversation_id, user_id
+            )
+            metrics.inc("similar_flow_lookups_total",
+                        outcome="reuse" if reuse else ("example" if similar else "miss"))
+
+        if reuse:
+            await self.emit({"type": "status", "stage": "reused", "diagram_id": similar.diagram_id})
+            return {
+                "business_flow": similar.flow_data,
+                "raw_response": format_flow(similar.flow_data),
+                "backend": "reuse",
+                "reused_diagram_id": similar.diagram_id,
+                "degraded": None,
+            }
+
+        try:
+            business_flow_data = await langchain_service.generate_business_flow(
+                message,
+                history_list,
+                on_progress=self._on_llm_progress,
+                reference_flow=base_flow or (similar.flow_data if similar else None),
+                shared_prompt=shared_prompt
+            )
+        except DeadlineExceededError as e:
+            return await self.degraded_flow(e, base_flow, similar, conversation_id)
+        business_flow_data.update(reused_diagram_id=None, degraded=None)
+        return business_flow_data
+
+    async def generate_diagrams(
+        self,
+        langchain_service: Any,
+        drawio_generator: DrawIOGenerator,
+        message: str,
+        history_list: List[Dict[str, str]],
+        diagram_types: Sequence[str],
+        base_flow: Optional[Dict[str, Any]] = None,
+        conversation_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Generate and render the requested diagram types concurrently.
+
+        All types share one prompt prefix (system prompt, reference flow,
+        history and requirements) and differ only in the task appended at
+        the end, so the backend can serve the prefix from its prompt cache.
+        Each diagram is rendered and emitted as a "diagram" event as soon
+        as it is done. A failed UI flow or prototype does not fail the
+        turn; a failed business flow does and cancels the others.
+
+        Args:
+            langchain_service: LangChainService instance
+            drawio_generator: DrawIOGenerator instance
+            message: User requirements
+            history_list: Conversation history including the current message
+            diagram_types: Types to generate, business_flow first
+            base_flow: Flow of the diagram being refined, if any
+            conversation_id: Conversation the message belongs to
+            user_id: User the conversation belongs to, if any
+
+        Returns:
+            Generation result with "xml" added, by diagram type; None for a
+            UI flow or prototype that failed
+
+        Raises:
+            DeadlineExceededError: If the business flow ran out of time with
+                nothing to fall back on
+        """
+        shared = len(diagram_types) > 1
+        lookup = None
+        if shared and not base_flow:
+            # Decided once, so every type gets the same reference flow
+            lookup = await self.lookup_similar(message, history_list, conversation_id, user_id)
+        reference_flow = base_flow or (lookup[0].flow_data if lookup and lookup[0] else None)
+
+        async def generate(diagram_type: str) -> Optional[Dict[str, Any]]:
+            if diagram_type == "business_flow":
+                result = await self.generate_flow(
+                    langchain_service,
+                    message,
+                    history_list,
+                    base_flow=base_flow,
+                    conversation_id=conversation_id,
+                    lookup=lookup,
+                    shared_prompt=shared,
+                    user_id=user_id
+                )
+                await self.emit({"type": "status", "stage": "rendering"})
+                data = result["business_flow"]
+            else:
+                try:
+                    result = await langchain_service.generate_design_diagram(
+                        diagram_type, message, history_list, reference_flow=reference_flow
+                    )
+                except Exception as e:
+                    active_span = current_span()
+                    trace = f", trace {active_span.trace_id}" if active_span is not None else ""
+                    print(f"Error generating {diagram_type} for conversation {conversation_id}{trace}: "
+                          f"{type(e).__name__}: {e}")
+                    traceback.print_exc()
+                    metrics.inc("diagram_generations_total", diagram_type=diagram_type, outcome="error")
+                    if shared:
+                        await self.emit({"type": "diagram", "diagram_type": diagram_type,
+                                         "error": getattr(e, "detail", str(e))})
+                    return None
+                data = result["data"]
+            result["xml"] = drawio_generator.render(diagram_type, data)["xml"]
+            metrics.inc("diagram_generations_total", diagram_type=diagram_type, outcome="ok")
+            if shared:
+                await self.emit({"type": "diagram", "diagram_type": diagram_type, "xml": result["xml"],
+                                 "degraded": result.get("degraded")})
+            return result
+
+        tasks = [asyncio.ensure_future(generate(diagram_type)) for diagram_type in diagram_types]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return dict(zip(diagram_types, results))
+
+    async def degraded_flow(
+        self,
+        error: DeadlineExceededError,
+        base_flow: Optional[Dict[str, Any]],
+        similar: Optional[Any],
+        conversation_id: Optional[int]
+    ) -> Dict[str, Any]:
+        """
+        Pick a best-effort flow after the deadline ran out.
+
+        In order of preference: the partially streamed flow if it has at
+        least DEADLINE_MIN_PARTIAL_STEPS steps, the flow being refined, the
+        most similar earlier flow, the conversation's latest flow, and
+        finally a partial flow of any size.
+
+        Args:
+            error: The deadline error; LLMTimeoutError carries the partial text
+            base_flow: Flow of the diagram being refined, if any
+            similar: SimilarFlow found for the message, if any
+            conversation_id: Conversation the message belongs to
+
+        Returns:
+            Flow data like generate_flow's, with degraded set to the source
+
+        Raises:
+            DeadlineExceededError: If there is nothing to fall back on
+        """
+        from app.services.langchain_service import LangChainService
+
+        partial_text = getattr(error, "partial_text", "")
+        partial = LangChainService.parse_partial_flow(partial_text) if partial_text else None
+        partial_steps = len(partial["processes"]) + len(partial["decisions"]) if partial else 0
+
+        candidates = []
+        if partial_steps >= get_settings().DEADLINE_MIN_PARTIAL_STEPS:
+            candidates.append(("partial_flow", partial, None))
+        if base_flow:
+            candidates.append(("base_flow", base_flow, None))
+        if similar is not None:
+            candidates.append(("similar_flow", similar.flow_data, similar.diagram_id))
+        if not candidates and conversation_id is not None:
+            previous = self.db.query(Diagram.flow_data).join(Design).filter(
+                Design.conversation_id == conversation_id,
+                Diagram.diagram_type == "business_flow",
+                Diagram.flow_data.isnot(None)
+            ).order_by(Diagram.id.desc()).first()
+            if previous is not None:
+                candidates.append(("previous_flow", previous[0], None))
+        if partial and partial["processes"]:
+            candidates.append(("partial_flow", partial, None))
+        if not candidates:
+            raise error
+
+        source, flow, diagram_id = candidates[0]
+        metrics.inc("degraded_responses_total", source=source)
+        await self.emit({"type": "degraded", "source": source})
+        return {
+            "business_flow": flow,
+            "raw_response": partial_text if source == "partial_flow" else format_flow(flow),
+            "backend": "degraded",
+            "reused_diagram_id": diagram_id,
+            "degraded": source,
+        }
+
+    async def run(
+        self,
+        message: str,
+        conversation_id: Optional[int] = None,
+        base_diagram_id: Optional[int] = None,
+        response_mode: str = "full",
+        diagram_types: Optional[Sequence[str]] = None
+    ) -> MessageResponse:
+        """
+        Process a user message end to end.
+
+        Args:
+            message: User message content
+            conversation_id: Existing conversation ID, or None to start one
+            base_diagram_id: Diagram currently shown by the client; its flow
+                is the starting point of the refinement
+            response_mode: "delta" to return mxCell changes relative to
+                base_diagram_id instead of the full XML
+            diagram_types: Diagram types to generate alongside the business
+                flow, which is always generated
+
+        Returns:
+            MessageResponse with the assistant reply and generated diagrams
+
+        Raises:
+            ConversationNotFoundError: If conversation_id does not exist
+            TokenBudgetExceededError: If the conversation or its user has
+                used up its token budget
+            DeadlineExceededError: If the deadline ran out with nothing to
+                fall back on, or before the result could be saved
+        """
+        # Imported on first use so that workers serving only reads or health
+        # checks never load LangChain
+        from app.services.langchain_service import LangChainService
+
+        self.stage = "preparing"
+        db = self.db
+        langchain_service = LangChainService()
+        drawio_generator = DrawIOGenerator()
+        search_service = SearchService(db)
+
+        conversation = self.get_or_create_conversation(message, conversation_id)
+        if get_settings().USAGE_LEDGER_ENABLED:
+            UsageService(db).check_budget(conversation.id, conversation.user_id)
+
+        # Save user message
+        user_message = Message(
+            conversation_id=conversation.id,
+            role="user",
+            content=message
+        )
+        db.add(user_message)
+        # Activity keeps the conversation out of retention compaction
+        conversation.updated_at = func.now()
+        db.flush()
+        search_service.index_message(user_message)
+        db.commit()
+        await self.emit({"type": "status", "stage": "generating", "conversation_id": conversation.id})
+
+        try:
+            # Get conversation history
+            history: List[Message] = db.query(Message).filter(
+                Message.conversation_id == conversation.id
+            ).order_by(Message.created_at).all()
+
+            history_list = [
+                {"role": msg.role, "content": msg.content}
+                for msg in history
+            ]
+
+            base_diagram = self.get_base_diagram(conversation.id, base_diagram_id)
+
+            types = [t for t in DIAGRAM_TITLES if t == "business_flow" or t in (diagram_types or ())]
+
+            # Generate the diagrams
+            with span("pipeline.generate", refine=base_diagram is not None,
+                      diagram_types=",".join(types)) as generate_span, \
+                    attribute_usage(conversation.id, conversation.user_id):
+                results = await self.generate_diagrams(
+                    langchain_service,
+                    drawio_generator,
+                    message,
+                    history_list,
+                    types,
+                    base_flow=base_diagram.flow_data if base_diagram else None,
+                    conversation_id=conversation.id,
+                    user_id=conversation.user_id
+                )
+                business_flow_data = results["business_flow"]
+                generate_span.set_attribute("backend", business_flow_data["backend"])
+
+            await self.emit({"type": "status", "stage": "saving"})
+            # Fallback flows do not answer the message, so they must not be
+            # reused for similar requests; MinHash off the event loop
+            similar_signatures = None
+            if business_flow_data["reused_diagram_id"] is None and not business_flow_data["degraded"]:
+                similar_signatures = await asyncio.to_thread(
+                    diagram_signatures, message, business_flow_data["business_flow"]
+                )
+            with span("pipeline.save"):
+                # Design, diagrams and reply are committed together
+                design = Design(
+                    conversation_id=conversation.id,
+                    name=f"Business Flow for conversation {conversation.id}",
+                    description=message
+                )
+                db.add(design)
+                db.flush()
+
+                diagrams: Dict[str, Tuple[Diagram, List[Dict[str, Any]]]] = {}
+                for diagram_type, result in results.items():
+                    if result is None:
+                        continue
+                    diagram = Diagram(
+                        design_id=design.id,
+                        diagram_type=diagram_type,
+                        title=DIAGRAM_TITLES[diagram_type],
+                        drawio_xml=result["xml"],
+                        flow_data=result["business_flow"] if diagram_type == "business_flow" else result["data"]
+                    )
+                    db.add(diagram)
+                    db.flush()
+                    diagrams[diagram_type] = (diagram, DesignService(db).store_pages(diagram))
+                    search_service.index_diagram(diagram, conversation.id)
+
+                if similar_signatures is not None:
+                    SimilarFlowService(db).index_diagram(
+                        diagrams["business_flow"][0], message, signatures=similar_signatures
+                    )
+
+                # Save assistant message
+                assistant_message = build_assistant_message(
+                    business_flow_data["business_flow"],
+                    degraded=business_flow_data["degraded"],
+                    extras={
+                        diagram_type: result["data"] if result else None
+                        for diagram_type, result in results.items() if diagram_type != "business_flow"
+                    }
+                )
+                bot_message = Message(
+                    conversation_id=conversation.id,
+                    role="assistant",
+                    content=assistant_message
+                )
+                db.add(bot_message)
+                db.commit()
+
+        except BaseException:
+            db.rollback()
+            raise
+
+        generated_content: Dict[str, Any] = {}
+        for diagram_type, result in results.items():
+            if result is None:
+                generated_content[diagram_type] = {
+                    "error": f"The {DIAGRAM_TITLES[diagram_type]} could not be generated"
+                }
+                continue
+            diagram, pages = diagrams[diagram_type]
+            generated_content[diagram_type] = build_diagram_content(
+                diagram.id,
+                result["xml"],
+                result["raw_response"],
+                # Only business flows are refined from a base diagram
+                base_diagram if response_mode == "delta" and diagram_type == "business_flow" else None,
+                pages
+            )
+        if business_flow_data["degraded"]:
+            generated_content["business_flow"]["degraded"] = business_flow_data["degraded"]
+        return MessageResponse(
+            message_id=bot_message.id,
+            conversation_id=conversation.id,
+            message=assistant_message,
+            generated_content=generated_content
+        )
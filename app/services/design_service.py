@@ -1,8 +1,9 @@
 """Design service for managing designs and diagrams."""
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from app.models.design import Design
-from app.models.diagram import Diagram
+from app.models.diagram import Diagram, DiagramPage
+from app.utils.drawio_pages import split_pages
 
 
 class DesignService:
@@ -100,3 +101,63 @@ class DesignService:
         return self.db.query(Diagram).filter(
             Diagram.design_id == design_id
         ).all()
+
+    def store_pages(self, diagram: Diagram) -> List[Dict[str, Any]]:
+        """
+        Store the pages of a flushed multi-page diagram (committed with the session).
+
+        Single-page diagrams are served from the diagram itself and get no
+        page rows.
+
+        Args:
+            diagram: Diagram with its ID assigned
+
+        Returns:
+            Pages in order, each with page_id, name and xml
+        """
+        pages = split_pages(diagram.drawio_xml)
+        if len(pages) > 1:
+            self.db.add_all([
+                DiagramPage(
+                    diagram_id=diagram.id,
+                    page_index=index,
+                    page_id=page["page_id"][:64],
+                    name=page["name"][:255],
+                    drawio_xml=page["xml"]
+                )
+                for index, page in enumerate(pages)
+            ])
+        return pages
+
+    def list_pages(self, diagram_id: int) -> List[Dict[str, Any]]:
+        """
+        List the stored pages of a diagram without loading their XML.
+
+        Args:
+            diagram_id: Diagram ID
+
+        Returns:
+            Pages with index, page_id and name; empty for single-page diagrams
+        """
+        rows = self.db.query(
+            DiagramPage.page_index, DiagramPage.page_id, DiagramPage.name
+        ).filter(
+            DiagramPage.diagram_id == diagram_id
+        ).order_by(DiagramPage.page_index).all()
+        return [{"index": index, "page_id": page_id, "name": name} for index, page_id, name in rows]
+
+    def get_page(self, diagram_id: int, page_index: int) -> Optional[DiagramPage]:
+        """
+        Get one stored page of a diagram.
+
+        Args:
+            diagram_id: Diagram ID
+            page_index: 0-based page index
+
+        Returns:
+            DiagramPage object or None
+        """
+        return self.db.query(DiagramPage).filter(
+            DiagramPage.diagram_id == diagram_id,
+            DiagramPage.page_index == page_index
+        ).first()
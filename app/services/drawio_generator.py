@@ -1,6 +1,85 @@
 """DrawIO generator service for creating DrawIO XML from flow data."""
-from typing import Dict, Any, List
+import hashlib
+from html import escape
+from typing import Dict, Any, Callable, List, Set, Tuple
+from app.config import get_settings
 from app.utils.drawio_xml_builder import DrawIOXMLBuilder
+from app.utils.render_cache import flow_hash, get_render_cache
+from app.utils.tracing import span
+
+# Version of the layout and XML output; bump it whenever either changes so
+# that cached renders of the previous version are no longer used
+GENERATOR_VERSION = "3"
+
+# Screens per row of a UI flow
+UI_FLOW_COLUMNS = 3
+
+# Prototype screen frame and component styles by component type
+_FRAME_STYLE = "rounded=1;whiteSpace=wrap;html=1;fillColor=#ffffff;strokeColor=#666666;verticalAlign=top;fontStyle=1;arcSize=4;"
+_COMPONENT_STYLES = {
+    "header": "text;html=1;align=center;verticalAlign=middle;fontStyle=1;fontSize=16;",
+    "text": "text;html=1;align=left;verticalAlign=middle;whiteSpace=wrap;",
+    "input": "rounded=1;whiteSpace=wrap;html=1;fillColor=#ffffff;strokeColor=#999999;align=left;spacingLeft=8;fontColor=#999999;",
+    "select": "rounded=1;whiteSpace=wrap;html=1;fillColor=#ffffff;strokeColor=#999999;align=left;spacingLeft=8;fontColor=#999999;",
+    "button": "rounded=1;whiteSpace=wrap;html=1;fillColor=#1ba1e2;strokeColor=#006EAF;fontColor=#ffffff;",
+    "list": "rounded=0;whiteSpace=wrap;html=1;fillColor=#f5f5f5;strokeColor=#666666;align=left;verticalAlign=top;spacingLeft=8;",
+    "table": "shape=table;startSize=0;html=1;whiteSpace=wrap;fillColor=#f5f5f5;strokeColor=#666666;",
+    "image": "rounded=0;whiteSpace=wrap;html=1;fillColor=#eeeeee;strokeColor=#999999;dashed=1;",
+}
+_COMPONENT_HEIGHTS = {"header": 40, "list": 80, "table": 80, "image": 100}
+
+
+def _stable_cell_id(prefix: str, key: str, used: Set[str]) -> str:
+    """
+    Derive a cell ID from cell content instead of insertion order.
+
+    Regenerating a refined flow then keeps the IDs of unchanged steps,
+    so consecutive diagrams can be diffed cell by cell.
+    """
+    base = f"{prefix}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+    cell_id = base
+    n = 1
+    while cell_id in used:
+        n += 1
+        cell_id = f"{base}-{n}"
+    used.add(cell_id)
+    return cell_id
+
+
+def paginate_steps(steps: List[Tuple[str, Dict[str, Any]]], max_steps: int) -> List[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Split the steps of a flow into pages.
+
+    A page holds at most `max_steps` steps. Once it is at least half full,
+    a change of actor also starts a new page, so pages tend to follow the
+    hand-offs between roles.
+
+    Args:
+        steps: ("process" | "decision", item) pairs in flow order
+        max_steps: Maximum steps per page (0 or less for a single page)
+
+    Returns:
+        List of pages, each a list of steps
+    """
+    if max_steps <= 0 or len(steps) <= max_steps:
+        return [steps]
+    pages: List[List[Tuple[str, Dict[str, Any]]]] = [[]]
+    for kind, item in steps:
+        page = pages[-1]
+        previous_actor = page[-1][1].get("actor") if page else None
+        actor_changed = kind == "process" and previous_actor and item.get("actor") != previous_actor
+        if len(page) >= max_steps or (actor_changed and len(page) >= max_steps // 2):
+            pages.append([])
+        pages[-1].append((kind, item))
+    return pages
+
+
+def _page_name(number: int, steps: List[Tuple[str, Dict[str, Any]]]) -> str:
+    """Name a page after its actor when all of its steps share one."""
+    actors = {item.get("actor") for kind, item in steps if kind == "process"}
+    if len(actors) == 1 and None not in actors and "" not in actors:
+        return f"Page {number} - {actors.pop()}"
+    return f"Page {number}"
 
 
 class DrawIOGenerator:
@@ -10,17 +89,234 @@ class DrawIOGenerator:
         """
         Generate a business process flow diagram in DrawIO XML format.
 
+        Flows with more than DIAGRAM_PAGE_MAX_STEPS processes and decisions
+        are split into linked pages (see paginate_steps): each page ends
+        with an off-page connector to the next one, and branches ending on
+        an earlier page point to the end on the last page.
+
         Args:
             flow_data: Dictionary containing business process flow
 
         Returns:
             DrawIO XML string
         """
-        builder = DrawIOXMLBuilder()
+        return self.render_business_flow(flow_data)["xml"]
+
+    def render_business_flow(self, flow_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render a business flow, reusing an earlier render of the same flow.
+
+        Renders are cached by a canonical hash of the flow together with
+        GENERATOR_VERSION and the page size, so regenerated, reused and
+        re-rendered flows skip layout and XML building.
+
+        Args:
+            flow_data: Dictionary containing business process flow
+
+        Returns:
+            Dictionary with the "xml"; shared with the cache, so read-only
+        """
+        steps = len(flow_data.get("processes", [])) + len(flow_data.get("decisions", []))
+        return self._render("business_flow", flow_data, self._layout, steps=steps)
+
+    def render(self, diagram_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render a diagram of any supported type.
+
+        Args:
+            diagram_type: "business_flow", "ui_flow" or "prototype"
+            data: Parsed diagram data of that type
 
-        # Store all nodes for tracking connections
-        nodes: List[Dict[str, Any]] = []
-        node_map: Dict[str, str] = {}  # name -> cell_id
+        Returns:
+            Dictionary with the "xml", as render_business_flow
+        """
+        if diagram_type == "ui_flow":
+            return self.render_ui_flow(data)
+        if diagram_type == "prototype":
+            return self.render_prototype(data)
+        return self.render_business_flow(data)
+
+    def render_ui_flow(self, ui_flow: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render a UI flow: screens on a grid, navigations as labelled edges.
+
+        Args:
+            ui_flow: Dictionary with screens and transitions
+
+        Returns:
+            Dictionary with the "xml", cached like business flows
+        """
+        return self._render("ui_flow", ui_flow, self._layout_ui_flow,
+                            steps=len(ui_flow.get("screens", [])))
+
+    def render_prototype(self, prototype: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Render a low-fidelity prototype: one frame per screen with its
+        components stacked inside.
+
+        Args:
+            prototype: Dictionary with screens and their components
+
+        Returns:
+            Dictionary with the "xml", cached like business flows
+        """
+        return self._render("prototype", prototype, self._layout_prototype,
+                            steps=len(prototype.get("screens", [])))
+
+    def _render(
+        self,
+        kind: str,
+        data: Dict[str, Any],
+        layout: Callable[[Dict[str, Any]], DrawIOXMLBuilder],
+        steps: int
+    ) -> Dict[str, Any]:
+        """
+        Lay out and build a diagram unless the render cache has it.
+
+        Args:
+            kind: Diagram type, part of the cache key
+            data: Diagram data
+            layout: Function placing the cells of the diagram
+            steps: Size of the diagram, recorded on the layout span
+
+        Returns:
+            Dictionary with the "xml"
+        """
+        settings = get_settings()
+        cache = get_render_cache() if settings.RENDER_CACHE_ENABLED else None
+        key = f"{GENERATOR_VERSION}:{kind}:{settings.DIAGRAM_PAGE_MAX_STEPS}:{flow_hash(data)}"
+        with span("diagram.render", diagram_type=kind) as render_span:
+            render = cache.get(key) if cache is not None else None
+            render_span.set_attribute("cache", "hit" if render is not None else "miss")
+            if render is not None:
+                return render
+
+            with span("diagram.layout", steps=steps) as layout_span:
+                builder = layout(data)
+                layout_span.set_attribute("pages", len(builder.pages))
+            with span("diagram.xml_build"):
+                render = {"xml": builder.build()}
+            if cache is not None:
+                cache.put(key, render)
+            return render
+
+    def _layout_ui_flow(self, ui_flow: Dict[str, Any]) -> DrawIOXMLBuilder:
+        """
+        Place the screens of a UI flow row by row, in the order given.
+
+        Args:
+            ui_flow: Dictionary with screens and transitions
+
+        Returns:
+            Builder holding the laid-out diagram
+        """
+        builder = DrawIOXMLBuilder(page_name="UI Flow")
+        used_ids: Set[str] = set()
+        screen_ids: Dict[str, str] = {}
+
+        for index, screen in enumerate(ui_flow.get("screens", [])):
+            name = screen.get("name", "页面")
+            description = screen.get("description")
+            row, column = divmod(index, UI_FLOW_COLUMNS)
+            label = escape(name)
+            if description:
+                label += f"<br><font style=\"font-size:10px\">{escape(description)}</font>"
+            screen_ids[name] = builder.add_node(
+                label=label,
+                x=60 + column * 280,
+                y=60 + row * 200,
+                width=180,
+                height=100,
+                node_type="screen",
+                cell_id=_stable_cell_id("screen", name, used_ids)
+            )
+
+        for transition in ui_flow.get("transitions", []):
+            source_id = screen_ids.get(transition.get("source"))
+            target_id = screen_ids.get(transition.get("target"))
+            if source_id is None or target_id is None:
+                continue
+            action = transition.get("action", "")
+            builder.add_edge(
+                source_id,
+                target_id,
+                escape(action),
+                cell_id=_stable_cell_id("nav", f"{source_id}|{target_id}|{action}", used_ids)
+            )
+
+        return builder
+
+    def _layout_prototype(self, prototype: Dict[str, Any]) -> DrawIOXMLBuilder:
+        """
+        Place one frame per screen side by side, components top to bottom.
+
+        Args:
+            prototype: Dictionary with screens and their components
+
+        Returns:
+            Builder holding the laid-out diagram
+        """
+        builder = DrawIOXMLBuilder(page_name="Prototype")
+        used_ids: Set[str] = set()
+
+        for index, screen in enumerate(prototype.get("screens", [])):
+            name = screen.get("name", "页面")
+            components = screen.get("components", [])
+            frame_x = 40 + index * 300
+            heights = [_COMPONENT_HEIGHTS.get(c.get("type"), 36) for c in components]
+            # Frame and component styles render labels as HTML
+            builder.add_container(
+                escape(name),
+                x=frame_x,
+                y=40,
+                width=240,
+                height=max(400, 60 + sum(heights) + 12 * len(heights)),
+                style=_FRAME_STYLE,
+                cell_id=_stable_cell_id("frame", name, used_ids)
+            )
+
+            y = 80
+            for component, height in zip(components, heights):
+                component_type = component.get("type", "text")
+                label = component.get("label", "")
+                builder.add_node(
+                    label=escape(label),
+                    x=frame_x + 20,
+                    y=y,
+                    width=200,
+                    height=height,
+                    style=_COMPONENT_STYLES.get(component_type, _COMPONENT_STYLES["text"]),
+                    node_type="component",
+                    cell_id=_stable_cell_id("component", f"{name}|{component_type}|{label}", used_ids)
+                )
+                y += height + 12
+
+        return builder
+
+    def _layout(self, flow_data: Dict[str, Any]) -> DrawIOXMLBuilder:
+        """
+        Place the nodes and edges of a business flow.
+
+        Args:
+            flow_data: Dictionary containing business process flow
+
+        Returns:
+            Builder holding the laid-out diagram
+        """
+        processes = flow_data.get("processes", [])
+        decisions = flow_data.get("decisions", [])
+        steps = [("process", p) for p in processes] + [("decision", d) for d in decisions]
+        pages = paginate_steps(steps, get_settings().DIAGRAM_PAGE_MAX_STEPS)
+        page_ids = ["diagram"] if len(pages) == 1 else [f"page-{i + 1}" for i in range(len(pages))]
+        last_page_id = page_ids[-1]
+
+        builder = DrawIOXMLBuilder(
+            page_name="Generated Diagram" if len(pages) == 1 else _page_name(1, pages[0]),
+            page_id=page_ids[0]
+        )
+
+        # Cell IDs are unique across pages so links and diffs stay unambiguous
+        used_ids: Set[str] = set()
 
         x = 400  # Center position
         y = 50
@@ -35,88 +331,112 @@ class DrawIOGenerator:
                 y=y,
                 width=160 if node_type in ["process", "start", "end"] else 140,
                 height=60 if node_type in ["process", "start", "end"] else 80,
-                node_type=node_type
+                node_type=node_type,
+                cell_id=_stable_cell_id(node_type, name, used_ids)
             )
             return cell_id
 
-        # Add start node (中文)
-        start_id = add_node("开始", "start")
-        nodes.append({"id": start_id, "name": "开始", "type": "start"})
-        node_map["开始"] = start_id
-        y += y_increment
-
-        # Add process nodes
-        processes = flow_data.get("processes", [])
-        last_node_id = start_id
+        # Helper function to add an edge
+        def add_edge(source_id: str, target_id: str, label: str = "") -> str:
+            return builder.add_edge(
+                source_id,
+                target_id,
+                label,
+                cell_id=_stable_cell_id("edge", f"{source_id}|{target_id}|{label}", used_ids)
+            )
 
-        for process in processes:
-            name = process.get("name", "处理步骤")
-            cell_id = add_node(name, "process")
-            nodes.append({"id": cell_id, "name": name, "type": "process"})
-            node_map[name] = cell_id
+        # Helper function to add a connector to another page
+        def add_link(label: str, target_page_id: str, key: str) -> str:
+            return builder.add_page_link(
+                label,
+                x=x + 20,
+                y=y,
+                target_page_id=target_page_id,
+                cell_id=_stable_cell_id("link", key, used_ids)
+            )
 
-            # Connect from previous node
-            builder.add_edge(last_node_id, cell_id, "")
-            last_node_id = cell_id
+        for page_index, page_steps in enumerate(pages):
+            if page_index == 0:
+                # Add start node (中文)
+                last_node_id = add_node("开始", "start")
+            else:
+                builder.add_page(_page_name(page_index + 1, page_steps), page_ids[page_index])
+                y = 50
+                last_node_id = add_link(
+                    f"接 Page {page_index}", page_ids[page_index - 1], f"in|{page_index}"
+                )
             y += y_increment
 
-        # Add decision nodes with branches
-        decisions = flow_data.get("decisions", [])
-        branch_end_nodes: List[str] = []  # Track nodes that need to connect to end
-
-        for decision in decisions:
-            name = decision.get("name", "决策点")
-            true_branch = decision.get("true_branch")
-            false_branch = decision.get("false_branch")
-
-            # Add decision node
-            decision_id = add_node(name, "decision")
-            nodes.append({"id": decision_id, "name": name, "type": "decision"})
-            node_map[name] = decision_id
-
-            # Connect from previous node
-            builder.add_edge(last_node_id, decision_id, "")
-            last_node_id = decision_id
-
-            # Add branches if they exist
-            if true_branch:
-                branch_y = y + y_increment
-                true_id = add_node(true_branch, "process", offset_x=-150)
-                nodes.append({"id": true_id, "name": true_branch, "type": "process"})
-                node_map[true_branch] = true_id
-                branch_end_nodes.append(true_id)
-                # Connect "是" (Yes) branch
-                builder.add_edge(decision_id, true_id, "是")
-
-            if false_branch:
-                branch_y = y + y_increment
-                false_id = add_node(false_branch, "process", offset_x=150)
-                nodes.append({"id": false_id, "name": false_branch, "type": "process"})
-                node_map[false_branch] = false_id
-                branch_end_nodes.append(false_id)
-                # Connect "否" (No) branch
-                builder.add_edge(decision_id, false_id, "否")
-
-            if true_branch or false_branch:
-                y += y_increment * 2
-
-        # Add end node (中文)
-        # If there were branches, move end node down and connect all branch ends to it
-        if branch_end_nodes:
-            y += y_increment
+            branch_end_nodes: List[str] = []  # Track nodes that need to connect to end
+
+            for kind, item in page_steps:
+                if kind == "process":
+                    name = item.get("name", "处理步骤")
+                    cell_id = add_node(name, "process")
+
+                    # Connect from previous node
+                    add_edge(last_node_id, cell_id, "")
+                    last_node_id = cell_id
+                    y += y_increment
+                    continue
+
+                # Add decision nodes with branches
+                name = item.get("name", "决策点")
+                true_branch = item.get("true_branch")
+                false_branch = item.get("false_branch")
+
+                # Add decision node
+                decision_id = add_node(name, "decision")
+
+                # Connect from previous node
+                add_edge(last_node_id, decision_id, "")
+                last_node_id = decision_id
+
+                # Add branches if they exist
+                if true_branch:
+                    true_id = add_node(true_branch, "process", offset_x=-150)
+                    branch_end_nodes.append(true_id)
+                    # Connect "是" (Yes) branch
+                    add_edge(decision_id, true_id, "是")
+
+                if false_branch:
+                    false_id = add_node(false_branch, "process", offset_x=150)
+                    branch_end_nodes.append(false_id)
+                    # Connect "否" (No) branch
+                    add_edge(decision_id, false_id, "否")
+
+                if true_branch or false_branch:
+                    y += y_increment * 2
+
+            # If there were branches, move the page end down
+            if branch_end_nodes:
+                y += y_increment
+
+            if page_index < len(pages) - 1:
+                # Continue the main path on the next page
+                next_id = add_link(
+                    f"续 Page {page_index + 2}", page_ids[page_index + 1], f"out|{page_index}"
+                )
+                add_edge(last_node_id, next_id, "")
+                if branch_end_nodes:
+                    y += y_increment
+                    end_link_id = add_link("结束", last_page_id, f"end|{page_index}")
+                    for branch_end_id in branch_end_nodes:
+                        add_edge(branch_end_id, end_link_id, "")
+                continue
+
+            # Add end node (中文)
+            end_id = add_node("结束", "end")
+
+            # Connect the last sequential node to end; branches ending on
+            # earlier pages already point here through their end connectors
+            if branch_end_nodes:
+                # If this page has branches, connect all branch ends to end
+                for branch_end_id in branch_end_nodes:
+                    add_edge(branch_end_id, end_id, "")
+            else:
+                # No branches, just connect sequentially
+                if last_node_id != end_id:
+                    add_edge(last_node_id, end_id, "")
 
-        end_id = add_node("结束", "end")
-        nodes.append({"id": end_id, "name": "结束", "type": "end"})
-        node_map["结束"] = end_id
-
-        # Connect the last sequential node to end
-        if branch_end_nodes:
-            # If there were branches, connect all branch ends to end
-            for branch_end_id in branch_end_nodes:
-                builder.add_edge(branch_end_id, end_id, "")
-        else:
-            # No branches, just connect sequentially
-            if last_node_id != end_id:
-                builder.add_edge(last_node_id, end_id, "")
-
-        return builder.build()
+        return builder
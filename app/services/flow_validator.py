@@ -0,0 +1,178 @@
+"""Structural validation of parsed business flows."""
+import re
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Set, Tuple
+
+# Labels consisting only of punctuation or whitespace count as empty
+_MEANINGLESS_LABEL = re.compile(r"^[\W_]*$")
+
+START = "__start__"
+END = "__end__"
+
+# Issue codes the LLM can repair (the others are fixed locally)
+REPAIRABLE_CODES = {"no_processes", "dangling_branch", "dead_end"}
+
+
+@dataclass
+class FlowIssue:
+    """A structural problem found in a business flow."""
+
+    code: str
+    node: str
+    detail: str
+
+
+def _node_key(kind: str, index: int) -> str:
+    return f"{kind}:{index}"
+
+
+def build_flow_graph(flow: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, List[str]]]:
+    """
+    Build the node graph that DrawIOGenerator renders for a flow.
+
+    Processes are chained, followed by decisions; decision branches are
+    separate nodes connected to the end node, and when any branch exists
+    only branch nodes connect to the end (see
+    DrawIOGenerator.generate_business_flow_diagram).
+
+    Args:
+        flow: Parsed business flow
+
+    Returns:
+        Tuple of (labels keyed by node key, adjacency lists)
+    """
+    labels: Dict[str, str] = {START: "开始", END: "结束"}
+    edges: Dict[str, List[str]] = {START: [], END: []}
+
+    def add(key: str, label: str) -> str:
+        labels[key] = label
+        edges.setdefault(key, [])
+        return key
+
+    last = START
+    for i, process in enumerate(flow.get("processes", [])):
+        key = add(_node_key("process", i), process.get("name") or "")
+        edges[last].append(key)
+        last = key
+
+    branch_ends: List[str] = []
+    for i, decision in enumerate(flow.get("decisions", [])):
+        key = add(_node_key("decision", i), decision.get("name") or "")
+        edges[last].append(key)
+        last = key
+        for side in ("true_branch", "false_branch"):
+            target = decision.get(side)
+            if target:
+                branch = add(f"{key}:{side}", target)
+                edges[key].append(branch)
+                branch_ends.append(branch)
+
+    if branch_ends:
+        for branch in branch_ends:
+            edges[branch].append(END)
+    elif last != START:
+        edges[last].append(END)
+    return labels, edges
+
+
+def _reachable(start: str, edges: Dict[str, List[str]]) -> Set[str]:
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for target in edges.get(queue.popleft(), []):
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    return seen
+
+
+def validate_flow(flow: Dict[str, Any]) -> List[FlowIssue]:
+    """
+    Check a parsed flow for structural problems in O(nodes + edges).
+
+    Reported codes:
+        no_processes: Nothing usable was parsed
+        empty_label: A step or decision without a meaningful name
+        duplicate_name: A name used by more than one step or decision
+        dangling_branch: A decision without both a yes and a no branch
+        dead_end: A node from which the end cannot be reached
+        unreachable: A node that cannot be reached from the start
+
+    Args:
+        flow: Parsed business flow with processes and decisions
+
+    Returns:
+        Issues found, empty if the flow is valid
+    """
+    processes = flow.get("processes", [])
+    decisions = flow.get("decisions", [])
+    if not processes and not decisions:
+        return [FlowIssue("no_processes", START, "no PROCESS or DECISION lines were parsed")]
+
+    issues: List[FlowIssue] = []
+    seen_names: Set[str] = set()
+    items = [("process", i, p) for i, p in enumerate(processes)] + \
+        [("decision", i, d) for i, d in enumerate(decisions)]
+    for kind, i, item in items:
+        name = (item.get("name") or "").strip()
+        key = _node_key(kind, i)
+        if _MEANINGLESS_LABEL.match(name):
+            issues.append(FlowIssue("empty_label", key, f"{kind} #{i + 1} has no name"))
+            continue
+        if name in seen_names:
+            issues.append(FlowIssue("duplicate_name", key, f"'{name}' is used more than once"))
+        seen_names.add(name)
+
+    for i, decision in enumerate(decisions):
+        missing = [label for side, label in (("true_branch", "是"), ("false_branch", "否"))
+                   if not (decision.get(side) or "").strip()]
+        if missing:
+            issues.append(FlowIssue(
+                "dangling_branch",
+                _node_key("decision", i),
+                f"decision '{decision.get('name', '')}' has no {'/'.join(missing)} branch"
+            ))
+
+    labels, edges = build_flow_graph(flow)
+    reachable = _reachable(START, edges)
+    reverse: Dict[str, List[str]] = {key: [] for key in edges}
+    for source, targets in edges.items():
+        for target in targets:
+            reverse[target].append(source)
+    reaches_end = _reachable(END, reverse)
+
+    for key in labels:
+        if key in (START, END):
+            continue
+        if key not in reachable:
+            issues.append(FlowIssue("unreachable", key, f"'{labels[key]}' cannot be reached from the start"))
+        elif key not in reaches_end:
+            issues.append(FlowIssue("dead_end", key, f"the end cannot be reached from '{labels[key]}'"))
+    return issues
+
+
+def fix_locally(flow: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fix the issues that need no LLM: drop unnamed and repeated steps.
+
+    Args:
+        flow: Parsed business flow
+
+    Returns:
+        New flow without empty or duplicate processes and decisions
+    """
+    seen: Set[str] = set()
+
+    def keep(item: Dict[str, Any]) -> bool:
+        name = (item.get("name") or "").strip()
+        if _MEANINGLESS_LABEL.match(name) or name in seen:
+            return False
+        seen.add(name)
+        return True
+
+    return {
+        **flow,
+        "processes": [p for p in flow.get("processes", []) if keep(p)],
+        "decisions": [d for d in flow.get("decisions", []) if keep(d)],
+    }
@@ -0,0 +1,125 @@
+"""Import of existing .drawio files as diagrams of a conversation."""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.conversation import Conversation
+from app.models.design import Design
+from app.models.diagram import Diagram
+from app.models.message import Message
+from app.services.flow_validator import fix_locally, validate_flow
+from app.services.search_service import SearchService
+from app.services.similar_flow_service import format_flow
+from app.utils.drawio_import import ImportedPage, page_to_flow
+from app.utils.metrics import metrics
+
+
+class DrawIOImportService:
+    """
+    Store the pages of an imported .drawio file.
+
+    Every page becomes a business_flow diagram of one design, keeping the
+    original layout as uncompressed XML and the flow mapped onto the
+    processes/decisions model in flow_data. Refining the imported diagram
+    in the chat then extends that flow (see ChatPipeline).
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the import service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    def import_pages(
+        self,
+        pages: List[ImportedPage],
+        filename: str,
+        conversation: Optional[Conversation] = None
+    ) -> Dict[str, Any]:
+        """
+        Save imported pages as a design with one diagram per page.
+
+        Args:
+            pages: Pages returned by DrawIOStreamParser
+            filename: Name of the uploaded file
+            conversation: Conversation to add the design to; a new one
+                titled after the file is created if None
+
+        Returns:
+            Dictionary with conversation_id, design_id, the assistant
+            message, per-page diagram summaries and the first page as
+            generated_content
+        """
+        db = self.db
+        try:
+            if conversation is None:
+                conversation = Conversation(title=filename[:255], status="active")
+                db.add(conversation)
+                db.flush()
+
+            design = Design(
+                conversation_id=conversation.id,
+                name=filename[:255],
+                description=f"Imported from {filename}"
+            )
+            db.add(design)
+            db.flush()
+
+            search_service = SearchService(db)
+            diagrams = []
+            summaries = []
+            for page in pages:
+                flow = page_to_flow(page)
+                issues = validate_flow(flow)
+                flow = fix_locally(flow)
+                diagram = Diagram(
+                    design_id=design.id,
+                    diagram_type="business_flow",
+                    title=page.name[:255],
+                    drawio_xml=page.to_xml(),
+                    flow_data=flow
+                )
+                db.add(diagram)
+                db.flush()
+                search_service.index_diagram(diagram, conversation.id)
+                diagrams.append((diagram, flow))
+                summaries.append({
+                    "diagram_id": diagram.id,
+                    "title": diagram.title,
+                    "processes": len(flow["processes"]),
+                    "decisions": len(flow["decisions"]),
+                    "issues": sorted({issue.code for issue in issues}),
+                })
+
+            content = (
+                f"Imported **{filename}** with {len(pages)} page(s). "
+                "Describe how the flow should be extended or changed."
+            )
+            bot_message = Message(conversation_id=conversation.id, role="assistant", content=content)
+            db.add(bot_message)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+        metrics.inc("drawio_imports_total")
+        metrics.inc("drawio_imported_pages_total", len(pages))
+        first, first_flow = diagrams[0]
+        return {
+            "conversation_id": conversation.id,
+            "design_id": design.id,
+            "message_id": bot_message.id,
+            "message": content,
+            "diagrams": summaries,
+            "generated_content": {
+                "business_flow": {
+                    "diagram_id": first.id,
+                    "mode": "full",
+                    "preview": format_flow(first_flow),
+                    "xml": first.drawio_xml,
+                }
+            },
+        }
@@ -1,33 +1,70 @@
 """LangChain service for AI-powered content generation."""
 import re
-from typing import Dict, Any, List, Optional
-from langchain_openai import ChatOpenAI
-from langchain.schema import HumanMessage, SystemMessage
+from typing import Dict, Any, List, Optional, Tuple
+from langchain_core.messages import HumanMessage, SystemMessage
 from app.config import get_settings
 from app.prompts import (
     BUSINESS_FLOW_SYSTEM_PROMPT,
-    BUSINESS_FLOW_USER_PROMPT
+    BUSINESS_FLOW_USER_PROMPT,
+    BUSINESS_FLOW_REPAIR_PROMPT,
+    DESIGN_SYSTEM_PROMPT,
+    DESIGN_USER_PROMPT,
+    BUSINESS_FLOW_TASK,
+    UI_FLOW_TASK,
+    PROTOTYPE_TASK
 )
+from app.services.flow_validator import (
+    REPAIRABLE_CODES,
+    FlowIssue,
+    fix_locally,
+    validate_flow
+)
+from app.services.llm_router import ProgressCallback, get_llm_router
+from app.services.prompt_assembler import PromptAssembler
+from app.services.similar_flow_service import format_flow
+from app.utils.deadline import DeadlineExceededError
+from app.utils.metrics import metrics
+from app.utils.token_estimator import truncate_to_tokens
+from app.utils.tracing import span
+
+# PROCESS / DECISION lines, optionally prefixed by list markers
+_LINE_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)、])?\s*\**(PROCESS|DECISION)\**\s*[:：]\s*(.*)$", re.IGNORECASE)
+_ACTOR_PATTERN = re.compile(r"\[\s*actor\s*=\s*([^\]]+)\]", re.IGNORECASE)
+_BRANCH_PATTERN = re.compile(r"^(是|否|yes|no)\s*[:：]\s*(.*)$", re.IGNORECASE)
+
+# SCREEN / NAV / COMPONENT lines of UI flows and prototypes
+_DESIGN_LINE_PATTERN = re.compile(
+    r"^\s*(?:[-*•]|\d+[.)、])?\s*\**(SCREEN|NAV|COMPONENT)\**\s*[:：]\s*(.*)$", re.IGNORECASE
+)
+_DESCRIPTION_PATTERN = re.compile(r"\[\s*description\s*=\s*\"?([^\"\]]*)\"?\s*\]", re.IGNORECASE)
+_ACTION_PATTERN = re.compile(r"\[\s*action\s*=\s*\"?([^\"\]]*)\"?\s*\]", re.IGNORECASE)
+
+# Task appended to the shared multi-diagram prompt per diagram type
+DIAGRAM_TASKS = {
+    "business_flow": BUSINESS_FLOW_TASK,
+    "ui_flow": UI_FLOW_TASK,
+    "prototype": PROTOTYPE_TASK,
+}
+
+# Tokens of requirements included in a repair prompt
+_REPAIR_REQUIREMENTS_TOKENS = 500
 
 
 class LangChainService:
-    """Service for interacting with OpenAI via LangChain."""
+    """Service for interacting with OpenAI-compatible backends via LangChain."""
 
     def __init__(self):
-        """Initialize the LangChain service with OpenAI configuration."""
-        settings = get_settings()
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            max_tokens=settings.OPENAI_MAX_TOKENS,
-            openai_api_key=settings.OPENAI_API_KEY,
-            base_url=settings.OPENAI_API_BASE,
-        )
+        """Initialize the LangChain service with the shared LLM router."""
+        self.router = get_llm_router()
+        self.prompt_assembler = PromptAssembler()
 
     async def generate_business_flow(
         self,
         requirements: str,
-        conversation_history: Optional[List[Dict[str, str]]] = None
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        on_progress: Optional[ProgressCallback] = None,
+        reference_flow: Optional[Dict[str, Any]] = None,
+        shared_prompt: bool = False
     ) -> Dict[str, Any]:
         """
         Generate business process flow diagram.
@@ -35,68 +72,396 @@ class LangChainService:
         Args:
             requirements: User requirements
             conversation_history: Optional conversation history
+            on_progress: Optional coroutine receiving the response text
+                streamed so far
+            reference_flow: Optional flow of similar earlier requirements,
+                included as a few-shot example
+            shared_prompt: Use the multi-diagram prompt shared with the
+                other diagram types generated in the same turn
 
         Returns:
             Dictionary containing business flow data
+
+        Raises:
+            LLMTimeoutError: If the request's deadline leaves no time for
+                the response; it carries the text streamed so far
         """
-        # Build conversation context
-        history_str = self._format_conversation_history(conversation_history or [])
+        messages = self._messages(
+            requirements,
+            conversation_history,
+            reference_flow,
+            task="business_flow" if shared_prompt else None
+        )
+        response = await self.router.ainvoke(messages, on_progress=on_progress)
 
-        messages = [
-            SystemMessage(content=BUSINESS_FLOW_SYSTEM_PROMPT),
-            HumanMessage(content=BUSINESS_FLOW_USER_PROMPT.format(
-                requirements=requirements,
-                conversation_history=history_str
-            ))
-        ]
+        # Parse response into structured business flow, repairing
+        # structural problems before falling back to a generic flow
+        with span("flow.parse", chars=len(response.content)) as parse_span:
+            flow = self._extract_flow(response.content)
+            parse_span.set_attributes(
+                processes=len(flow["processes"]),
+                decisions=len(flow["decisions"])
+            )
+        with span("flow.validate") as validate_span:
+            flow, issues, repaired = await self._validate_and_repair(flow, requirements)
+            validate_span.set_attributes(issues=len(issues), repaired=repaired)
+        business_flow = self._with_fallback(flow)
+
+        return {
+            "business_flow": business_flow,
+            "raw_response": response.content,
+            "backend": response.backend,
+            "repaired": repaired,
+            "validation_issues": [issue.code for issue in issues]
+        }
+
+    async def generate_design_diagram(
+        self,
+        diagram_type: str,
+        requirements: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        reference_flow: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a UI flow or prototype with the shared multi-diagram prompt.
+
+        Args:
+            diagram_type: "ui_flow" or "prototype"
+            requirements: User requirements
+            conversation_history: Optional conversation history
+            reference_flow: Reference flow of the turn, kept identical
+                across diagram types so that their prompts share a prefix
 
-        response = await self.llm.ainvoke(messages)
+        Returns:
+            Dictionary with the parsed data, raw_response and backend
+
+        Raises:
+            ValueError: If no screens could be parsed from the response
+            LLMTimeoutError: If the request's deadline ran out
+        """
+        messages = self._messages(requirements, conversation_history, reference_flow, task=diagram_type)
+        response = await self.router.ainvoke(messages, purpose=diagram_type)
 
-        # Parse response into structured business flow
-        business_flow = self._parse_business_flow(response.content)
+        with span("diagram.parse", diagram_type=diagram_type, chars=len(response.content)) as parse_span:
+            if diagram_type == "ui_flow":
+                data = self.parse_ui_flow(response.content)
+            else:
+                data = self.parse_prototype(response.content)
+            parse_span.set_attribute("screens", len(data["screens"]))
+        if not data["screens"]:
+            raise ValueError(f"No screens could be parsed from the {diagram_type} response")
 
         return {
-            "business_flow": business_flow,
-            "raw_response": response.content
+            "data": data,
+            "raw_response": response.content,
+            "backend": response.backend
         }
 
-    def _format_conversation_history(self, history: List[Dict[str, str]]) -> str:
-        """Format conversation history for prompt."""
-        if not history:
-            return "无历史对话"
+    def _messages(
+        self,
+        requirements: str,
+        conversation_history: Optional[List[Dict[str, str]]],
+        reference_flow: Optional[Dict[str, Any]],
+        task: Optional[str] = None
+    ) -> List[Any]:
+        """
+        Build the chat messages within the token budget, static prefix first.
+
+        Args:
+            requirements: User requirements
+            conversation_history: Optional conversation history
+            reference_flow: Optional reference flow
+            task: Diagram type for the shared multi-diagram prompt, or None
+                for the business flow prompt
+
+        Returns:
+            System and human message
+        """
+        reference = format_flow(reference_flow) if reference_flow else None
+        with span("prompt.assemble", history=len(conversation_history or []), task=task):
+            if task is None:
+                prompt = self.prompt_assembler.assemble(
+                    BUSINESS_FLOW_SYSTEM_PROMPT,
+                    BUSINESS_FLOW_USER_PROMPT,
+                    requirements,
+                    conversation_history or [],
+                    reference=reference
+                )
+            else:
+                prompt = self.prompt_assembler.assemble(
+                    DESIGN_SYSTEM_PROMPT,
+                    DESIGN_USER_PROMPT,
+                    requirements,
+                    conversation_history or [],
+                    reference=reference,
+                    task=DIAGRAM_TASKS[task]
+                )
+        return [
+            SystemMessage(content=prompt.system),
+            HumanMessage(content=prompt.user)
+        ]
+
+    async def _validate_and_repair(
+        self,
+        flow: Dict[str, Any],
+        requirements: str
+    ) -> Tuple[Dict[str, Any], List[FlowIssue], bool]:
+        """
+        Validate a parsed flow and repair what is broken.
+
+        Empty and duplicate names are fixed locally. Missing branches,
+        dead ends and unparsable output are sent back to the LLM in a
+        small prompt containing only the broken fragment.
+
+        Args:
+            flow: Parsed business flow
+            requirements: User requirements
+
+        Returns:
+            Tuple of (flow, remaining issues, whether a repair was applied)
+        """
+        issues = validate_flow(flow)
+        if not issues:
+            return flow, issues, False
+        for issue in issues:
+            metrics.inc("flow_validation_issues_total", code=issue.code)
+
+        repaired = False
+        if any(issue.code in ("empty_label", "duplicate_name") for issue in issues):
+            flow = fix_locally(flow)
+            issues = validate_flow(flow)
+            repaired = True
+            metrics.inc("flow_repairs_total", outcome="local")
+
+        repairable = [issue for issue in issues if issue.code in REPAIRABLE_CODES]
+        if not repairable or not get_settings().FLOW_REPAIR_ENABLED:
+            return flow, issues, repaired
+
+        try:
+            fixed = await self._repair_fragment(flow, repairable, requirements)
+        except DeadlineExceededError:
+            metrics.inc("flow_repairs_total", outcome="timeout")
+            return flow, issues, repaired
+        except Exception:
+            metrics.inc("flow_repairs_total", outcome="error")
+            return flow, issues, repaired
+
+        fixed_issues = validate_flow(fixed)
+        if len(fixed_issues) < len(issues):
+            metrics.inc("flow_repairs_total", outcome="llm_fixed")
+            return fixed, fixed_issues, True
+        metrics.inc("flow_repairs_total", outcome="llm_failed")
+        return flow, issues, repaired
+
+    async def _repair_fragment(
+        self,
+        flow: Dict[str, Any],
+        issues: List[FlowIssue],
+        requirements: str
+    ) -> Dict[str, Any]:
+        """
+        Ask the LLM to rewrite only the broken part of a flow.
+
+        Args:
+            flow: Parsed business flow
+            issues: Repairable issues of the flow
+            requirements: User requirements
+
+        Returns:
+            Flow with the repaired fragment merged in
+        """
+        broken = sorted({
+            int(issue.node.split(":")[1])
+            for issue in issues
+            if issue.node.startswith("decision:")
+        })
+        if any(issue.code == "no_processes" for issue in issues):
+            fragment = "（未能解析出任何流程步骤，请输出完整流程）"
+        else:
+            fragment = format_flow({"processes": [], "decisions": [flow["decisions"][i] for i in broken]})
+
+        prompt = BUSINESS_FLOW_REPAIR_PROMPT.format(
+            issues="\n".join(f"- {issue.detail}" for issue in issues),
+            fragment=fragment,
+            requirements=truncate_to_tokens(requirements, _REPAIR_REQUIREMENTS_TOKENS)
+        )
+        response = await self.router.ainvoke([
+            SystemMessage(content=BUSINESS_FLOW_SYSTEM_PROMPT),
+            HumanMessage(content=prompt)
+        ], purpose="repair")
+        patch = self._extract_flow(response.content)
+
+        if not broken:
+            return patch
+
+        # Merge repaired decisions by name, falling back to position
+        by_name = {d["name"]: d for d in patch["decisions"]}
+        decisions = list(flow["decisions"])
+        for position, index in enumerate(broken):
+            original = decisions[index]
+            replacement = by_name.get(original["name"])
+            if replacement is None and position < len(patch["decisions"]):
+                replacement = patch["decisions"][position]
+            if replacement is not None:
+                decisions[index] = {
+                    "name": original["name"],
+                    "true_branch": original.get("true_branch") or replacement.get("true_branch"),
+                    "false_branch": original.get("false_branch") or replacement.get("false_branch"),
+                }
+        return {**flow, "decisions": decisions}
+
+    @staticmethod
+    def parse_partial_flow(text: str) -> Dict[str, Any]:
+        """
+        Parse the complete lines of a partially streamed response.
+
+        Unlike _parse_business_flow no generic fallback is added, so an
+        empty result means nothing usable has streamed yet.
+        """
+        return LangChainService._extract_flow(text[:text.rfind("\n") + 1])
+
+    @staticmethod
+    def parse_ui_flow(text: str) -> Dict[str, Any]:
+        """
+        Extract SCREEN and NAV lines of a UI flow.
+
+        Lines look like `SCREEN: 名称 [description="..."]` and
+        `NAV: 页面A -> 页面B [action="..."]`. Pages only named in a NAV
+        line are added as screens.
+
+        Returns:
+            Dictionary with screens ({name, description}) and transitions
+            ({source, target, action})
+        """
+        screens: Dict[str, Dict[str, Any]] = {}
+        transitions = []
+        for line in text.splitlines():
+            match = _DESIGN_LINE_PATTERN.match(line)
+            if not match:
+                continue
+            kind, body = match.group(1).upper(), match.group(2)
+            if kind == "SCREEN":
+                name = body.split("[", 1)[0].strip()
+                description = _DESCRIPTION_PATTERN.search(body)
+                if name and name not in screens:
+                    screens[name] = {
+                        "name": name,
+                        "description": description.group(1).strip() if description else ""
+                    }
+            elif kind == "NAV":
+                head, _, tail = body.partition("->")
+                source = head.strip()
+                target = tail.split("[", 1)[0].strip()
+                if not source or not target:
+                    continue
+                for name in (source, target):
+                    screens.setdefault(name, {"name": name, "description": ""})
+                action = _ACTION_PATTERN.search(tail)
+                transitions.append({
+                    "source": source,
+                    "target": target,
+                    "action": action.group(1).strip() if action else ""
+                })
+        return {"screens": list(screens.values()), "transitions": transitions}
+
+    @staticmethod
+    def parse_prototype(text: str) -> Dict[str, Any]:
+        """
+        Extract SCREEN and COMPONENT lines of a prototype.
 
-        formatted = []
-        for msg in history[-5:]:  # Only include last 5 messages
-            role = msg.get("role", "unknown")
-            content = msg.get("content", "")
-            role_zh = "用户" if role == "user" else "助手"
-            formatted.append(f"{role_zh}: {content}")
+        Components (`COMPONENT: 类型 | 文字`) belong to the SCREEN line
+        before them.
 
-        return "\n".join(formatted)
+        Returns:
+            Dictionary with screens ({name, components: [{type, label}]})
+        """
+        screens: List[Dict[str, Any]] = []
+        for line in text.splitlines():
+            match = _DESIGN_LINE_PATTERN.match(line)
+            if not match:
+                continue
+            kind, body = match.group(1).upper(), match.group(2).strip()
+            if kind == "SCREEN":
+                name = body.split("[", 1)[0].strip()
+                if name:
+                    screens.append({"name": name, "components": []})
+            elif kind == "COMPONENT" and body:
+                if "|" in body:
+                    component_type, _, label = body.partition("|")
+                else:
+                    component_type, _, label = body.partition(" ")
+                if not screens:
+                    screens.append({"name": "页面", "components": []})
+                screens[-1]["components"].append({
+                    "type": component_type.strip().lower() or "text",
+                    "label": label.strip()
+                })
+        return {"screens": screens}
 
     def _parse_business_flow(self, text: str) -> Dict[str, Any]:
         """Parse business flow response into structured data."""
+        return self._with_fallback(self._extract_flow(text))
+
+    @staticmethod
+    def _with_fallback(flow: Dict[str, Any]) -> Dict[str, Any]:
+        """Substitute a generic flow when nothing usable could be parsed."""
+        # If no structured data, create generic flow (中文)
+        if not flow["processes"]:
+            flow["processes"].append({"name": "开始", "actor": "用户"})
+            flow["processes"].append({"name": "处理请求", "actor": "系统"})
+            flow["processes"].append({"name": "完成", "actor": "系统"})
+
+        return flow
+
+    @staticmethod
+    def _extract_flow(text: str) -> Dict[str, Any]:
+        """
+        Extract PROCESS and DECISION lines from response text.
+
+        Lines look like `PROCESS: 名称 [actor=角色] [description="..."]` and
+        `DECISION: 名称 [condition="..."] -> 是:步骤A, 否:步骤B`; the
+        unlabelled form `-> 步骤A, 步骤B` is read as yes/no in that order.
+        """
         processes = []
         decisions = []
 
-        # Extract processes - 支持中文字符
-        process_pattern = r"PROCESS:\s*([^\[\n]+?)(?:\s*\[actor=([^\[\]]+)\])?"
-        for match in re.finditer(process_pattern, text, re.IGNORECASE):
-            name = match.group(1).strip()
-            actor = match.group(2).strip() if match.group(2) else "系统"
-            if name and not name.startswith("DECISION"):
-                processes.append({
-                    "name": name,
-                    "actor": actor
-                })
+        for line in text.splitlines():
+            match = _LINE_PATTERN.match(line)
+            if not match:
+                continue
+            kind, body = match.group(1).upper(), match.group(2)
 
-        # Extract decisions - 支持中文 "是/否" 和英文 "Yes/No"
-        # 格式: DECISION: 决策名称 -> 是:步骤A, 否:步骤B 或 DECISION: 决策名称 -> Yes:StepA, No:StepB
-        decision_pattern = r"DECISION:\s*([^-[\n]+?)\s*(?:->\s*(?:是|Yes):\s*([^\n,]+?)(?:\s*,\s*(?:否|No):\s*([^\n]+?))?)?"
-        for match in re.finditer(decision_pattern, text, re.IGNORECASE):
-            name = match.group(1).strip() if match.group(1) else ""
-            true_branch = match.group(2).strip() if match.group(2) else None
-            false_branch = match.group(3).strip() if match.group(3) else None
+            if kind == "PROCESS":
+                name = body.split("[", 1)[0].strip()
+                actor_match = _ACTOR_PATTERN.search(body)
+                if name:
+                    processes.append({
+                        "name": name,
+                        "actor": actor_match.group(1).strip() if actor_match else "系统"
+                    })
+                continue
+
+            # 支持中文 "是/否" 和英文 "Yes/No"
+            head, _, tail = body.partition("->")
+            name = head.split("[", 1)[0].strip()
+            true_branch = None
+            false_branch = None
+            unlabelled = []
+            for part in re.split(r"[,，;；]", tail):
+                part = part.strip()
+                if not part:
+                    continue
+                branch = _BRANCH_PATTERN.match(part)
+                if branch is None:
+                    unlabelled.append(part)
+                elif branch.group(1).lower() in ("是", "yes"):
+                    true_branch = branch.group(2).strip() or None
+                else:
+                    false_branch = branch.group(2).strip() or None
+            if true_branch is None and unlabelled:
+                true_branch = unlabelled.pop(0)
+            if false_branch is None and unlabelled:
+                false_branch = unlabelled.pop(0)
 
             if name:
                 decisions.append({
@@ -105,10 +470,4 @@ class LangChainService:
                     "false_branch": false_branch
                 })
 
-        # If no structured data, create generic flow (中文)
-        if not processes:
-            processes.append({"name": "开始", "actor": "用户"})
-            processes.append({"name": "处理请求", "actor": "系统"})
-            processes.append({"name": "完成", "actor": "系统"})
-
         return {"processes": processes, "decisions": decisions}
@@ -0,0 +1,668 @@
+"""Routing of LLM calls across multiple OpenAI-compatible backends."""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import get_settings
+from app.utils.deadline import DeadlineExceededError, current_deadline
+from app.utils.metrics import metrics, quantile
+from app.utils.tracing import span
+
+# Minimum number of first-token samples before the hedge delay follows p95
+_MIN_LATENCY_SAMPLES = 20
+
+# Callback receiving the full text streamed so far by the winning backend
+ProgressCallback = Callable[[str], Awaitable[None]]
+
+
+class NoBackendAvailableError(RuntimeError):
+    """Raised when every backend is unavailable or has failed."""
+
+
+class LLMTimeoutError(DeadlineExceededError):
+    """Raised when an LLM call runs out of time; carries the text streamed so far."""
+
+    def __init__(self, partial_text: str):
+        super().__init__("llm")
+        self.partial_text = partial_text
+
+
+@dataclass
+class LLMBackend:
+    """An OpenAI-compatible chat completion backend."""
+
+    name: str
+    base_url: str
+    model: str
+    api_key: str = ""
+    weight: float = 1.0
+
+
+@dataclass
+class RouterResult:
+    """Result of a routed LLM call."""
+
+    content: str
+    backend: str
+    model: str
+    hedged: bool = False
+    first_token_latency: float = 0.0
+    latency: float = 0.0
+    usage: Optional[Dict[str, Any]] = None
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects requests for `reset_timeout` seconds, then lets a single probe
+    request through (half-open). A successful probe closes it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started_at: Optional[float] = None
+
+    def available(self) -> bool:
+        """
+        Return True if allow_request() would let a request through.
+
+        Unlike allow_request(), this changes no state, so it can be used to
+        look at backends that may not be tried.
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return now - self.opened_at >= self.reset_timeout
+        return self._probe_started_at is None or now - self._probe_started_at >= self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """
+        Return True if a request may be sent to the backend.
+
+        In half-open state this claims the single probe slot, so call it
+        only when the request is actually sent.
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_started_at = None
+        if self.state == self.HALF_OPEN:
+            # Allow one probe at a time; a probe that never reported back
+            # is given up after another reset period.
+            if self._probe_started_at is None or now - self._probe_started_at >= self.reset_timeout:
+                self._probe_started_at = now
+                return True
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful request."""
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_started_at = None
+
+    def record_failure(self) -> bool:
+        """
+        Record a failed request.
+
+        Returns:
+            True if this failure tripped the breaker open
+        """
+        self.failures += 1
+        self._probe_started_at = None
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            tripped = self.state != self.OPEN
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            return tripped
+        return False
+
+
+class _Attempt:
+    """A single in-flight request to one backend."""
+
+    def __init__(self, backend: LLMBackend, hedge: bool):
+        self.backend = backend
+        self.hedge = hedge
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.text = ""
+        self.on_progress: Optional[ProgressCallback] = None
+
+    def append(self, chunk: Any) -> None:
+        content = getattr(chunk, "content", "")
+        if isinstance(content, str):
+            self.text += content
+
+
+def _default_client_factory(backend: LLMBackend):
+    """Create a LangChain chat model for a backend."""
+    from langchain_openai import ChatOpenAI
+
+    settings = get_settings()
+    return ChatOpenAI(
+        model=backend.model,
+        temperature=settings.OPENAI_TEMPERATURE,
+        max_tokens=settings.OPENAI_MAX_TOKENS,
+        openai_api_key=backend.api_key,
+        base_url=backend.base_url,
+        stream_usage=True,
+    )
+
+
+class LLMRouter:
+    """
+    Route chat requests over weighted backends with hedging and failover.
+
+    The primary backend is picked by weight among backends whose circuit
+    breaker is closed. If it has not streamed a first token within a delay
+    derived from its recent p95 first-token latency, a hedged request is
+    sent to a second backend and whichever answers first wins; the other
+    request is cancelled. Failed backends are failed over to the next one.
+    """
+
+    def __init__(
+        self,
+        backends: List[LLMBackend],
+        client_factory: Optional[Callable[[LLMBackend], Any]] = None,
+        hedge_enabled: Optional[bool] = None,
+        hedge_min_delay: Optional[float] = None,
+        hedge_max_delay: Optional[float] = None,
+        hedge_default_delay: Optional[float] = None,
+        first_token_timeout: Optional[float] = None,
+        breaker_failure_threshold: Optional[int] = None,
+        breaker_reset_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            backends: Backends to route between
+            client_factory: Callable creating a chat model with `astream()`
+                for a backend; defaults to ChatOpenAI
+            hedge_enabled: Whether hedged requests are sent
+            hedge_min_delay: Lower bound of the hedge delay in seconds
+            hedge_max_delay: Upper bound of the hedge delay in seconds
+            hedge_default_delay: Hedge delay used until enough samples exist
+            first_token_timeout: Seconds without a first token before an
+                attempt counts as failed
+            breaker_failure_threshold: Consecutive failures that open a breaker
+            breaker_reset_timeout: Seconds a breaker stays open
+        """
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+
+        settings = get_settings()
+        self.backends = backends
+        self.client_factory = client_factory or _default_client_factory
+        self.hedge_enabled = settings.LLM_HEDGE_ENABLED if hedge_enabled is None else hedge_enabled
+        self.hedge_min_delay = hedge_min_delay if hedge_min_delay is not None else settings.LLM_HEDGE_MIN_DELAY
+        self.hedge_max_delay = hedge_max_delay if hedge_max_delay is not None else settings.LLM_HEDGE_MAX_DELAY
+        self.hedge_default_delay = (
+            hedge_default_delay if hedge_default_delay is not None else settings.LLM_HEDGE_DEFAULT_DELAY
+        )
+        self.first_token_timeout = (
+            first_token_timeout if first_token_timeout is not None else settings.LLM_FIRST_TOKEN_TIMEOUT
+        )
+        threshold = breaker_failure_threshold or settings.LLM_BREAKER_FAILURE_THRESHOLD
+        reset = breaker_reset_timeout if breaker_reset_timeout is not None else settings.LLM_BREAKER_RESET_SECONDS
+
+        self.breakers: Dict[str, CircuitBreaker] = {
+            backend.name: CircuitBreaker(threshold, reset) for backend in backends
+        }
+        self._clients: Dict[str, Any] = {}
+        self._first_token_latencies: Dict[str, List[float]] = {b.name: [] for b in backends}
+
+        for backend in backends:
+            metrics.set_gauge("llm_breaker_open", 0, backend=backend.name)
+
+    @property
+    def primary(self) -> LLMBackend:
+        """
+        The backend with the highest weight.
+
+        It is the most likely, not the certain, first choice of a request:
+        each request picks its primary by weighted random choice among the
+        available backends (see _candidates).
+        """
+        return max(self.backends, key=lambda b: b.weight)
+
+    def get_client(self, backend: LLMBackend):
+        """Return the cached chat model for a backend, creating it on first use."""
+        client = self._clients.get(backend.name)
+        if client is None:
+            client = self.client_factory(backend)
+            self._clients[backend.name] = client
+        return client
+
+    async def warm_up(self, timeout: float = 5.0) -> Dict[str, bool]:
+        """
+        Create backend clients and open their HTTP connections.
+
+        Issues a cheap `GET /models` per backend so TLS and keep-alive
+        connections are established before the first generation request.
+        Failures are ignored; they only mean the first request pays the
+        connection cost.
+
+        Args:
+            timeout: Seconds to wait per backend
+
+        Returns:
+            Mapping of backend name to whether a connection was established
+        """
+        results: Dict[str, bool] = {}
+        for backend in self.backends:
+            try:
+                client = self.get_client(backend)
+                async_client = getattr(client, "root_async_client", None)
+                if async_client is not None:
+                    await asyncio.wait_for(async_client.models.list(), timeout=timeout)
+                results[backend.name] = True
+            except Exception as e:
+                # An HTTP error status still means the connection is open
+                results[backend.name] = getattr(e, "status_code", None) is not None
+        return results
+
+    def hedge_delay(self, backend: LLMBackend) -> float:
+        """
+        Delay after which a hedged request is sent for a backend.
+
+        Args:
+            backend: Primary backend of the request
+
+        Returns:
+            p95 of recent first-token latencies, clamped to the configured bounds
+        """
+        samples = self._first_token_latencies.get(backend.name, [])
+        if len(samples) < _MIN_LATENCY_SAMPLES:
+            delay = self.hedge_default_delay
+        else:
+            delay = quantile(samples, 0.95)
+        return min(max(delay, self.hedge_min_delay), self.hedge_max_delay)
+
+    def _candidates(self) -> List[LLMBackend]:
+        """
+        Order available backends by weighted random sampling without replacement.
+
+        Breakers are only inspected here; a half-open backend's probe slot is
+        claimed when an attempt is started on it (see _claim).
+        """
+        pool = [b for b in self.backends if self.breakers[b.name].available()]
+        ordered: List[LLMBackend] = []
+        while pool:
+            weights = [max(b.weight, 0.0001) for b in pool]
+            choice = random.choices(pool, weights=weights, k=1)[0]
+            ordered.append(choice)
+            pool.remove(choice)
+        return ordered
+
+    def _claim(self, candidates: List[LLMBackend]) -> Optional[LLMBackend]:
+        """
+        Take the next candidate whose breaker lets a request through.
+
+        Candidates whose half-open probe was claimed by a concurrent request
+        since _candidates() ran are dropped.
+
+        Args:
+            candidates: Remaining candidates, consumed from the front
+
+        Returns:
+            The backend to start an attempt on, or None if none is left
+        """
+        while candidates:
+            backend = candidates.pop(0)
+            if self.breakers[backend.name].allow_request():
+                return backend
+        return None
+
+    def _start(self, backend: LLMBackend, messages: List[Any], hedge: bool,
+               changed: asyncio.Event) -> _Attempt:
+        attempt = _Attempt(backend, hedge)
+        attempt.task = asyncio.create_task(self._run(attempt, messages, changed))
+        return attempt
+
+    async def _run(self, attempt: _Attempt, messages: List[Any], changed: asyncio.Event):
+        """Stream a response from one backend, signalling the first token."""
+        try:
+            client = self.get_client(attempt.backend)
+            stream = client.astream(messages).__aiter__()
+            try:
+                first = await asyncio.wait_for(stream.__anext__(), timeout=self.first_token_timeout)
+            except StopAsyncIteration:
+                first = None
+            attempt.first_token_at = time.monotonic()
+            changed.set()
+
+            aggregate = first
+            if first is not None:
+                attempt.append(first)
+                async for chunk in stream:
+                    aggregate = aggregate + chunk
+                    attempt.append(chunk)
+                    if attempt.on_progress is not None:
+                        try:
+                            await attempt.on_progress(attempt.text)
+                        except Exception:
+                            # A broken listener must not fail the backend
+                            attempt.on_progress = None
+            return aggregate
+        finally:
+            changed.set()
+
+    def _record_failure(self, attempt: _Attempt, error: BaseException) -> None:
+        name = attempt.backend.name
+        outcome = "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        metrics.inc("llm_requests_total", backend=name, outcome=outcome)
+        if self.breakers[name].record_failure():
+            metrics.inc("llm_breaker_trips_total", backend=name)
+            metrics.set_gauge("llm_breaker_open", 1, backend=name)
+
+    async def ainvoke(
+        self,
+        messages: List[Any],
+        on_progress: Optional[ProgressCallback] = None,
+        purpose: str = "generate",
+        timeout: Optional[float] = None
+    ) -> RouterResult:
+        """
+        Send chat messages to the best available backend.
+
+        Every call, failed ones included, is added to the usage ledger
+        when USAGE_LEDGER_ENABLED is set.
+
+        Args:
+            messages: LangChain chat messages
+            on_progress: Optional coroutine called with the full text
+                received so far from the winning backend as it streams
+            purpose: What the call is for, recorded in the usage ledger
+            timeout: Seconds the call may take; defaults to the generation
+                budget of the request's deadline, or REQUEST_DEADLINE_SECONDS
+                outside a request
+
+        Returns:
+            RouterResult with the response text and routing details
+
+        Raises:
+            NoBackendAvailableError: If every backend is open or failed
+            LLMTimeoutError: If the call did not finish in time
+        """
+        if timeout is None:
+            deadline = current_deadline()
+            if deadline is not None:
+                timeout = deadline.generation_budget()
+            else:
+                timeout = get_settings().REQUEST_DEADLINE_SECONDS or None
+
+        streamed = ""
+
+        async def track_progress(text: str) -> None:
+            nonlocal streamed
+            streamed = text
+            if on_progress is not None:
+                await on_progress(text)
+
+        started = time.monotonic()
+        with span("llm.call", messages=len(messages), purpose=purpose, timeout=timeout) as llm_span:
+            try:
+                result = await asyncio.wait_for(self._route(messages, track_progress), timeout=timeout)
+            except asyncio.CancelledError:
+                # Cancelling _route cancels the attempts, closing their streams
+                metrics.inc("llm_calls_cancelled_total", purpose=purpose)
+                _record_usage(purpose, started, None, "cancelled")
+                raise
+            except asyncio.TimeoutError:
+                metrics.inc("deadline_exceeded_total", stage="llm")
+                _record_usage(purpose, started, None, "timeout")
+                llm_span.set_attribute("partial_chars", len(streamed))
+                raise LLMTimeoutError(streamed) from None
+            except Exception:
+                _record_usage(purpose, started, None, "error")
+                raise
+            llm_span.set_attributes(**_span_attributes(result))
+        _record_usage(purpose, started, result, "ok")
+        return result
+
+    async def _route(
+        self,
+        messages: List[Any],
+        on_progress: Optional[ProgressCallback]
+    ) -> RouterResult:
+        """Race, hedge and fail over across backends (see ainvoke)."""
+        candidates = self._candidates()
+        primary = self._claim(candidates)
+        if primary is None:
+            metrics.inc("llm_rejected_total", reason="all_breakers_open")
+            raise NoBackendAvailableError("All LLM backends are unavailable")
+
+        changed = asyncio.Event()
+        attempts = [self._start(primary, messages, False, changed)]
+        hedge_at = time.monotonic() + self.hedge_delay(primary)
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        try:
+            winner: Optional[_Attempt] = None
+            while winner is None:
+                changed.clear()
+                for attempt in list(attempts):
+                    if attempt.first_token_at is not None:
+                        winner = attempt
+                        break
+                    if attempt.task.done():
+                        attempts.remove(attempt)
+                        last_error = attempt.task.exception()
+                        self._record_failure(attempt, last_error)
+                if winner is not None:
+                    break
+
+                if not attempts:
+                    # Fail over to the next backend immediately
+                    backend = self._claim(candidates)
+                    if backend is None:
+                        raise NoBackendAvailableError(
+                            f"All LLM backends failed: {last_error}"
+                        ) from last_error
+                    metrics.inc("llm_failover_total", backend=backend.name)
+                    attempts.append(self._start(backend, messages, False, changed))
+                    continue
+
+                timeout = None
+                if self.hedge_enabled and not hedged and candidates:
+                    timeout = hedge_at - time.monotonic()
+                    if timeout <= 0:
+                        backend = self._claim(candidates)
+                        if backend is None:
+                            continue
+                        hedged = True
+                        metrics.inc("llm_hedged_requests_total", primary=primary.name,
+                                    backend=backend.name)
+                        attempts.append(self._start(backend, messages, True, changed))
+                        continue
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            for attempt in attempts:
+                if attempt is not winner:
+                    self._cancel(attempt)
+                    metrics.inc("llm_hedge_cancelled_total", backend=attempt.backend.name)
+
+            if on_progress is not None:
+                winner.on_progress = on_progress
+                if winner.text:
+                    await on_progress(winner.text)
+
+            try:
+                message = await winner.task
+            except Exception as e:
+                self._record_failure(winner, e)
+                raise
+        except BaseException:
+            for attempt in attempts:
+                self._cancel(attempt)
+            raise
+
+        return self._finish(winner, message, hedged)
+
+    def _cancel(self, attempt: _Attempt) -> None:
+        """
+        Cancel an attempt that lost or is no longer needed.
+
+        Its first-token latency is still recorded as a sample; one still
+        waiting for its first token has taken at least as long as it ran.
+        Keeping only the winners' samples would bias the hedge delay low.
+        """
+        if attempt.task.done():
+            return
+        first_token_at = attempt.first_token_at or time.monotonic()
+        self._add_latency_sample(attempt.backend.name, first_token_at - attempt.started_at)
+        attempt.task.cancel()
+
+    def _add_latency_sample(self, name: str, first_token_latency: float) -> None:
+        samples = self._first_token_latencies[name]
+        samples.append(first_token_latency)
+        if len(samples) > 200:
+            del samples[:len(samples) - 200]
+
+    def _finish(self, winner: _Attempt, message: Any, hedged: bool) -> RouterResult:
+        name = winner.backend.name
+        now = time.monotonic()
+        first_token_latency = winner.first_token_at - winner.started_at
+        latency = now - winner.started_at
+
+        self.breakers[name].record_success()
+        metrics.set_gauge("llm_breaker_open", 0, backend=name)
+        metrics.inc("llm_requests_total", backend=name, outcome="success")
+        metrics.observe("llm_first_token_seconds", first_token_latency, backend=name)
+        metrics.observe("llm_latency_seconds", latency, backend=name)
+        if hedged:
+            metrics.inc("llm_hedge_wins_total", backend=name,
+                        role="hedge" if winner.hedge else "primary")
+
+        self._add_latency_sample(name, first_token_latency)
+
+        content = getattr(message, "content", "") if message is not None else ""
+        usage = getattr(message, "usage_metadata", None) if message is not None else None
+        return RouterResult(
+            content=content if isinstance(content, str) else str(content),
+            backend=name,
+            model=winner.backend.model,
+            hedged=hedged,
+            first_token_latency=first_token_latency,
+            latency=latency,
+            usage=dict(usage) if usage else None,
+        )
+
+
+def _usage_fields(result: RouterResult) -> Dict[str, Any]:
+    """
+    Extract token counts and the prompt cache outcome of a routed call.
+
+    Token counts come from the provider's usage report. The cache counts
+    as hit when cached prompt tokens are reported, as miss when zero are
+    reported, and as unknown (None) when the provider reports nothing.
+    """
+    usage = result.usage or {}
+    details = usage.get("input_token_details") or {}
+    cached = details.get("cache_read")
+    prompt_tokens = usage.get("input_tokens") or 0
+    completion_tokens = usage.get("output_tokens") or 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": usage.get("total_tokens") or prompt_tokens + completion_tokens,
+        "cached_tokens": cached,
+        "cache_hit": None if cached is None else cached > 0,
+    }
+
+
+def _span_attributes(result: RouterResult) -> Dict[str, Any]:
+    """Describe a routed call for its trace span."""
+    usage = _usage_fields(result)
+    return {
+        "backend": result.backend,
+        "model": result.model,
+        "hedged": result.hedged,
+        "first_token_ms": round(result.first_token_latency * 1000, 1),
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "cached_tokens": usage["cached_tokens"],
+        "cache": {None: "unknown", True: "hit", False: "miss"}[usage["cache_hit"]],
+    }
+
+
+def _record_usage(purpose: str, started: float, result: Optional[RouterResult], status: str) -> None:
+    """Add a call to the usage ledger when it is enabled."""
+    if not get_settings().USAGE_LEDGER_ENABLED:
+        return
+    from app.services.usage_ledger import get_usage_ledger
+
+    fields: Dict[str, Any] = {
+        "purpose": purpose,
+        "status": status,
+        "latency_ms": int((time.monotonic() - started) * 1000),
+    }
+    if result is not None:
+        fields.update(
+            backend=result.backend,
+            model=result.model,
+            hedged=result.hedged,
+            first_token_ms=int(result.first_token_latency * 1000),
+            **_usage_fields(result)
+        )
+    get_usage_ledger().record(**fields)
+
+
+def load_backends() -> List[LLMBackend]:
+    """
+    Build the backend list from settings.
+
+    `LLM_BACKENDS` takes precedence; entries may omit `model` and `api_key`
+    to inherit the OPENAI_* values. Without it a single backend is built
+    from OPENAI_API_BASE/OPENAI_MODEL.
+
+    Returns:
+        List of configured backends
+    """
+    settings = get_settings()
+    if not settings.LLM_BACKENDS:
+        return [LLMBackend(
+            name="default",
+            base_url=settings.OPENAI_API_BASE,
+            model=settings.OPENAI_MODEL,
+            api_key=settings.OPENAI_API_KEY,
+        )]
+
+    backends = []
+    for index, entry in enumerate(settings.LLM_BACKENDS):
+        backends.append(LLMBackend(
+            name=entry.get("name") or f"backend-{index}",
+            base_url=entry.get("base_url") or settings.OPENAI_API_BASE,
+            model=entry.get("model") or settings.OPENAI_MODEL,
+            api_key=entry.get("api_key") or settings.OPENAI_API_KEY,
+            weight=float(entry.get("weight", 1.0)),
+        ))
+    return backends
+
+
+@lru_cache()
+def get_llm_router() -> LLMRouter:
+    """Get the process-wide LLM router."""
+    return LLMRouter(load_backends())
@@ -0,0 +1,222 @@
+"""Prompt assembly with token budgeting and prefix-stable ordering."""
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from app.config import get_settings
+from app.utils.token_estimator import estimate_tokens, truncate_to_tokens
+
+# Matches the counts in the assistant summary written by the chat endpoint
+_SUMMARY_COUNT_PATTERN = re.compile(r"\*\*(\d+)\*\*")
+
+NO_HISTORY_PLACEHOLDER = "无历史对话"
+NO_REFERENCE_PLACEHOLDER = "无"
+
+
+class PromptBudgetExceededError(ValueError):
+    """Raised when the fixed prompt leaves no room for the requirements."""
+
+    def __init__(self, budget: int, fixed_tokens: int):
+        super().__init__(
+            f"Prompt token budget of {budget} leaves no room for the requirements "
+            f"after the fixed prompt ({fixed_tokens} tokens); raise PROMPT_TOKEN_BUDGET"
+        )
+        self.budget = budget
+        self.fixed_tokens = fixed_tokens
+        self.detail = str(self)
+
+
+@dataclass
+class AssembledPrompt:
+    """Result of assembling a prompt within a token budget."""
+
+    system: str
+    user: str
+    estimated_tokens: int
+    history_included: int
+    history_dropped: int
+    requirements_truncated: bool
+    reference_included: bool = False
+
+
+class PromptAssembler:
+    """
+    Assemble LLM prompts that fit into a token budget.
+
+    The system prompt and the static part of the user template always come
+    first and are never modified, so consecutive turns share an identical
+    prefix that providers can serve from their prompt cache. Variable
+    content (reference flow, history, then requirements) is appended after it.
+    The requirements are budgeted first; the reference flow and history only
+    get the tokens they leave.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        max_history_messages: Optional[int] = None,
+        assistant_max_tokens: Optional[int] = None,
+    ):
+        """
+        Initialize the prompt assembler.
+
+        Args:
+            token_budget: Maximum estimated input tokens for the whole prompt
+            max_history_messages: Maximum number of history messages considered
+            assistant_max_tokens: Maximum tokens kept per assistant message
+        """
+        settings = get_settings()
+        self.token_budget = token_budget or settings.PROMPT_TOKEN_BUDGET
+        self.max_history_messages = max_history_messages or settings.PROMPT_HISTORY_MAX_MESSAGES
+        self.assistant_max_tokens = assistant_max_tokens or settings.PROMPT_ASSISTANT_MAX_TOKENS
+
+    def assemble(
+        self,
+        system_prompt: str,
+        user_template: str,
+        requirements: str,
+        history: Optional[List[Dict[str, str]]] = None,
+        reference: Optional[str] = None,
+        task: Optional[str] = None,
+    ) -> AssembledPrompt:
+        """
+        Build the system and user prompt for a generation request.
+
+        Args:
+            system_prompt: Static system prompt
+            user_template: User prompt template with {requirements},
+                {conversation_history} and {reference_flow} placeholders
+            requirements: Current user requirements
+            history: Conversation history, oldest first
+            reference: Optional example flow for similar requirements; it
+                may use at most a quarter of the budget (and no more than the
+                requirements leave) and is dropped line by line from the end
+                if larger
+            task: Optional instructions appended after the requirements;
+                prompts differing only in their task share everything
+                before it as their prefix
+
+        Returns:
+            AssembledPrompt with the final prompt texts and budget details
+
+        Raises:
+            PromptBudgetExceededError: If not even part of the requirements
+                fits next to the fixed prompt
+        """
+        fixed_tokens = (
+            estimate_tokens(system_prompt)
+            + estimate_tokens(user_template.format(
+                requirements="", conversation_history="", reference_flow=""
+            ))
+            + estimate_tokens(task or "")
+        )
+        available = max(self.token_budget - fixed_tokens, 0)
+
+        # Requirements are mandatory: they are only truncated when they alone
+        # exceed the budget, and the reference and history share the rest.
+        fitted_requirements = truncate_to_tokens(requirements, available)
+        if requirements.strip() and not fitted_requirements.rstrip("…").strip():
+            raise PromptBudgetExceededError(self.token_budget, fixed_tokens)
+        requirements_truncated = fitted_requirements != requirements
+        remaining = available - estimate_tokens(fitted_requirements)
+
+        fitted_reference = self._fit_lines(reference or "", min(available // 4, remaining))
+        history_budget = remaining - estimate_tokens(fitted_reference)
+
+        candidates = self._select_history(history or [], requirements)
+        included: List[str] = []
+        used = 0
+        # Walk from the newest message backwards so recent context wins
+        for line in reversed(candidates):
+            cost = estimate_tokens(line) + 1
+            if used + cost > history_budget:
+                break
+            included.append(line)
+            used += cost
+        included.reverse()
+
+        history_str = "\n".join(included) if included else NO_HISTORY_PLACEHOLDER
+        user = user_template.format(
+            requirements=fitted_requirements,
+            conversation_history=history_str,
+            reference_flow=fitted_reference or NO_REFERENCE_PLACEHOLDER,
+        )
+        if task:
+            user = f"{user}\n\n{task}"
+
+        return AssembledPrompt(
+            system=system_prompt,
+            user=user,
+            estimated_tokens=estimate_tokens(system_prompt) + estimate_tokens(user),
+            history_included=len(included),
+            history_dropped=len(candidates) - len(included),
+            requirements_truncated=requirements_truncated,
+            reference_included=bool(fitted_reference),
+        )
+
+    @staticmethod
+    def _fit_lines(text: str, max_tokens: int) -> str:
+        """Keep the leading whole lines of a text that fit into max_tokens."""
+        kept: List[str] = []
+        used = 0
+        for line in text.splitlines():
+            cost = estimate_tokens(line) + 1
+            if used + cost > max_tokens:
+                break
+            kept.append(line)
+            used += cost
+        return "\n".join(kept)
+
+    def _select_history(self, history: List[Dict[str, str]], requirements: str) -> List[str]:
+        """
+        Turn raw history into compact prompt lines.
+
+        The current request is usually already stored as the last user
+        message, so it is dropped here to avoid sending it twice. Assistant
+        messages are condensed because they are mostly generated boilerplate.
+
+        Args:
+            history: Conversation history, oldest first
+            requirements: Current user requirements
+
+        Returns:
+            Formatted history lines, oldest first
+        """
+        messages = list(history)
+        if (
+            messages
+            and messages[-1].get("role") == "user"
+            and (messages[-1].get("content") or "").strip() == requirements.strip()
+        ):
+            messages.pop()
+
+        lines: List[str] = []
+        for msg in messages[-self.max_history_messages:]:
+            role = msg.get("role", "unknown")
+            content = (msg.get("content") or "").strip()
+            if not content:
+                continue
+            if role == "user":
+                lines.append(f"用户: {content}")
+            else:
+                summary = self._summarize_assistant(content)
+                if summary and (not lines or lines[-1] != f"助手: {summary}"):
+                    lines.append(f"助手: {summary}")
+        return lines
+
+    def _summarize_assistant(self, content: str) -> str:
+        """
+        Condense an assistant message to the information worth resending.
+
+        Args:
+            content: Assistant message content
+
+        Returns:
+            Short summary of the message
+        """
+        if "Business Process Flow" in content:
+            counts = _SUMMARY_COUNT_PATTERN.findall(content)
+            if len(counts) >= 2:
+                return f"已生成业务流程图（{counts[0]} 个流程步骤，{counts[1]} 个决策点）"
+            return "已生成业务流程图"
+        return truncate_to_tokens(content, self.assistant_max_tokens)
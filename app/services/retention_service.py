@@ -0,0 +1,434 @@
+"""Retention: hot/cold tiering, purging and partition maintenance."""
+import json
+import re
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, exists, func, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.archive import ArchivedDiagram, ConversationArchive
+from app.models.conversation import Conversation
+from app.models.design import Design
+from app.models.diagram import Diagram, DiagramPage
+from app.models.message import Message
+from app.models.search import SearchDocument, SearchPosting
+from app.models.similarity import FlowBucket, FlowSignature
+from app.utils.metrics import metrics
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+class RetentionService:
+    """
+    Move cold conversations out of the hot tables and purge deleted ones.
+
+    Archiving serialises a conversation's messages, designs and diagrams
+    (including the XML; pages are split from it again on restore) into one
+    zlib-compressed row of conversation_archives and removes them from the
+    hot tables, their search index and their similarity index; the
+    conversation row itself stays, with status "archived". Archived
+    diagrams can still be read by ID, and a conversation is restored with
+    its original IDs as soon as it receives a new message.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the retention service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    # Archiving
+
+    def archive_conversation(self, conversation: Conversation) -> ConversationArchive:
+        """
+        Compress a conversation into cold storage and remove its hot rows.
+
+        Args:
+            conversation: Conversation to archive
+
+        Returns:
+            The created archive row (committed)
+        """
+        db = self.db
+        messages = db.query(Message).filter(
+            Message.conversation_id == conversation.id
+        ).order_by(Message.id).all()
+        designs = db.query(Design).filter(
+            Design.conversation_id == conversation.id
+        ).order_by(Design.id).all()
+
+        payload = {
+            "messages": [
+                {"id": m.id, "role": m.role, "content": m.content, "created_at": _iso(m.created_at)}
+                for m in messages
+            ],
+            "designs": [
+                {
+                    "id": d.id,
+                    "name": d.name,
+                    "description": d.description,
+                    "created_at": _iso(d.created_at),
+                    "updated_at": _iso(d.updated_at),
+                    "diagrams": [
+                        {
+                            "id": g.id,
+                            "diagram_type": g.diagram_type,
+                            "title": g.title,
+                            "drawio_xml": g.drawio_xml,
+                            "flow_data": g.flow_data,
+                            "file_path": g.file_path,
+                            "created_at": _iso(g.created_at),
+                        }
+                        for g in sorted(d.diagrams, key=lambda g: g.id)
+                    ],
+                }
+                for d in designs
+            ],
+        }
+        raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        compressed = zlib.compress(raw, 9)
+        diagram_ids = [g["id"] for d in payload["designs"] for g in d["diagrams"]]
+
+        archive = ConversationArchive(
+            conversation_id=conversation.id,
+            payload=compressed,
+            message_count=len(messages),
+            diagram_count=len(diagram_ids),
+            raw_bytes=len(raw),
+            compressed_bytes=len(compressed),
+        )
+        db.add(archive)
+        db.flush()
+        if diagram_ids:
+            db.add_all([
+                ArchivedDiagram(diagram_id=diagram_id, conversation_id=conversation.id)
+                for diagram_id in diagram_ids
+            ])
+        self._delete_hot_rows(conversation.id, [d.id for d in designs], diagram_ids)
+        conversation.status = "archived"
+        db.commit()
+
+        metrics.inc("retention_archived_total")
+        metrics.inc("retention_archived_bytes_total", len(raw))
+        metrics.inc("retention_archived_compressed_bytes_total", len(compressed))
+        return archive
+
+    def _delete_hot_rows(self, conversation_id: int, design_ids: List[int], diagram_ids: List[int]) -> None:
+        """Delete a conversation's rows from hot and index tables (not committed)."""
+        db = self.db
+        document_ids = select(SearchDocument.id).where(SearchDocument.conversation_id == conversation_id)
+        db.execute(delete(SearchPosting).where(SearchPosting.document_id.in_(document_ids)))
+        db.execute(delete(SearchDocument).where(SearchDocument.conversation_id == conversation_id))
+        if diagram_ids:
+            signature_ids = select(FlowSignature.id).where(FlowSignature.diagram_id.in_(diagram_ids))
+            db.execute(delete(FlowBucket).where(FlowBucket.signature_id.in_(signature_ids)))
+            db.execute(delete(FlowSignature).where(FlowSignature.diagram_id.in_(diagram_ids)))
+            db.execute(delete(DiagramPage).where(DiagramPage.diagram_id.in_(diagram_ids)))
+            db.execute(delete(Diagram).where(Diagram.id.in_(diagram_ids)))
+        if design_ids:
+            db.execute(delete(Design).where(Design.id.in_(design_ids)))
+        db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+        db.expire_all()
+
+    def _load_payload(self, archive: ConversationArchive) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(archive.payload).decode("utf-8"))
+
+    # Access to cold data
+
+    def load_archived_diagram(self, diagram_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Read an archived diagram without restoring its conversation.
+
+        Args:
+            diagram_id: Diagram ID
+
+        Returns:
+            Diagram fields (title, drawio_xml, flow_data, ...) or None
+        """
+        archive = self.db.query(ConversationArchive).join(
+            ArchivedDiagram, ArchivedDiagram.conversation_id == ConversationArchive.conversation_id
+        ).filter(ArchivedDiagram.diagram_id == diagram_id).first()
+        if archive is None:
+            return None
+        metrics.inc("retention_cold_reads_total")
+        for design in self._load_payload(archive)["designs"]:
+            for diagram in design["diagrams"]:
+                if diagram["id"] == diagram_id:
+                    return {**diagram, "design_id": design["id"]}
+        return None
+
+    def restore_conversation(self, conversation: Conversation) -> bool:
+        """
+        Move an archived conversation back into the hot tables.
+
+        Rows keep their original IDs, and the search and similarity
+        indexes are rebuilt for them.
+
+        Args:
+            conversation: Archived conversation
+
+        Returns:
+            True if an archive was restored
+        """
+        from app.services.design_service import DesignService
+        from app.services.search_service import SearchService
+        from app.services.similar_flow_service import SimilarFlowService
+
+        db = self.db
+        archive = db.query(ConversationArchive).filter(
+            ConversationArchive.conversation_id == conversation.id
+        ).first()
+        if archive is None:
+            if conversation.status == "archived":
+                conversation.status = "active"
+                db.commit()
+            return False
+
+        payload = self._load_payload(archive)
+        messages = [
+            Message(
+                id=m["id"],
+                conversation_id=conversation.id,
+                role=m["role"],
+                content=m["content"],
+                created_at=_parse_iso(m["created_at"]),
+            )
+            for m in payload["messages"]
+        ]
+        db.add_all(messages)
+
+        diagrams = []
+        for d in payload["designs"]:
+            design = Design(
+                id=d["id"],
+                conversation_id=conversation.id,
+                name=d["name"],
+                description=d["description"],
+                created_at=_parse_iso(d["created_at"]),
+                updated_at=_parse_iso(d["updated_at"]),
+            )
+            db.add(design)
+            for g in d["diagrams"]:
+                diagram = Diagram(
+                    id=g["id"],
+                    design_id=d["id"],
+                    diagram_type=g["diagram_type"],
+                    title=g["title"],
+                    drawio_xml=g["drawio_xml"],
+                    flow_data=g["flow_data"],
+                    file_path=g["file_path"],
+                    created_at=_parse_iso(g["created_at"]),
+                )
+                db.add(diagram)
+                diagrams.append((diagram, d["description"] or ""))
+        db.flush()
+
+        search = SearchService(db)
+        similar = SimilarFlowService(db)
+        design_service = DesignService(db)
+        for message in messages:
+            search.index_message(message)
+        for diagram, requirements in diagrams:
+            design_service.store_pages(diagram)
+            search.index_diagram(diagram, conversation.id)
+            # Similar-flow reuse only covers business flows, as in ChatPipeline
+            if diagram.diagram_type == "business_flow":
+                similar.index_diagram(diagram, requirements)
+
+        db.execute(delete(ArchivedDiagram).where(ArchivedDiagram.conversation_id == conversation.id))
+        db.delete(archive)
+        conversation.status = "active"
+        db.commit()
+        metrics.inc("retention_restored_total")
+        return True
+
+    # Purging
+
+    def purge_deleted(self, batch_size: Optional[int] = None) -> int:
+        """
+        Hard-delete conversations with status "deleted", in batches.
+
+        Each batch is committed separately so the job never holds locks on
+        many rows at once.
+
+        Args:
+            batch_size: Conversations per batch (defaults to RETENTION_BATCH_SIZE)
+
+        Returns:
+            Number of purged conversations
+        """
+        db = self.db
+        batch_size = batch_size or get_settings().RETENTION_BATCH_SIZE
+        purged = 0
+        while True:
+            ids = [row[0] for row in db.execute(
+                select(Conversation.id).where(Conversation.status == "deleted").limit(batch_size)
+            )]
+            if not ids:
+                break
+            for conversation_id in ids:
+                design_ids = [row[0] for row in db.execute(
+                    select(Design.id).where(Design.conversation_id == conversation_id)
+                )]
+                diagram_ids = [row[0] for row in db.execute(
+                    select(Diagram.id).where(Diagram.design_id.in_(design_ids))
+                )] if design_ids else []
+                self._delete_hot_rows(conversation_id, design_ids, diagram_ids)
+            db.execute(delete(ArchivedDiagram).where(ArchivedDiagram.conversation_id.in_(ids)))
+            db.execute(delete(ConversationArchive).where(ConversationArchive.conversation_id.in_(ids)))
+            db.execute(delete(Conversation).where(Conversation.id.in_(ids)))
+            db.commit()
+            purged += len(ids)
+            metrics.inc("retention_purged_total", len(ids))
+        return purged
+
+    # Compaction job
+
+    def archive_candidates(self, limit: int, now: Optional[datetime] = None) -> List[Conversation]:
+        """
+        Find conversations to move into cold storage.
+
+        Candidates are conversations marked "archived" that still have hot
+        rows, and active conversations without activity for
+        RETENTION_ARCHIVE_AFTER_DAYS (0 disables age-based archiving).
+
+        Args:
+            limit: Maximum number of conversations
+            now: Current time (defaults to utcnow)
+
+        Returns:
+            Conversations to archive
+        """
+        settings = get_settings()
+        conditions = [Conversation.status == "archived"]
+        if settings.RETENTION_ARCHIVE_AFTER_DAYS > 0:
+            cutoff = (now or datetime.utcnow()) - timedelta(days=settings.RETENTION_ARCHIVE_AFTER_DAYS)
+            conditions.append(
+                (Conversation.status == "active")
+                & (func.coalesce(Conversation.updated_at, Conversation.created_at) < cutoff)
+            )
+        return self.db.query(Conversation).filter(
+            or_(*conditions),
+            ~exists().where(ConversationArchive.conversation_id == Conversation.id)
+        ).order_by(Conversation.id).limit(limit).all()
+
+    def compact(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Run one compaction pass: purge, archive and maintain partitions.
+
+        Args:
+            now: Current time (defaults to utcnow)
+
+        Returns:
+            Counts of purged and archived conversations and created partitions
+        """
+        settings = get_settings()
+        stats = {"purged": self.purge_deleted(), "archived": 0, "partitions": 0}
+        while True:
+            batch = self.archive_candidates(settings.RETENTION_BATCH_SIZE, now)
+            if not batch:
+                break
+            for conversation in batch:
+                self.archive_conversation(conversation)
+            stats["archived"] += len(batch)
+        stats["partitions"] = len(self.ensure_partitions(
+            settings.RETENTION_PARTITIONED_TABLES,
+            settings.RETENTION_PARTITION_MONTHS_AHEAD,
+            (now or datetime.utcnow()).date()
+        ))
+        return stats
+
+    # Partitioning
+
+    def ensure_partitions(self, tables: List[str], months_ahead: int, today: date) -> List[str]:
+        """
+        Create upcoming monthly partitions for range-partitioned MySQL tables.
+
+        Tables must be partitioned with migrations/partitioning.sql (RANGE
+        on UNIX_TIMESTAMP(created_at) with a catch-all `pmax` partition);
+        other tables and other databases are left untouched.
+
+        Args:
+            tables: Table names
+            months_ahead: Months after the current one to cover
+            today: Current date
+
+        Returns:
+            Names of created partitions as "table.partition"
+        """
+        db = self.db
+        if db.get_bind().dialect.name != "mysql":
+            return []
+        created = []
+        for table in tables:
+            if not _IDENTIFIER.match(table):
+                continue
+            existing = {row[0] for row in db.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ), {"table": table}) if row[0]}
+            if "pmax" not in existing:
+                continue
+            first = date(today.year, today.month, 1)
+            for offset in range(months_ahead + 1):
+                start = _add_months(first, offset)
+                name = f"p{start:%Y%m}"
+                if name in existing:
+                    continue
+                end = _add_months(start, 1)
+                db.execute(text(
+                    f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO ("
+                    f"PARTITION {name} VALUES LESS THAN (UNIX_TIMESTAMP('{end:%Y-%m-%d} 00:00:00')), "
+                    f"PARTITION pmax VALUES LESS THAN MAXVALUE)"
+                ))
+                existing.add(name)
+                created.append(f"{table}.{name}")
+        return created
+
+
+def run_compaction() -> Optional[Dict[str, int]]:
+    """
+    Run one compaction pass in a fresh session.
+
+    When state is shared across workers, only the worker holding the
+    "retention" lease compacts; the others skip the pass.
+
+    Returns:
+        Compaction counts, or None if another worker holds the lease
+    """
+    from app.models.base import get_session_local
+    from app.utils.shared_store import get_shared_store, shared_store_enabled
+
+    holder = None
+    if shared_store_enabled():
+        holder = get_shared_store().try_acquire(
+            "retention", 1, lease_seconds=get_settings().RETENTION_INTERVAL_SECONDS
+        )
+        if holder is None:
+            return None
+    db = get_session_local()()
+    try:
+        return RetentionService(db).compact()
+    finally:
+        db.close()
+        if holder is not None:
+            get_shared_store().release("retention", holder)
@@ -0,0 +1,298 @@
+"""Full-text search over conversation messages and diagram labels."""
+import math
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session, load_only
+
+from app.models.design import Design
+from app.models.diagram import Diagram
+from app.models.message import Message
+from app.models.search import SearchDocument, SearchPosting
+from app.utils.text_search import flow_labels, term_frequencies, tokenize
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Seconds the corpus statistics (document count, average length) are cached
+_STATS_TTL = 60.0
+
+# Maximum distinct terms taken from a query
+_MAX_QUERY_TERMS = 32
+
+_stats_cache: Dict[str, Any] = {"expires": 0.0, "count": 0, "avg_length": 1.0}
+
+
+class SearchService:
+    """
+    Inverted index over user messages and business flow node labels.
+
+    Documents are tokenized with CJK bigrams (see app.utils.text_search)
+    and stored in the search_documents/search_postings tables as they are
+    saved, so a query only reads the posting lists of its own terms and
+    ranks the candidates with BM25. Assistant messages are generated
+    boilerplate and are not indexed.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the search service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    def index_message(self, message: Message) -> None:
+        """
+        Add a flushed user message to the index (committed with the session).
+
+        Args:
+            message: Message with its ID assigned
+        """
+        if message.role != "user":
+            return
+        self._index("message", message.id, message.conversation_id, message.content)
+
+    def index_diagram(self, diagram: Diagram, conversation_id: int) -> None:
+        """
+        Add the node labels of a flushed diagram to the index.
+
+        Args:
+            diagram: Diagram with its ID assigned
+            conversation_id: Conversation the diagram's design belongs to
+        """
+        labels = flow_labels(diagram.flow_data or {})
+        self._index("diagram", diagram.id, conversation_id, "\n".join([diagram.title] + labels))
+
+    def _index(self, doc_type: str, doc_id: int, conversation_id: int, text: str) -> None:
+        frequencies = term_frequencies(text)
+        document = SearchDocument(
+            doc_type=doc_type,
+            doc_id=doc_id,
+            conversation_id=conversation_id,
+            length=sum(frequencies.values())
+        )
+        self.db.add(document)
+        self.db.flush()
+        if frequencies:
+            self.db.execute(insert(SearchPosting), [
+                {"term": term, "document_id": document.id, "tf": min(tf, 32767)}
+                for term, tf in frequencies.items()
+            ])
+
+    def _corpus_stats(self) -> Tuple[int, float]:
+        """Return (document count, average length), cached for _STATS_TTL."""
+        now = time.monotonic()
+        if now >= _stats_cache["expires"]:
+            count, avg_length = self.db.execute(
+                select(func.count(SearchDocument.id), func.avg(SearchDocument.length))
+            ).one()
+            _stats_cache.update(
+                expires=now + _STATS_TTL,
+                count=count or 0,
+                avg_length=float(avg_length or 1.0) or 1.0
+            )
+        return _stats_cache["count"], _stats_cache["avg_length"]
+
+    def search(
+        self,
+        query: str,
+        doc_type: Optional[str] = None,
+        conversation_id: Optional[int] = None,
+        page: int = 1,
+        page_size: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Search messages and diagrams.
+
+        Documents must contain at least half of the query terms; they are
+        ordered by the number of matched terms, then by BM25 score.
+
+        Args:
+            query: Search text (Chinese or other languages)
+            doc_type: Restrict to "message" or "diagram"
+            conversation_id: Restrict to one conversation
+            page: 1-based page number
+            page_size: Results per page
+
+        Returns:
+            Dictionary with total, page info and the ranked results
+        """
+        started = time.perf_counter()
+        terms = list(dict.fromkeys(tokenize(query)))[:_MAX_QUERY_TERMS]
+        response: Dict[str, Any] = {
+            "query": query, "total": 0, "page": page, "page_size": page_size, "results": []
+        }
+        if not terms:
+            return response
+
+        # Single CJK characters are matched against bigrams they start
+        multi_char = {t for t in terms if len(t) > 1 or t.isascii()}
+        single_char = [t for t in terms if len(t) == 1 and not t.isascii()]
+        conditions = []
+        if multi_char:
+            conditions.append(SearchPosting.term.in_(multi_char))
+        conditions.extend(SearchPosting.term.like(f"{t}%") for t in single_char)
+
+        stmt = select(
+            SearchPosting.term,
+            SearchPosting.document_id,
+            SearchPosting.tf,
+            SearchDocument.length,
+            SearchDocument.doc_type,
+            SearchDocument.doc_id,
+            SearchDocument.conversation_id,
+        ).join(
+            SearchDocument, SearchDocument.id == SearchPosting.document_id
+        ).where(or_(*conditions))
+        if doc_type:
+            stmt = stmt.where(SearchDocument.doc_type == doc_type)
+        if conversation_id:
+            stmt = stmt.where(SearchDocument.conversation_id == conversation_id)
+
+        # query term -> {document_id: tf}
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        documents: Dict[int, Tuple[int, str, int, int]] = {}
+        for term, document_id, tf, length, d_type, d_id, conv_id in self.db.execute(stmt):
+            query_term = term if term in multi_char else term[0]
+            by_document = postings[query_term]
+            by_document[document_id] = by_document.get(document_id, 0) + tf
+            documents[document_id] = (length, d_type, d_id, conv_id)
+
+        count, avg_length = self._corpus_stats()
+        count = max(count, len(documents))
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for by_document in postings.values():
+            df = len(by_document)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for document_id, tf in by_document.items():
+                length = documents[document_id][0]
+                norm = tf + _K1 * (1 - _B + _B * length / avg_length)
+                scores[document_id] += idf * tf * (_K1 + 1) / norm
+                matched[document_id] += 1
+
+        min_match = math.ceil(len(terms) / 2)
+        ranked = sorted(
+            (document_id for document_id in scores if matched[document_id] >= min_match),
+            key=lambda document_id: (-matched[document_id], -scores[document_id])
+        )
+        response["total"] = len(ranked)
+
+        offset = (page - 1) * page_size
+        page_ids = ranked[offset:offset + page_size]
+        response["results"] = self._hydrate(
+            [(documents[document_id], scores[document_id]) for document_id in page_ids],
+            query,
+            set(terms)
+        )
+        response["took_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return response
+
+    def _hydrate(
+        self,
+        hits: List[Tuple[Tuple[int, str, int, int], float]],
+        query: str,
+        terms: set
+    ) -> List[Dict[str, Any]]:
+        """Load snippets and labels for one page of hits."""
+        message_ids = [doc[2] for doc, _ in hits if doc[1] == "message"]
+        diagram_ids = [doc[2] for doc, _ in hits if doc[1] == "diagram"]
+
+        messages = {}
+        if message_ids:
+            messages = {m.id: m for m in self.db.query(Message).filter(Message.id.in_(message_ids))}
+        diagrams = {}
+        if diagram_ids:
+            diagrams = {
+                d.id: d for d in self.db.query(Diagram).options(
+                    load_only(Diagram.id, Diagram.title, Diagram.flow_data, Diagram.design_id)
+                ).filter(Diagram.id.in_(diagram_ids))
+            }
+
+        results = []
+        for (_, d_type, d_id, conv_id), score in hits:
+            item: Dict[str, Any] = {
+                "type": d_type, "id": d_id, "conversation_id": conv_id, "score": round(score, 4)
+            }
+            if d_type == "message":
+                message = messages.get(d_id)
+                if message is None:
+                    continue
+                item["snippet"] = _snippet(message.content, query)
+                item["created_at"] = message.created_at.isoformat() if message.created_at else None
+            else:
+                diagram = diagrams.get(d_id)
+                if diagram is None:
+                    continue
+                item["title"] = diagram.title
+                item["design_id"] = diagram.design_id
+                item["labels"] = [
+                    label for label in flow_labels(diagram.flow_data or {})
+                    if terms.intersection(tokenize(label))
+                ]
+            results.append(item)
+        return results
+
+    def reindex(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Rebuild the whole index from messages and diagrams.
+
+        Args:
+            batch_size: Documents indexed per commit
+
+        Returns:
+            Number of indexed messages and diagrams
+        """
+        db = self.db
+        db.execute(delete(SearchPosting))
+        db.execute(delete(SearchDocument))
+        db.commit()
+
+        counts = {"messages": 0, "diagrams": 0}
+        last_id = 0
+        while True:
+            batch = db.query(Message).filter(
+                Message.role == "user", Message.id > last_id
+            ).order_by(Message.id).limit(batch_size).all()
+            if not batch:
+                break
+            for message in batch:
+                self.index_message(message)
+            db.commit()
+            counts["messages"] += len(batch)
+            last_id = batch[-1].id
+
+        last_id = 0
+        while True:
+            batch = db.query(Diagram, Design.conversation_id).join(Design).options(
+                load_only(Diagram.id, Diagram.title, Diagram.flow_data)
+            ).filter(Diagram.id > last_id).order_by(Diagram.id).limit(batch_size).all()
+            if not batch:
+                break
+            for diagram, conversation_id in batch:
+                self.index_diagram(diagram, conversation_id)
+            db.commit()
+            counts["diagrams"] += len(batch)
+            last_id = batch[-1][0].id
+
+        _stats_cache["expires"] = 0.0
+        return counts
+
+
+def _snippet(content: str, query: str, width: int = 120) -> str:
+    """Cut the part of a message around the first query term occurrence."""
+    lowered = content.lower()
+    positions = [lowered.find(term) for term in tokenize(query)]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    snippet = content[start:start + width]
+    if start > 0:
+        snippet = "…" + snippet
+    if start + width < len(content):
+        snippet += "…"
+    return snippet
@@ -0,0 +1,250 @@
+"""Near-duplicate flow retrieval with MinHash and LSH."""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session, load_only
+
+from app.config import get_settings
+from app.models.conversation import Conversation
+from app.models.design import Design
+from app.models.diagram import Diagram
+from app.models.similarity import FlowBucket, FlowSignature
+from app.utils.minhash import MinHasher, shingles
+from app.utils.text_search import flow_labels
+
+# Candidates (by number of shared LSH buckets) compared per lookup
+_MAX_CANDIDATES = 50
+
+_hasher = MinHasher()
+
+
+@dataclass
+class SimilarFlow:
+    """A previously generated flow similar to new requirements."""
+
+    diagram_id: int
+    similarity: float
+    flow_data: Dict[str, Any]
+
+
+def requirements_signature(requirements: str) -> Optional[List[int]]:
+    """
+    MinHash the requirements of a lookup.
+
+    CPU-bound; run it in a worker thread (asyncio.to_thread) from request
+    handlers and pass the result to find_similar.
+
+    Args:
+        requirements: New requirements
+
+    Returns:
+        Signature, or None if the text has no shingles
+    """
+    shingle_set = shingles([requirements])
+    return _hasher.signature(shingle_set) if shingle_set else None
+
+
+def diagram_signatures(requirements: str, flow_data: Optional[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    MinHash a diagram's requirements and node labels for index_diagram.
+
+    CPU-bound, like requirements_signature.
+
+    Args:
+        requirements: Requirements the diagram was generated from
+        flow_data: Parsed business flow
+
+    Returns:
+        Signatures by kind ("req", "flow"); kinds without shingles are left out
+    """
+    signatures = {}
+    for kind, shingle_set in (("req", shingles([requirements])),
+                              ("flow", shingles(flow_labels(flow_data or {})))):
+        if shingle_set:
+            signatures[kind] = _hasher.signature(shingle_set)
+    return signatures
+
+
+def format_flow(flow_data: Dict[str, Any]) -> str:
+    """
+    Render a business flow in the PROCESS/DECISION format the LLM writes.
+
+    Args:
+        flow_data: Parsed business flow
+
+    Returns:
+        One line per process and decision
+    """
+    lines: List[str] = []
+    for process in flow_data.get("processes", []):
+        lines.append(f"PROCESS: {process.get('name', '')} [actor={process.get('actor') or '系统'}]")
+    for decision in flow_data.get("decisions", []):
+        line = f"DECISION: {decision.get('name', '')}"
+        if decision.get("true_branch"):
+            line += f" -> 是:{decision['true_branch']}"
+            if decision.get("false_branch"):
+                line += f", 否:{decision['false_branch']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class SimilarFlowService:
+    """
+    Find earlier flows whose requirements resemble new requirements.
+
+    Every saved diagram gets two MinHash signatures, one over its
+    requirements and one over its node labels, each stored with its LSH
+    bucket keys. A lookup hashes the new requirements, fetches signatures
+    sharing a bucket and returns the best estimated Jaccard match, so the
+    cost does not grow with the number of stored diagrams.
+
+    Lookups only consider flows of the requesting user's conversations
+    (of the same conversation for anonymous requests), unless
+    SIMILAR_FLOW_CROSS_USER is set.
+    """
+
+    def __init__(self, db: Session):
+        """
+        Initialize the service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    def index_diagram(
+        self,
+        diagram: Diagram,
+        requirements: str,
+        signatures: Optional[Dict[str, List[int]]] = None
+    ) -> None:
+        """
+        Add a flushed diagram to the index (committed with the session).
+
+        Args:
+            diagram: Diagram with its ID assigned
+            requirements: Requirements the diagram was generated from
+            signatures: Result of diagram_signatures, if computed already
+                (e.g. off the event loop); computed here otherwise
+        """
+        if signatures is None:
+            signatures = diagram_signatures(requirements, diagram.flow_data)
+        for kind, signature in signatures.items():
+            self._add_signature(diagram.id, kind, signature)
+
+    def _add_signature(self, diagram_id: int, kind: str, signature: List[int]) -> None:
+        row = FlowSignature(diagram_id=diagram_id, kind=kind, signature=_hasher.pack(signature))
+        self.db.add(row)
+        self.db.flush()
+        self.db.execute(insert(FlowBucket), [
+            {"bucket": key, "signature_id": row.id}
+            for key in set(_hasher.band_keys(signature, prefix=f"{kind}:"))
+        ])
+
+    def find_similar(
+        self,
+        requirements: str,
+        min_similarity: float = 0.0,
+        user_id: Optional[int] = None,
+        conversation_id: Optional[int] = None,
+        signature: Optional[List[int]] = None
+    ) -> Optional[SimilarFlow]:
+        """
+        Find the stored flow most similar to the requirements.
+
+        Both the requirements and the node labels of stored flows are
+        compared, so a request listing the steps of an existing flow
+        matches it as well.
+
+        Args:
+            requirements: New requirements
+            min_similarity: Minimum estimated Jaccard similarity
+            user_id: Requesting user; only flows of their conversations match
+            conversation_id: Requesting conversation; without a user, only
+                its own flows match
+            signature: Result of requirements_signature, if computed already
+
+        Returns:
+            Best match, or None if no candidate reaches min_similarity
+        """
+        if signature is None:
+            signature = requirements_signature(requirements)
+        if signature is None:
+            return None
+        keys = _hasher.band_keys(signature, prefix="req:") + _hasher.band_keys(signature, prefix="flow:")
+
+        shared = func.count(FlowBucket.bucket)
+        query = select(FlowBucket.signature_id).where(FlowBucket.bucket.in_(keys))
+        if not get_settings().SIMILAR_FLOW_CROSS_USER:
+            if user_id is not None:
+                scope = Conversation.user_id == user_id
+            elif conversation_id is not None:
+                scope = Conversation.id == conversation_id
+            else:
+                return None
+            query = query.join(FlowSignature, FlowSignature.id == FlowBucket.signature_id) \
+                .join(Diagram, Diagram.id == FlowSignature.diagram_id) \
+                .join(Design, Design.id == Diagram.design_id) \
+                .join(Conversation, Conversation.id == Design.conversation_id) \
+                .where(scope)
+        candidate_ids = [
+            row[0] for row in self.db.execute(
+                query.group_by(FlowBucket.signature_id)
+                .order_by(shared.desc())
+                .limit(_MAX_CANDIDATES)
+            )
+        ]
+        if not candidate_ids:
+            return None
+
+        best = None
+        for diagram_id, packed in self.db.execute(
+            select(FlowSignature.diagram_id, FlowSignature.signature)
+            .where(FlowSignature.id.in_(candidate_ids))
+        ):
+            similarity = _hasher.similarity(signature, _hasher.unpack(packed))
+            if similarity >= min_similarity and (best is None or similarity > best[1]):
+                best = (diagram_id, similarity)
+        if best is None:
+            return None
+
+        diagram = self.db.query(Diagram).options(
+            load_only(Diagram.id, Diagram.flow_data)
+        ).filter(Diagram.id == best[0]).first()
+        if diagram is None or not diagram.flow_data:
+            return None
+        return SimilarFlow(diagram_id=diagram.id, similarity=best[1], flow_data=diagram.flow_data)
+
+    def reindex(self, batch_size: int = 500) -> int:
+        """
+        Rebuild the index from all business flow diagrams, using design
+        descriptions as their requirements.
+
+        Args:
+            batch_size: Diagrams indexed per commit
+
+        Returns:
+            Number of indexed diagrams
+        """
+        db = self.db
+        db.execute(delete(FlowBucket))
+        db.execute(delete(FlowSignature))
+        db.commit()
+
+        count = 0
+        last_id = 0
+        while True:
+            batch = db.query(Diagram, Design.description).join(Design).options(
+                load_only(Diagram.id, Diagram.flow_data)
+            ).filter(
+                Diagram.id > last_id, Diagram.diagram_type == "business_flow"
+            ).order_by(Diagram.id).limit(batch_size).all()
+            if not batch:
+                break
+            for diagram, requirements in batch:
+                self.index_diagram(diagram, requirements or "")
+            db.commit()
+            count += len(batch)
+            last_id = batch[-1][0].id
+        return count
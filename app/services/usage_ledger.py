@@ -0,0 +1,316 @@
+"""LLM usage ledger: batched recording, token budgets and aggregates."""
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import Context, ContextVar
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.base import get_session_local
+from app.models.usage import LLMUsage
+from app.utils.metrics import metrics
+
+# Columns usage can be grouped by in summaries
+GROUP_COLUMNS = {
+    "conversation": LLMUsage.conversation_id,
+    "user": LLMUsage.user_id,
+    "model": LLMUsage.model,
+    "backend": LLMUsage.backend,
+    "purpose": LLMUsage.purpose,
+    "status": LLMUsage.status,
+    "day": func.date(LLMUsage.created_at),
+}
+
+# Every record binds all columns, since one multi-row INSERT takes the
+# column list from its first row; failed calls leave these unset
+_RECORD_DEFAULTS = {
+    "conversation_id": None,
+    "user_id": None,
+    "backend": None,
+    "model": None,
+    "prompt_tokens": 0,
+    "completion_tokens": 0,
+    "total_tokens": 0,
+    "cached_tokens": None,
+    "cache_hit": None,
+    "first_token_ms": None,
+    "hedged": False,
+}
+
+# Conversation and user the current LLM calls are made for
+_attribution: ContextVar[Dict[str, Optional[int]]] = ContextVar("usage_attribution", default={})
+
+
+class TokenBudgetExceededError(Exception):
+    """Raised when a conversation or user has used up its token budget."""
+
+    def __init__(self, scope: str, used: int, budget: int):
+        super().__init__(f"The {scope} token budget is exhausted ({used}/{budget} tokens)")
+        self.scope = scope
+        self.used = used
+        self.budget = budget
+        self.detail = str(self)
+
+
+@contextmanager
+def attribute_usage(conversation_id: Optional[int], user_id: Optional[int] = None) -> Iterator[None]:
+    """
+    Attribute the LLM calls made inside the block to a conversation and user.
+
+    Args:
+        conversation_id: Conversation ID
+        user_id: User ID, if known
+    """
+    token = _attribution.set({"conversation_id": conversation_id, "user_id": user_id})
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+class UsageLedger:
+    """
+    In-memory buffer of LLM call records flushed to `llm_usage` in batches.
+
+    Records are inserted by a background task every `flush_interval`
+    seconds, or as soon as `batch_size` records are waiting, with one
+    multi-row INSERT in a worker thread, so recording never blocks the
+    request. Records that fail to insert are kept for the next flush up
+    to `max_buffer`; beyond that the oldest are dropped and counted.
+    """
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 2.0, max_buffer: int = 10000):
+        """
+        Initialize the ledger.
+
+        Args:
+            batch_size: Buffered records that trigger an immediate flush
+            flush_interval: Seconds between periodic flushes
+            max_buffer: Maximum records kept while the database is failing
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._inflight: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def record(self, **fields: Any) -> None:
+        """
+        Buffer one LLM call.
+
+        The current attribution (see attribute_usage) supplies the
+        conversation and user IDs.
+
+        Args:
+            **fields: LLMUsage column values
+        """
+        record = {
+            **_RECORD_DEFAULTS,
+            **_attribution.get(),
+            **fields,
+            "created_at": datetime.utcnow(),
+        }
+        with self._lock:
+            self._buffer.append(record)
+            dropped = len(self._buffer) - self.max_buffer
+            if dropped > 0:
+                del self._buffer[:dropped]
+                metrics.inc("llm_usage_dropped_total", dropped)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = self._flush_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            # A fresh context keeps the request's deadline and query stats
+            # away from the flush
+            self._flush_task = Context().run(loop.create_task, self.flush())
+
+    async def flush(self) -> int:
+        """
+        Insert all buffered records.
+
+        Returns:
+            Number of records inserted
+        """
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+            self._inflight.extend(batch)
+        if not batch:
+            return 0
+        try:
+            await asyncio.to_thread(self._insert, batch)
+        except Exception as e:
+            print(f"Usage ledger flush failed: {e}")
+            metrics.inc("llm_usage_flush_errors_total")
+            with self._lock:
+                self._buffer[:0] = batch
+            return 0
+        finally:
+            with self._lock:
+                flushed = {id(record) for record in batch}
+                self._inflight = [record for record in self._inflight if id(record) not in flushed]
+        metrics.inc("llm_usage_records_total", len(batch))
+        return len(batch)
+
+    @staticmethod
+    def _insert(batch: List[Dict[str, Any]]) -> None:
+        db = get_session_local()()
+        try:
+            db.execute(LLMUsage.__table__.insert(), batch)
+            db.commit()
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        """Flush periodically until cancelled, then flush what is left."""
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def pending_tokens(self, conversation_id: Optional[int] = None, user_id: Optional[int] = None) -> int:
+        """Tokens of records not yet committed that match a conversation or user."""
+        with self._lock:
+            return sum(
+                record.get("total_tokens") or 0 for record in self._buffer + self._inflight
+                if (conversation_id is not None and record["conversation_id"] == conversation_id)
+                or (user_id is not None and record["user_id"] == user_id)
+            )
+
+
+@lru_cache()
+def get_usage_ledger() -> UsageLedger:
+    """Get the process-wide usage ledger configured from settings."""
+    settings = get_settings()
+    return UsageLedger(
+        batch_size=settings.USAGE_BATCH_SIZE,
+        flush_interval=settings.USAGE_FLUSH_SECONDS
+    )
+
+
+class UsageService:
+    """Token budgets and usage aggregates over the ledger."""
+
+    def __init__(self, db: Session):
+        """
+        Initialize the usage service.
+
+        Args:
+            db: Database session
+        """
+        self.db = db
+
+    def _used(self, *conditions) -> int:
+        return int(self.db.query(func.coalesce(func.sum(LLMUsage.total_tokens), 0)).filter(
+            *conditions
+        ).scalar())
+
+    def check_budget(self, conversation_id: int, user_id: Optional[int] = None) -> None:
+        """
+        Refuse further LLM calls for a conversation or user over budget.
+
+        Args:
+            conversation_id: Conversation about to call the LLM
+            user_id: Its user, if any
+
+        Raises:
+            TokenBudgetExceededError: If the conversation's lifetime tokens
+                or the user's tokens within the budget window have reached
+                their budget
+        """
+        settings = get_settings()
+        ledger = get_usage_ledger()
+        budget = settings.USAGE_CONVERSATION_TOKEN_BUDGET
+        if budget:
+            used = self._used(LLMUsage.conversation_id == conversation_id) \
+                + ledger.pending_tokens(conversation_id=conversation_id)
+            if used >= budget:
+                metrics.inc("llm_budget_rejections_total", scope="conversation")
+                raise TokenBudgetExceededError("conversation", used, budget)
+
+        budget = settings.USAGE_USER_TOKEN_BUDGET
+        if budget and user_id is not None:
+            since = datetime.utcnow() - timedelta(hours=settings.USAGE_USER_BUDGET_WINDOW_HOURS)
+            used = self._used(LLMUsage.user_id == user_id, LLMUsage.created_at >= since) \
+                + ledger.pending_tokens(user_id=user_id)
+            if used >= budget:
+                metrics.inc("llm_budget_rejections_total", scope="user")
+                raise TokenBudgetExceededError("user", used, budget)
+
+    def summary(
+        self,
+        group_by: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        conversation_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate recorded calls.
+
+        Args:
+            group_by: One of GROUP_COLUMNS
+            since: Only calls at or after this UTC time
+            until: Only calls before this UTC time
+            conversation_id: Only calls of this conversation
+            user_id: Only calls of this user
+            limit: Maximum groups, largest token totals first
+
+        Returns:
+            One row per group with call counts, token totals, cache hits
+            and latencies
+        """
+        key = GROUP_COLUMNS[group_by].label("key")
+        total = func.sum(LLMUsage.total_tokens)
+        query = self.db.query(
+            key,
+            func.count(LLMUsage.id),
+            func.sum(case((LLMUsage.status != "ok", 1), else_=0)),
+            func.sum(LLMUsage.prompt_tokens),
+            func.sum(LLMUsage.completion_tokens),
+            total,
+            func.sum(func.coalesce(LLMUsage.cached_tokens, 0)),
+            func.sum(case((LLMUsage.cache_hit.is_(True), 1), else_=0)),
+            func.avg(LLMUsage.latency_ms),
+            func.max(LLMUsage.latency_ms),
+        )
+        if since is not None:
+            query = query.filter(LLMUsage.created_at >= since)
+        if until is not None:
+            query = query.filter(LLMUsage.created_at < until)
+        if conversation_id is not None:
+            query = query.filter(LLMUsage.conversation_id == conversation_id)
+        if user_id is not None:
+            query = query.filter(LLMUsage.user_id == user_id)
+        rows = query.group_by(key).order_by(total.desc()).limit(limit).all()
+        return [
+            {
+                group_by: row[0].isoformat() if hasattr(row[0], "isoformat") else row[0],
+                "calls": row[1],
+                "failed_calls": int(row[2] or 0),
+                "prompt_tokens": int(row[3] or 0),
+                "completion_tokens": int(row[4] or 0),
+                "total_tokens": int(row[5] or 0),
+                "cached_tokens": int(row[6] or 0),
+                "cache_hits": int(row[7] or 0),
+                "avg_latency_ms": round(float(row[8] or 0), 1),
+                "max_latency_ms": int(row[9] or 0),
+            }
+            for row in rows
+        ]
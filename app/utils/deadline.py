@@ -0,0 +1,145 @@
+"""Per-request deadlines propagated to the LLM and database calls."""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from app.config import get_settings
+from app.utils.metrics import metrics
+
+_current_deadline: ContextVar[Optional["Deadline"]] = ContextVar("request_deadline", default=None)
+
+# SELECT statements that do not carry an optimizer hint yet
+_SELECT_PATTERN = re.compile(r"^\s*SELECT\s(?!\s*/\*\+)", re.IGNORECASE)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline has passed."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Request deadline exceeded during {stage}")
+        self.stage = stage
+        self.detail = str(self)
+
+
+class Deadline:
+    """
+    Point in time by which a request must be answered.
+
+    The time left is split across stages: waiting for admission and
+    generating may use everything but `reserve`, which is kept for
+    rendering and saving the (possibly degraded) result.
+    """
+
+    def __init__(self, seconds: float, reserve: float = 0.0):
+        """
+        Initialize the deadline.
+
+        Args:
+            seconds: Time budget of the request
+            reserve: Seconds kept for the stages after generation
+        """
+        self.seconds = seconds
+        self.reserve = min(reserve, seconds / 2)
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left until the deadline, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def generation_budget(self) -> float:
+        """Seconds left for the stages before rendering and saving."""
+        return max(0.0, self.remaining() - self.reserve)
+
+    def check(self, stage: str) -> None:
+        """
+        Fail if the deadline has passed.
+
+        Args:
+            stage: Stage about to start, reported in the error
+
+        Raises:
+            DeadlineExceededError: If the deadline has passed
+        """
+        if self.expired:
+            metrics.inc("deadline_exceeded_total", stage=stage)
+            raise DeadlineExceededError(stage)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], reserve: float = 0.0) -> Iterator[Optional[Deadline]]:
+    """
+    Apply a deadline to the LLM and database calls made inside the block.
+
+    Args:
+        seconds: Time budget; None or 0 for no deadline
+        reserve: Seconds kept for rendering and saving
+
+    Yields:
+        The Deadline, or None without one
+    """
+    if not seconds:
+        yield None
+        return
+    deadline = Deadline(seconds, reserve)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def request_deadline(seconds: Optional[float] = None):
+    """
+    Deadline scope for one chat request.
+
+    Args:
+        seconds: Budget asked for by the client; defaults to
+            REQUEST_DEADLINE_SECONDS
+
+    Returns:
+        Context manager from deadline_scope
+    """
+    settings = get_settings()
+    return deadline_scope(
+        seconds or settings.REQUEST_DEADLINE_SECONDS,
+        reserve=settings.REQUEST_DEADLINE_RESERVE_SECONDS
+    )
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the current request, if it has one."""
+    return _current_deadline.get()
+
+
+def install_db_deadline(engine) -> None:
+    """
+    Refuse statements of requests past their deadline.
+
+    On MySQL, SELECTs also get a MAX_EXECUTION_TIME hint with the time
+    left, so the server aborts a read that would outlive the request.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    from sqlalchemy import event
+
+    mysql = engine.dialect.name == "mysql"
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        deadline = _current_deadline.get()
+        if deadline is None:
+            return statement, parameters
+        deadline.check("database")
+        if mysql:
+            timeout_ms = max(1, int(deadline.remaining() * 1000))
+            statement = _SELECT_PATTERN.sub(
+                f"SELECT /*+ MAX_EXECUTION_TIME({timeout_ms}) */ ", statement, count=1
+            )
+        return statement, parameters
@@ -0,0 +1,372 @@
+"""Streaming parser turning .drawio files into the business flow model."""
+import base64
+import binascii
+import html
+import re
+import zlib
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import unquote_to_bytes
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser, tostring
+from xml.sax.saxutils import quoteattr
+
+# Size of the pieces compressed pages are inflated in
+_INFLATE_CHUNK = 64 * 1024
+
+# Elements wrapping an mxCell to attach custom properties to it
+_WRAPPER_TAGS = {"object", "UserObject"}
+
+_HTML_TAG = re.compile(r"<[^>]+>")
+_WHITESPACE = re.compile(r"\s+")
+
+# Edge labels that mark the yes/no branch of a decision
+_YES_LABELS = {"是", "yes", "y", "true", "通过", "同意"}
+_NO_LABELS = {"否", "no", "n", "false", "不通过", "拒绝"}
+
+_TERMINAL_LABELS = {"开始", "结束", "start", "end"}
+
+
+class DrawIOImportError(ValueError):
+    """Raised when an upload is not a readable .drawio document."""
+
+
+class ImportLimitError(DrawIOImportError):
+    """Raised when an upload exceeds a size limit."""
+
+
+@dataclass
+class ImportedCell:
+    """An mxCell of an imported page."""
+
+    id: str
+    value: str
+    style: str
+    vertex: bool
+    edge: bool
+    parent: Optional[str]
+    source: Optional[str]
+    target: Optional[str]
+    xml: str
+
+
+@dataclass
+class ImportedPage:
+    """One <diagram> page of an imported file."""
+
+    name: str
+    cells: List[ImportedCell] = field(default_factory=list)
+
+    def to_xml(self) -> str:
+        """
+        Serialize the page as an uncompressed single-page mxfile.
+
+        Returns:
+            DrawIO XML the viewer can render directly
+        """
+        return (
+            '<mxfile host="DrawIO Agent">'
+            f'<diagram id="imported" name={quoteattr(self.name)}>'
+            "<mxGraphModel><root>"
+            + "".join(cell.xml for cell in self.cells)
+            + "</root></mxGraphModel></diagram></mxfile>"
+        )
+
+
+def _label(value: Optional[str]) -> str:
+    """Turn an (HTML) cell value into plain text."""
+    if not value:
+        return ""
+    text = html.unescape(_HTML_TAG.sub(" ", value))
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class _GraphModelCollector:
+    """Collect the cells of one mxGraphModel from start/end parse events."""
+
+    def __init__(self, max_cells: int, cell_count: int):
+        self.max_cells = max_cells
+        self.cell_count = cell_count
+        self.cells: List[ImportedCell] = []
+        self._root: Optional[Element] = None
+        self._wrapper: Optional[Element] = None
+
+    def handle(self, event: str, element: Element) -> None:
+        tag = element.tag
+        if event == "start":
+            if tag == "root" and self._root is None:
+                self._root = element
+            elif tag in _WRAPPER_TAGS and self._wrapper is None:
+                self._wrapper = element
+            return
+
+        if tag == "mxCell" and self._wrapper is None:
+            self._add(element, element, element.get("id"), element.get("value"))
+        elif element is self._wrapper:
+            cell = element.find("mxCell")
+            if cell is not None:
+                self._add(element, cell, element.get("id"), element.get("label"))
+            self._wrapper = None
+
+    def _add(self, element: Element, cell: Element, cell_id: Optional[str], value: Optional[str]) -> None:
+        if cell_id is None:
+            return
+        self.cell_count += 1
+        if self.cell_count > self.max_cells:
+            raise ImportLimitError(f"file has more than {self.max_cells} cells")
+        element.tail = None
+        self.cells.append(ImportedCell(
+            id=cell_id,
+            value=_label(value),
+            style=cell.get("style") or "",
+            vertex=cell.get("vertex") == "1",
+            edge=cell.get("edge") == "1",
+            parent=cell.get("parent"),
+            source=cell.get("source"),
+            target=cell.get("target"),
+            xml=tostring(element, encoding="unicode"),
+        ))
+        # Drop parsed cells so the tree never holds more than one of them
+        if self._root is not None:
+            self._root.clear()
+
+
+class DrawIOStreamParser:
+    """
+    Incremental .drawio parser fed with chunks of the upload.
+
+    The outer document is parsed with a pull parser, so cells are handled
+    and released as they arrive instead of building the whole tree.
+    Compressed pages (base64 of raw deflate of the URL-encoded XML, as
+    written by draw.io) are inflated in fixed-size pieces straight into a
+    second pull parser. Limits on the upload size, the inflated size and
+    the number of cells are enforced while parsing.
+    """
+
+    def __init__(self, max_bytes: int, max_inflated_bytes: int, max_cells: int):
+        """
+        Initialize the parser.
+
+        Args:
+            max_bytes: Maximum size of the uploaded file
+            max_inflated_bytes: Maximum total size of inflated compressed pages
+            max_cells: Maximum number of cells over all pages
+        """
+        self.max_bytes = max_bytes
+        self.max_inflated_bytes = max_inflated_bytes
+        self.max_cells = max_cells
+        self.pages: List[ImportedPage] = []
+        self._parser = XMLPullParser(events=("start", "end"))
+        self._received = 0
+        self._inflated = 0
+        self._cell_count = 0
+        self._root_tag: Optional[str] = None
+        self._page_name: Optional[str] = None
+        self._page_done = False
+        self._collector: Optional[_GraphModelCollector] = None
+
+    def feed(self, data: bytes) -> None:
+        """
+        Parse the next chunk of the file.
+
+        Raises:
+            ImportLimitError: If the file exceeds max_bytes or max_cells
+            DrawIOImportError: If the file is not a valid .drawio document
+        """
+        self._received += len(data)
+        if self._received > self.max_bytes:
+            raise ImportLimitError(f"file is larger than {self.max_bytes} bytes")
+        try:
+            self._parser.feed(data)
+        except ParseError as e:
+            raise DrawIOImportError(f"invalid XML: {e}") from e
+        self._drain()
+
+    def close(self) -> List[ImportedPage]:
+        """
+        Finish parsing.
+
+        Returns:
+            Imported pages in document order
+
+        Raises:
+            DrawIOImportError: If the document is incomplete or has no pages
+        """
+        try:
+            self._parser.close()
+        except ParseError as e:
+            raise DrawIOImportError(f"invalid XML: {e}") from e
+        self._drain()
+        if not self.pages:
+            raise DrawIOImportError("file contains no diagram pages")
+        return self.pages
+
+    def _drain(self) -> None:
+        for event, element in self._parser.read_events():
+            tag = element.tag
+            if self._root_tag is None:
+                if tag not in ("mxfile", "mxGraphModel"):
+                    raise DrawIOImportError(f"unexpected root element <{tag}>")
+                self._root_tag = tag
+
+            if event == "start":
+                if tag == "diagram" and self._collector is None:
+                    self._page_name = element.get("name")
+                    self._page_done = False
+                elif tag == "mxGraphModel" and self._collector is None:
+                    self._collector = _GraphModelCollector(self.max_cells, self._cell_count)
+                elif self._collector is not None:
+                    self._collector.handle(event, element)
+            elif tag == "mxGraphModel" and self._collector is not None:
+                self._finish_page(self._collector)
+                self._collector = None
+                element.clear()
+            elif self._collector is not None:
+                self._collector.handle(event, element)
+            elif tag == "diagram":
+                if not self._page_done and (element.text or "").strip():
+                    self._finish_page(self._parse_compressed(element.text))
+                element.clear()
+
+    def _finish_page(self, collector: _GraphModelCollector) -> None:
+        self._cell_count = collector.cell_count
+        self._page_done = True
+        self.pages.append(ImportedPage(
+            name=self._page_name or f"Page-{len(self.pages) + 1}",
+            cells=collector.cells
+        ))
+
+    def _inflate(self, data: bytes) -> Iterator[bytes]:
+        """Inflate raw deflate data piece by piece within the size limit."""
+        inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+        try:
+            while data:
+                piece = inflater.decompress(data, _INFLATE_CHUNK)
+                data = inflater.unconsumed_tail
+                if piece:
+                    self._inflated += len(piece)
+                    if self._inflated > self.max_inflated_bytes:
+                        raise ImportLimitError(
+                            f"compressed pages inflate to more than {self.max_inflated_bytes} bytes"
+                        )
+                    yield piece
+            tail = inflater.flush()
+            if tail:
+                yield tail
+        except zlib.error as e:
+            raise DrawIOImportError(f"cannot inflate compressed page: {e}") from e
+
+    def _parse_compressed(self, text: str) -> _GraphModelCollector:
+        """Parse a compressed <diagram> payload without materializing its XML."""
+        try:
+            data = base64.b64decode(text.strip())
+        except (binascii.Error, ValueError) as e:
+            raise DrawIOImportError(f"cannot decode compressed page: {e}") from e
+
+        parser = XMLPullParser(events=("start", "end"))
+        collector = _GraphModelCollector(self.max_cells, self._cell_count)
+        url_encoded: Optional[bool] = None
+        carry = b""
+        try:
+            for piece in self._inflate(data):
+                if url_encoded is None:
+                    # Older draw.io versions deflate the XML without URL encoding
+                    url_encoded = not piece.lstrip().startswith(b"<")
+                if url_encoded:
+                    piece = carry + piece
+                    # Keep an escape sequence split between pieces for the next one
+                    split = piece.rfind(b"%", max(len(piece) - 2, 0))
+                    piece, carry = (piece[:split], piece[split:]) if split >= 0 else (piece, b"")
+                    piece = unquote_to_bytes(piece)
+                parser.feed(piece)
+                for event, element in parser.read_events():
+                    collector.handle(event, element)
+            parser.feed(unquote_to_bytes(carry))
+            parser.close()
+            for event, element in parser.read_events():
+                collector.handle(event, element)
+        except ParseError as e:
+            raise DrawIOImportError(f"invalid XML in compressed page: {e}") from e
+        return collector
+
+
+def page_to_flow(page: ImportedPage) -> Dict[str, Any]:
+    """
+    Map the graph of an imported page onto the business flow model.
+
+    Rhombus shapes become decisions whose yes/no branches are taken from
+    the edge labels; other vertices become processes in the order they
+    are reached from the start, with the label of an enclosing swimlane as
+    their actor. Ellipses at the ends of the flow are treated as start and
+    end and are not part of the model.
+
+    Args:
+        page: Imported page
+
+    Returns:
+        Flow dictionary with processes and decisions
+    """
+    lanes = {c.id: c.value for c in page.cells if c.vertex and "swimlane" in c.style}
+    vertices = {
+        c.id: c for c in page.cells
+        if c.vertex and c.id not in lanes and c.value
+    }
+    outgoing: Dict[str, List[ImportedCell]] = defaultdict(list)
+    incoming: Dict[str, int] = defaultdict(int)
+    for c in page.cells:
+        if c.edge and c.source in vertices and c.target in vertices:
+            outgoing[c.source].append(c)
+            incoming[c.target] += 1
+
+    def is_terminal(cell: ImportedCell) -> bool:
+        shaped = cell.style.startswith("ellipse") or "terminator" in cell.style
+        at_end = not incoming[cell.id] or not outgoing[cell.id]
+        return at_end and (shaped or cell.value.lower() in _TERMINAL_LABELS)
+
+    # Breadth-first from the entry points, then anything left in document order
+    order: List[str] = []
+    seen = set()
+    queue = deque(cell_id for cell_id in vertices if not incoming[cell_id])
+    while queue or len(seen) < len(vertices):
+        if not queue:
+            queue.append(next(cell_id for cell_id in vertices if cell_id not in seen))
+        cell_id = queue.popleft()
+        if cell_id in seen:
+            continue
+        seen.add(cell_id)
+        order.append(cell_id)
+        queue.extend(edge.target for edge in outgoing[cell_id] if edge.target not in seen)
+
+    processes: List[Dict[str, str]] = []
+    decisions: List[Dict[str, Any]] = []
+    branch_targets = set()
+    for cell_id in order:
+        cell = vertices[cell_id]
+        if "rhombus" not in cell.style:
+            continue
+        branches: Dict[str, Optional[str]] = {"true_branch": None, "false_branch": None}
+        unlabeled = []
+        for edge in outgoing[cell_id]:
+            label = edge.value.lower()
+            side = "true_branch" if label in _YES_LABELS else "false_branch" if label in _NO_LABELS else None
+            if side and branches[side] is None:
+                branches[side] = edge.target
+            else:
+                unlabeled.append(edge.target)
+        for side in branches:
+            if branches[side] is None and unlabeled:
+                branches[side] = unlabeled.pop(0)
+        branch_targets.update(target for target in branches.values() if target)
+        decisions.append({
+            "name": cell.value,
+            "true_branch": vertices[branches["true_branch"]].value if branches["true_branch"] else None,
+            "false_branch": vertices[branches["false_branch"]].value if branches["false_branch"] else None,
+        })
+
+    for cell_id in order:
+        cell = vertices[cell_id]
+        if "rhombus" in cell.style or is_terminal(cell) or cell_id in branch_targets:
+            continue
+        processes.append({"name": cell.value, "actor": lanes.get(cell.parent, "")})
+
+    return {"processes": processes, "decisions": decisions}
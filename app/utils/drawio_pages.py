@@ -0,0 +1,29 @@
+"""Splitting multi-page DrawIO documents into single-page documents."""
+from typing import Any, Dict, List
+from xml.etree.ElementTree import Element, fromstring, tostring
+
+
+def split_pages(xml: str) -> List[Dict[str, Any]]:
+    """
+    Split an mxfile into one standalone mxfile per <diagram> page.
+
+    Args:
+        xml: DrawIO XML with uncompressed pages (or a bare mxGraphModel)
+
+    Returns:
+        Pages in document order, each with page_id, name and xml
+    """
+    document = fromstring(xml.encode("utf-8"))
+    if document.tag == "mxGraphModel":
+        return [{"page_id": "diagram", "name": "Page 1", "xml": xml}]
+
+    pages = []
+    for index, diagram in enumerate(document.findall("diagram")):
+        wrapper = Element("mxfile", document.attrib)
+        wrapper.append(diagram)
+        pages.append({
+            "page_id": diagram.get("id") or f"page-{index + 1}",
+            "name": diagram.get("name") or f"Page {index + 1}",
+            "xml": tostring(wrapper, encoding="unicode"),
+        })
+    return pages
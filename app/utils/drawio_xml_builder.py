@@ -1,7 +1,7 @@
 """DrawIO XML builder for creating DrawIO compatible diagram files."""
 from xml.etree.ElementTree import Element, SubElement, tostring
 from xml.dom import minidom
-from typing import Optional
+from typing import List, Optional, Tuple
 
 
 class DrawIOXMLBuilder:
@@ -10,7 +10,26 @@ class DrawIOXMLBuilder:
     Based on mxGraphModel format used by DrawIO.
     """
 
-    def __init__(self):
+    def __init__(self, page_name: str = "Generated Diagram", page_id: str = "diagram"):
+        """
+        Initialize the builder with its first page.
+
+        Args:
+            page_name: Name of the first page
+            page_id: ID of the first page
+        """
+        self.pages: List[Tuple[str, str, Element]] = []
+        self.cell_counter = 0
+        self.add_page(page_name, page_id)
+
+    def add_page(self, name: str, page_id: str) -> None:
+        """
+        Start a new page; nodes and edges added afterwards go onto it.
+
+        Args:
+            name: Page name shown in DrawIO's page tabs
+            page_id: Page ID, the target of links from other pages
+        """
         self.diagram = Element("mxGraphModel")
         self.diagram.set("dx", "1200")
         self.diagram.set("dy", "800")
@@ -30,8 +49,7 @@ class DrawIOXMLBuilder:
 
         self.root = SubElement(self.diagram, "root")
         self._add_default_cells()
-
-        self.cell_counter = 0
+        self.pages.append((page_id, name, self.diagram))
 
     def _add_default_cells(self):
         """Add default mxCell elements required by DrawIO."""
@@ -52,7 +70,8 @@ class DrawIOXMLBuilder:
         width: int = 120,
         height: int = 60,
         style: str = "rounded=1;whiteSpace=wrap;html=1;",
-        node_type: str = "process"
+        node_type: str = "process",
+        cell_id: Optional[str] = None
     ) -> str:
         """
         Add a node to the diagram.
@@ -63,12 +82,13 @@ class DrawIOXMLBuilder:
             width, height: Node dimensions
             style: mxGraph style string
             node_type: Type of node (start, end, process, decision)
+            cell_id: Explicit cell ID (defaults to the next sequential ID)
 
         Returns:
             Cell ID of the created node
         """
         self.cell_counter += 1
-        cell_id = str(self.cell_counter + 1)
+        cell_id = cell_id or str(self.cell_counter + 1)
 
         # Apply default styles based on node type
         if node_type == "start":
@@ -104,7 +124,8 @@ class DrawIOXMLBuilder:
         target_id: str,
         label: str = "",
         style: str = "edgeStyle=orthogonalEdgeStyle;rounded=0;orthogonalLoop=1;jettySize=auto;html=1;",
-        edge_type: str = "arrow"
+        edge_type: str = "arrow",
+        cell_id: Optional[str] = None
     ) -> str:
         """
         Add an edge (arrow) between two nodes.
@@ -115,12 +136,13 @@ class DrawIOXMLBuilder:
             label: Optional label for the edge
             style: mxGraph style string
             edge_type: Type of edge (arrow, dashed)
+            cell_id: Explicit cell ID (defaults to the next sequential ID)
 
         Returns:
             Cell ID of the created edge
         """
         self.cell_counter += 1
-        cell_id = str(self.cell_counter + 1)
+        cell_id = cell_id or str(self.cell_counter + 1)
 
         if edge_type == "dashed":
             style = style + "dashed=1;"
@@ -140,6 +162,55 @@ class DrawIOXMLBuilder:
 
         return cell_id
 
+    def add_page_link(
+        self,
+        label: str,
+        x: int,
+        y: int,
+        target_page_id: str,
+        width: int = 120,
+        height: int = 50,
+        cell_id: Optional[str] = None
+    ) -> str:
+        """
+        Add an off-page connector that opens another page when clicked.
+
+        Args:
+            label: Text label for the connector
+            x, y: Position coordinates
+            target_page_id: ID of the page to open
+            width, height: Connector dimensions
+            cell_id: Explicit cell ID (defaults to the next sequential ID)
+
+        Returns:
+            Cell ID of the created connector
+        """
+        self.cell_counter += 1
+        cell_id = cell_id or str(self.cell_counter + 1)
+
+        # DrawIO keeps links on a UserObject wrapping the cell
+        user_object = SubElement(self.root, "UserObject")
+        user_object.set("label", label)
+        user_object.set("link", f"data:page/id,{target_page_id}")
+        user_object.set("id", cell_id)
+
+        mx_cell = SubElement(user_object, "mxCell")
+        mx_cell.set(
+            "style",
+            "shape=offPageConnector;whiteSpace=wrap;html=1;fillColor=#f5f5f5;strokeColor=#666666;"
+        )
+        mx_cell.set("vertex", "1")
+        mx_cell.set("parent", "1")
+
+        mx_geometry = SubElement(mx_cell, "mxGeometry")
+        mx_geometry.set("x", str(x))
+        mx_geometry.set("y", str(y))
+        mx_geometry.set("width", str(width))
+        mx_geometry.set("height", str(height))
+        mx_geometry.set("as", "geometry")
+
+        return cell_id
+
     def add_swimlane(
         self,
         label: str,
@@ -176,13 +247,13 @@ class DrawIOXMLBuilder:
         x: int,
         y: int,
         width: int = 200,
-        height: int = 150
+        height: int = 150,
+        style: str = "whiteSpace=wrap;html=1;fillColor=#ffe6cc;strokeColor=#d79b00;rounded=1;",
+        cell_id: Optional[str] = None
     ) -> str:
         """Add a container for grouping UI elements."""
         self.cell_counter += 1
-        cell_id = str(self.cell_counter + 1)
-
-        style = "whiteSpace=wrap;html=1;fillColor=#ffe6cc;strokeColor=#d79b00;rounded=1;"
+        cell_id = cell_id or str(self.cell_counter + 1)
 
         mx_cell = SubElement(self.root, "mxCell")
         mx_cell.set("id", cell_id)
@@ -214,12 +285,13 @@ class DrawIOXMLBuilder:
         mxfile.set("agent", "DrawIO Agent")
         mxfile.set("version", "22.1.0")
 
-        diagram = SubElement(mxfile, "diagram")
-        diagram.set("id", "diagram")
-        diagram.set("name", "Generated Diagram")
+        for page_id, name, model in self.pages:
+            diagram = SubElement(mxfile, "diagram")
+            diagram.set("id", page_id)
+            diagram.set("name", name)
 
-        # Add the mxGraphModel
-        diagram.append(self.diagram)
+            # Add the mxGraphModel
+            diagram.append(model)
 
         # Pretty print the XML
         rough_xml = tostring(mxfile, encoding="unicode")
@@ -0,0 +1,95 @@
+"""Sparse field selection for JSON responses (`?fields=a,b.c`)."""
+from typing import Any, Dict, Optional, Union
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+FieldSpec = Dict[str, Any]
+
+FIELDS_DESCRIPTION = (
+    "Comma-separated fields to return; nested fields use dots, "
+    "e.g. message_id,generated_content.business_flow.diagram_id"
+)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[FieldSpec]:
+    """
+    Parse a `fields` query value into a nested include specification.
+
+    Args:
+        fields: Comma-separated dotted paths, e.g. "a,b.c"
+
+    Returns:
+        Nested dict such as {"a": True, "b": {"c": True}}, or None to
+        return all fields
+    """
+    if not fields:
+        return None
+    spec: FieldSpec = {}
+    for path in fields.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        if not parts:
+            continue
+        node = spec
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is True:
+                break  # Parent already selected in full
+            node = node.setdefault(part, {})
+        else:
+            node[parts[-1]] = True
+    return spec or None
+
+
+def select_fields(data: Any, spec: FieldSpec) -> Any:
+    """
+    Apply an include specification to plain JSON data.
+
+    Lists are filtered element-wise, so "diagrams.id" selects the id of
+    every diagram.
+
+    Args:
+        data: Dict, list or scalar
+        spec: Specification from parse_fields
+
+    Returns:
+        Filtered copy of the data
+    """
+    if isinstance(data, list):
+        return [select_fields(item, spec) for item in data]
+    if not isinstance(data, dict):
+        return data
+    selected = {}
+    for key, sub_spec in spec.items():
+        if key in data:
+            selected[key] = data[key] if sub_spec is True else select_fields(data[key], sub_spec)
+    return selected
+
+
+def sparse_response(
+    content: Union[BaseModel, Dict[str, Any]],
+    fields: Optional[str]
+) -> Union[BaseModel, Dict[str, Any], ORJSONResponse]:
+    """
+    Restrict a response to the requested fields.
+
+    Only the selected top-level fields of a model are serialised, so
+    omitted XML and LLM text cost nothing; nested paths are then applied
+    with select_fields, which selects inside every element of a list
+    (pydantic would read a nested include on a list as index selectors).
+    Without `fields` the content is returned unchanged and goes through
+    the route's normal response_model handling.
+
+    Args:
+        content: Response model or plain dict
+        fields: Raw `fields` query value
+
+    Returns:
+        The original content, or a JSON response with the selected fields
+    """
+    spec = parse_fields(fields)
+    if spec is None:
+        return content
+    if isinstance(content, BaseModel):
+        content = content.model_dump(mode="json", include={key: True for key in spec})
+    return ORJSONResponse(select_fields(content, spec))
@@ -0,0 +1,69 @@
+"""Import-time profiling based on Python's -X importtime output."""
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List
+
+
+@dataclass
+class ImportTiming:
+    """Import time of a single module in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile_imports(module: str = "app.main") -> List[ImportTiming]:
+    """
+    Import a module in a fresh interpreter and collect per-module timings.
+
+    Args:
+        module: Module to import
+
+    Returns:
+        Timings in import order
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings: List[ImportTiming] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append(ImportTiming(
+            module=name.strip(),
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            depth=depth,
+        ))
+    return timings
+
+
+def format_report(timings: List[ImportTiming], top: int = 25) -> str:
+    """
+    Format the slowest imports as a table.
+
+    Args:
+        timings: Timings from profile_imports
+        top: Number of rows to show
+
+    Returns:
+        Report text sorted by cumulative time
+    """
+    total = max((t.cumulative_us for t in timings if t.depth <= 1), default=0)
+    rows = sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:top]
+    lines = [f"{'cumulative ms':>14} {'self ms':>9}  module"]
+    for timing in rows:
+        lines.append(
+            f"{timing.cumulative_us / 1000:>14.1f} {timing.self_us / 1000:>9.1f}  {timing.module}"
+        )
+    lines.append(f"Total import time of top-level module: {total / 1000:.1f} ms")
+    return "\n".join(lines)
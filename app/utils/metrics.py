@@ -0,0 +1,120 @@
+"""In-process metrics registry for counters, gauges and latency summaries."""
+import os
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Number of recent observations kept per series for quantile estimates
+_WINDOW_SIZE = 512
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_series(name: str, key: LabelKey) -> str:
+    if not key:
+        return name
+    labels = ",".join(f'{k}="{v}"' for k, v in key)
+    return f"{name}{{{labels}}}"
+
+
+def quantile(values, q: float) -> float:
+    """
+    Compute a quantile of a sequence using nearest-rank.
+
+    Args:
+        values: Observed values
+        q: Quantile between 0 and 1
+
+    Returns:
+        Quantile value, or 0.0 for an empty sequence
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class MetricsRegistry:
+    """Thread-safe registry of labelled counters, gauges and summaries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._gauges: Dict[Tuple[str, LabelKey], float] = {}
+        self._summaries: Dict[Tuple[str, LabelKey], Dict[str, Any]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to an absolute value."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record an observation (e.g. a latency in seconds) in a summary."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = {"count": 0, "sum": 0.0, "window": deque(maxlen=_WINDOW_SIZE)}
+                self._summaries[key] = summary
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["window"].append(value)
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        """Return the current value of a counter."""
+        with self._lock:
+            return self._counters.get((name, _label_key(labels)), 0)
+
+    def recent(self, name: str, **labels: Any) -> Deque[float]:
+        """Return a copy of the recent observation window of a summary."""
+        with self._lock:
+            summary = self._summaries.get((name, _label_key(labels)))
+            return deque(summary["window"]) if summary else deque()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return all metrics as a JSON-serialisable dictionary.
+
+        Metrics are per process; in multi-worker mode `pid` identifies the
+        worker that answered.
+
+        Returns:
+            Dictionary with counters, gauges and summaries keyed by series name
+        """
+        with self._lock:
+            counters = {_format_series(n, k): v for (n, k), v in self._counters.items()}
+            gauges = {_format_series(n, k): v for (n, k), v in self._gauges.items()}
+            summaries = {}
+            for (name, key), summary in self._summaries.items():
+                window = list(summary["window"])
+                summaries[_format_series(name, key)] = {
+                    "count": summary["count"],
+                    "sum": round(summary["sum"], 6),
+                    "p50": quantile(window, 0.5),
+                    "p95": quantile(window, 0.95),
+                    "p99": quantile(window, 0.99),
+                }
+        return {"pid": os.getpid(), "counters": counters, "gauges": gauges, "summaries": summaries}
+
+    def reset(self) -> None:
+        """Clear all metrics."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
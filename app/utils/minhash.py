@@ -0,0 +1,141 @@
+"""MinHash signatures and LSH banding for near-duplicate detection."""
+import hashlib
+import heapq
+import random
+import re
+import struct
+import unicodedata
+from typing import Iterable, List, Set
+
+# Mersenne prime used for the universal hash permutations
+_PRIME = (1 << 61) - 1
+
+# Everything except letters, digits and CJK ideographs is dropped on normalization
+_NOISE_PATTERN = re.compile(r"[^0-9a-z\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for shingling.
+
+    Applies NFKC (full-width to half-width), lowercases and removes
+    whitespace and punctuation, so wording differences that do not change
+    meaning ("请假审批流程。" vs "请假 审批流程") do not change shingles.
+    """
+    return _NOISE_PATTERN.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+def shingles(texts: Iterable[str], size: int = 2) -> Set[str]:
+    """
+    Build the character shingle set of one or more texts.
+
+    Character shingles work for Chinese without word segmentation; bigrams
+    keep paraphrases of short Chinese requirements measurably similar.
+
+    Args:
+        texts: Texts to shingle (e.g. requirements, or node labels)
+        size: Shingle length in characters
+
+    Returns:
+        Set of shingles; texts shorter than `size` are kept whole
+    """
+    result: Set[str] = set()
+    for text in texts:
+        normalized = normalize_text(text)
+        if len(normalized) < size:
+            if normalized:
+                result.add(normalized)
+            continue
+        result.update(normalized[i:i + size] for i in range(len(normalized) - size + 1))
+    return result
+
+
+class MinHasher:
+    """
+    MinHash with banded locality-sensitive hashing.
+
+    With `bands` bands of `num_perm / bands` rows, two sets collide in at
+    least one band with high probability once their Jaccard similarity
+    exceeds roughly (1 / bands) ** (bands / num_perm); for the defaults
+    (128 permutations, 32 bands of 4 rows) that is about 0.42.
+
+    Large sets are first reduced to the `max_shingles` shingles with the
+    smallest base hash. The reduction is consistent across sets, so similar
+    sets keep similar samples, and it bounds the cost of a signature
+    regardless of text length.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, seed: int = 1, max_shingles: int = 512):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm: Signature length
+            bands: Number of LSH bands (must divide num_perm)
+            seed: Seed of the permutation coefficients; signatures are
+                only comparable between hashers with the same parameters
+            max_shingles: Shingles hashed per signature at most
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_shingles = max_shingles
+        rng = random.Random(seed)
+        self._coefficients = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set: Set[str]) -> List[int]:
+        """
+        Compute the MinHash signature of a shingle set.
+
+        Args:
+            shingle_set: Shingles from `shingles`
+
+        Returns:
+            List of `num_perm` minimum hash values
+        """
+        if not shingle_set:
+            return [_PRIME] * self.num_perm
+        values = [
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+            for s in shingle_set
+        ]
+        if len(values) > self.max_shingles:
+            values = heapq.nsmallest(self.max_shingles, values)
+        return [min((a * x + b) % _PRIME for x in values) for a, b in self._coefficients]
+
+    def band_keys(self, signature: List[int], prefix: str = "") -> List[str]:
+        """
+        Hash each band of a signature into a bucket key.
+
+        Args:
+            signature: MinHash signature
+            prefix: Namespace prepended to every key
+
+        Returns:
+            One bucket key per band
+        """
+        keys = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(struct.pack(f"<{self.rows}Q", *rows), digest_size=8).hexdigest()
+            keys.append(f"{prefix}{band}:{digest}")
+        return keys
+
+    @staticmethod
+    def similarity(a: List[int], b: List[int]) -> float:
+        """Estimate the Jaccard similarity of two signatures."""
+        if not a or len(a) != len(b):
+            return 0.0
+        return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+    def pack(self, signature: List[int]) -> bytes:
+        """Serialize a signature for storage."""
+        return struct.pack(f"<{self.num_perm}Q", *signature)
+
+    def unpack(self, data: bytes) -> List[int]:
+        """Deserialize a stored signature."""
+        return list(struct.unpack(f"<{self.num_perm}Q", data))
@@ -0,0 +1,129 @@
+"""LRU cache of rendered diagrams keyed by a canonical hash of their flow."""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.utils.metrics import metrics
+from app.utils.shared_store import SharedStore
+
+# Shared-store namespace of persisted renders
+_NAMESPACE = "render"
+
+
+def flow_hash(flow_data: Dict[str, Any]) -> str:
+    """
+    Hash a flow independently of key order and formatting.
+
+    Step order is kept, since it determines the layout.
+
+    Args:
+        flow_data: Business flow with processes and decisions
+
+    Returns:
+        Hex SHA-256 of the canonical JSON encoding
+    """
+    canonical = json.dumps(flow_data, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """
+    Rendered diagrams (XML and node coordinates) by cache key.
+
+    The most recently used `max_entries` renders are kept in memory. With
+    a store, renders are also persisted for `ttl` seconds, so they survive
+    restarts and are shared by the workers of a host; a render found only
+    there is copied into memory.
+    """
+
+    def __init__(self, max_entries: int = 256, store: Optional[SharedStore] = None,
+                 ttl: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Renders kept in memory
+            store: Optional persistent store
+            ttl: Seconds persisted renders are kept, None for no expiry
+        """
+        self.max_entries = max_entries
+        self.store = store
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a render.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Render dictionary (treat as read-only), or None on a miss
+        """
+        with self._lock:
+            render = self._entries.get(key)
+            if render is not None:
+                self._entries.move_to_end(key)
+                metrics.inc("render_cache_requests_total", outcome="hit", tier="memory")
+                return render
+
+        if self.store is not None:
+            try:
+                render = self.store.get(_NAMESPACE, key)
+            except Exception as e:
+                print(f"Render cache read failed: {e}")
+                render = None
+            if render is not None:
+                self._remember(key, render)
+                metrics.inc("render_cache_requests_total", outcome="hit", tier="persistent")
+                return render
+
+        metrics.inc("render_cache_requests_total", outcome="miss")
+        return None
+
+    def put(self, key: str, render: Dict[str, Any]) -> None:
+        """
+        Store a render.
+
+        Args:
+            key: Cache key
+            render: JSON-serialisable render dictionary
+        """
+        self._remember(key, render)
+        if self.store is not None:
+            try:
+                self.store.set(_NAMESPACE, key, render, ttl=self.ttl)
+            except Exception as e:
+                print(f"Render cache write failed: {e}")
+
+    def _remember(self, key: str, render: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = render
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("render_cache_entries", len(self._entries))
+
+    def clear(self) -> None:
+        """Drop the in-memory renders."""
+        with self._lock:
+            self._entries.clear()
+            metrics.set_gauge("render_cache_entries", 0)
+
+
+@lru_cache()
+def get_render_cache() -> RenderCache:
+    """Get the render cache configured from settings."""
+    settings = get_settings()
+    store = SharedStore(settings.RENDER_CACHE_PATH) if settings.RENDER_CACHE_PERSIST else None
+    return RenderCache(
+        max_entries=settings.RENDER_CACHE_MAX_ENTRIES,
+        store=store,
+        ttl=settings.RENDER_CACHE_TTL_SECONDS or None
+    )
@@ -0,0 +1,272 @@
+"""On-demand sampling profiler for individual requests, written as folded stacks."""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.utils.tracing import current_span
+
+# Profile IDs double as file names, so only a safe alphabet is accepted
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+
+# Leaf functions of threads that are waiting, not working (idle pool
+# workers, the event loop's selector); their samples are dropped
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def _frame_label(code, cache: Dict[Any, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        name = getattr(code, "co_qualname", code.co_name)
+        path = code.co_filename
+        for root in _source_roots():
+            if path.startswith(root):
+                path = path[len(root):].lstrip(os.sep)
+                break
+        # Semicolons separate frames in the folded format
+        label = f"{name} ({path}:{code.co_firstlineno})".replace(";", ":")
+        cache[code] = label
+    return label
+
+
+@lru_cache()
+def _source_roots() -> Tuple[str, ...]:
+    """Longest sys.path entries first, so labels show module-relative paths."""
+    roots = {os.path.abspath(p) for p in sys.path if p and os.path.isdir(p)}
+    return tuple(sorted(roots, key=len, reverse=True))
+
+
+class SamplingProfiler:
+    """
+    Sample the Python stacks of all threads from a background thread.
+
+    Sampling every few milliseconds keeps the overhead on the profiled
+    request low and needs no tracing hooks, so asyncio code is profiled
+    as well as code running in worker threads. Because all threads are
+    sampled, requests running concurrently appear in the profile too.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the profiler.
+
+        Args:
+            interval: Seconds between samples
+        """
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._labels: Dict[Any, str] = {}
+
+    def start(self) -> None:
+        """Start sampling."""
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code, self._labels))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)).replace(";", ":"))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """
+        Render the samples in the folded-stack format.
+
+        Each line is `root;...;leaf count`, the input of flamegraph.pl,
+        speedscope and most other flame graph viewers.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    """Profiles on disk: `<id>.folded` stacks and `<id>.json` metadata."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        """
+        Initialize the store.
+
+        Args:
+            directory: Directory holding the profiles
+            max_profiles: Profiles kept; the oldest are deleted first
+        """
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id() -> str:
+        """Generate a profile ID (creation time plus a random suffix)."""
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.urandom(4).hex()}"
+
+    def save(self, profile_id: str, profiler: SamplingProfiler, meta: Dict[str, Any]) -> None:
+        """
+        Write a profile and prune old ones.
+
+        Args:
+            profile_id: ID from new_id
+            profiler: Stopped profiler
+            meta: Request details stored alongside the stacks
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(profile_id, "folded"), "w", encoding="utf-8") as f:
+            f.write(profiler.folded())
+        meta = {
+            "id": profile_id,
+            "created": time.time(),
+            "samples": profiler.samples,
+            "interval_ms": profiler.interval * 1000,
+            **meta,
+        }
+        with open(self._path(profile_id, "json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        self._prune()
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Return the metadata of stored profiles, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda meta: meta.get("created", 0), reverse=True)
+
+    def folded_path(self, profile_id: str) -> Optional[str]:
+        """
+        Get the folded-stack file of a profile.
+
+        Returns:
+            File path, or None if the ID is invalid or unknown
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = self._path(profile_id, "folded")
+        return path if os.path.exists(path) else None
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def _prune(self) -> None:
+        for meta in self.list()[self.max_profiles:]:
+            for extension in ("folded", "json"):
+                try:
+                    os.remove(self._path(meta["id"], extension))
+                except OSError:
+                    pass
+
+
+@lru_cache()
+def get_profile_store() -> ProfileStore:
+    """Get the profile store configured from settings."""
+    settings = get_settings()
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling selected HTTP requests.
+
+    A request is profiled when it carries an `X-Profile-Token` header equal
+    to PROFILING_ADMIN_TOKEN, or is picked at PROFILING_SAMPLE_RATE. Only
+    one request is profiled at a time since the sampler sees all threads;
+    requests arriving meanwhile run unprofiled. Profiled responses carry
+    the profile ID in an `X-Profile-Id` header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.PROFILING_ENABLED
+        self.token = settings.PROFILING_ADMIN_TOKEN.encode("latin-1")
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL_MS / 1000
+        self._busy = threading.Lock()
+
+    def _requested(self, scope) -> Optional[str]:
+        if self.token:
+            for name, value in scope.get("headers") or []:
+                if name == b"x-profile-token" and value == self.token:
+                    return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger = self._requested(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = ProfileStore.new_id()
+        trace = current_span()
+        status = {"code": None}
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            self._busy.release()
+            meta = {
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "status_code": status["code"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "trigger": trigger,
+                "trace_id": trace.trace_id if trace is not None else None,
+            }
+            try:
+                await asyncio.to_thread(get_profile_store().save, profile_id, profiler, meta)
+            except OSError as e:
+                print(f"Saving profile failed: {e}")
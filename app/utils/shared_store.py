@@ -0,0 +1,229 @@
+"""Cross-process cache and limiter backend built on SQLite in WAL mode."""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import Any, Optional
+
+from app.config import get_settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (name, holder)
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedStore:
+    """
+    Key/value cache, counters and concurrency leases shared by all workers.
+
+    Every worker process on the host opens the same SQLite file. WAL mode
+    lets readers proceed while one writer commits, and each operation is a
+    single short transaction, so calls take tens of microseconds and can be
+    made directly from request handlers. Connections are opened per thread
+    and reopened after fork.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the shared store.
+
+        Args:
+            path: SQLite database file path
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Cache
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Get a cached value.
+
+        Args:
+            namespace: Cache namespace
+            key: Cache key
+
+        Returns:
+            Decoded JSON value, or None if missing or expired
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] is not None and row[1] < time.time():
+            self.delete(namespace, key)
+            return None
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store a JSON-serialisable value.
+
+        Args:
+            namespace: Cache namespace
+            key: Cache key
+            value: Value to store
+            ttl: Optional time to live in seconds
+        """
+        expires_at = time.time() + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), expires_at)
+        )
+
+    def delete(self, namespace: str, key: str) -> None:
+        """Delete a cached value."""
+        self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        )
+
+    def purge_expired(self) -> int:
+        """
+        Delete expired cache entries.
+
+        Returns:
+            Number of deleted entries
+        """
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+    # Counters
+
+    def incr(self, name: str, amount: int = 1) -> int:
+        """
+        Atomically increment a counter.
+
+        Args:
+            name: Counter name
+            amount: Increment
+
+        Returns:
+            New counter value
+        """
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+        return conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()[0]
+
+    def counter(self, name: str) -> int:
+        """Return the current value of a counter."""
+        row = self._connection().execute(
+            "SELECT value FROM counters WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    # Leases (cross-process semaphore)
+
+    def try_acquire(self, name: str, limit: int, lease_seconds: float = 600.0) -> Optional[str]:
+        """
+        Try to take one of `limit` leases.
+
+        Leases of crashed workers are reclaimed by checking their pid, and
+        every lease expires after `lease_seconds` as a last resort.
+
+        Args:
+            name: Limiter name
+            limit: Maximum concurrent leases
+            lease_seconds: Lease lifetime
+
+        Returns:
+            Lease holder id, or None if the limit is reached
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE name = ? AND expires_at < ?", (name, now))
+            rows = conn.execute("SELECT holder, pid FROM leases WHERE name = ?", (name,)).fetchall()
+            dead = [holder for holder, pid in rows if not _pid_alive(pid)]
+            for holder in dead:
+                conn.execute("DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder))
+            if len(rows) - len(dead) >= limit:
+                conn.execute("COMMIT")
+                return None
+            holder = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO leases (name, holder, pid, expires_at) VALUES (?, ?, ?, ?)",
+                (name, holder, os.getpid(), now + lease_seconds)
+            )
+            conn.execute("COMMIT")
+            return holder
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release(self, name: str, holder: str) -> None:
+        """Release a lease taken with try_acquire."""
+        self._connection().execute(
+            "DELETE FROM leases WHERE name = ? AND holder = ?", (name, holder)
+        )
+
+    def lease_count(self, name: str) -> int:
+        """Return the number of unexpired leases for a limiter."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM leases WHERE name = ? AND expires_at >= ?", (name, time.time())
+        ).fetchone()[0]
+
+
+def shared_store_enabled() -> bool:
+    """Return True if state should be shared across worker processes."""
+    settings = get_settings()
+    return settings.SHARED_STORE_ENABLED or settings.WORKERS > 1
+
+
+@lru_cache()
+def get_shared_store() -> SharedStore:
+    """Get the shared store for this host."""
+    return SharedStore(get_settings().SHARED_STORE_PATH)
@@ -0,0 +1,217 @@
+"""Per-request SQL statement accounting: slow queries, N+1 patterns and budgets."""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import get_settings
+from app.utils.metrics import metrics
+
+# Longest statement text kept in slow-query and repeated-statement reports
+_MAX_STATEMENT_LENGTH = 300
+
+_current_stats: ContextVar[Optional["QueryStats"]] = ContextVar("sql_query_stats", default=None)
+
+
+class StatementBudgetExceededError(RuntimeError):
+    """Raised in strict mode when a request runs more statements than its budget."""
+
+
+def _shorten(statement: str) -> str:
+    statement = " ".join(statement.split())
+    if len(statement) > _MAX_STATEMENT_LENGTH:
+        return statement[:_MAX_STATEMENT_LENGTH] + "…"
+    return statement
+
+
+class QueryStats:
+    """Statements executed on behalf of one request."""
+
+    def __init__(
+        self,
+        label: str,
+        budget: int = 0,
+        strict: bool = False,
+        slow_ms: float = 0.0,
+        repeat_threshold: int = 0
+    ):
+        """
+        Initialize the stats.
+
+        Args:
+            label: Request description used in warnings (e.g. "GET /path")
+            budget: Maximum number of statements, 0 for no budget
+            strict: Raise StatementBudgetExceededError when over budget
+                instead of only reporting it
+            slow_ms: Duration from which a statement counts as slow, 0 to
+                disable the slow-query log
+            repeat_threshold: Executions of the same statement text from
+                which it is reported as a likely N+1 pattern, 0 to disable
+        """
+        self.label = label
+        self.budget = budget
+        self.strict = strict
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.count = 0
+        self.total_time = 0.0
+        self.slow: List[Dict[str, Any]] = []
+        self.statements: Counter = Counter()
+        self.repeated: List[str] = []
+
+    def before(self, statement: str) -> None:
+        """Count a statement about to run, enforcing the budget in strict mode."""
+        self.count += 1
+        if self.budget and self.count > self.budget and self.strict:
+            raise StatementBudgetExceededError(
+                f"{self.label} exceeded its budget of {self.budget} SQL statements"
+            )
+        # Parameters are bound separately, so N+1 loops repeat the same text
+        self.statements[statement] += 1
+        if self.repeat_threshold and self.statements[statement] == self.repeat_threshold:
+            self.repeated.append(statement)
+            metrics.inc("db_repeated_statements_total")
+            print(f"Possible N+1 in {self.label}: statement ran {self.repeat_threshold}+ times: "
+                  f"{_shorten(statement)}")
+
+    def after(self, statement: str, elapsed: float) -> None:
+        """Record the duration of a finished statement."""
+        self.total_time += elapsed
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            self.slow.append({"statement": _shorten(statement), "ms": round(elapsed * 1000, 1)})
+            metrics.inc("db_slow_queries_total")
+            print(f"Slow query in {self.label} ({elapsed * 1000:.0f} ms): {_shorten(statement)}")
+
+    @property
+    def over_budget(self) -> bool:
+        return bool(self.budget) and self.count > self.budget
+
+    def summary(self) -> Dict[str, Any]:
+        """Return counts, time and findings as a dictionary."""
+        return {
+            "statements": self.count,
+            "db_time_ms": round(self.total_time * 1000, 1),
+            "slow": self.slow,
+            "repeated": [
+                {"statement": _shorten(statement), "count": self.statements[statement]}
+                for statement in self.repeated
+            ],
+            "over_budget": self.over_budget,
+        }
+
+    def finish(self) -> None:
+        """Publish per-request metrics and report a non-strict budget overrun."""
+        metrics.observe("db_statements_per_request", self.count)
+        metrics.observe("db_time_per_request_seconds", self.total_time)
+        if self.over_budget and not self.strict:
+            metrics.inc("db_statement_budget_exceeded_total")
+            print(f"{self.label} ran {self.count} SQL statements (budget {self.budget})")
+
+
+@contextmanager
+def track_queries(
+    label: str = "block",
+    budget: Optional[int] = None,
+    strict: Optional[bool] = None
+) -> Iterator[QueryStats]:
+    """
+    Account for the SQL statements executed inside the block.
+
+    Statements run in worker threads started from the block (e.g. sync
+    endpoints, asyncio.to_thread) are included since the stats live in a
+    context variable. Useful in tests of services:
+
+        with track_queries("list pages", budget=2, strict=True) as stats:
+            DesignService(db).list_pages(diagram_id)
+        assert not stats.repeated
+
+    Requests made through a test client run in the client's own thread;
+    for those set SQL_MONITOR_STRICT and SQL_STATEMENT_BUDGET so that the
+    middleware fails them.
+
+    Args:
+        label: Description used in warnings
+        budget: Statement budget (defaults to SQL_STATEMENT_BUDGET)
+        strict: Fail on budget overrun (defaults to SQL_MONITOR_STRICT)
+
+    Yields:
+        QueryStats of the block
+    """
+    settings = get_settings()
+    stats = QueryStats(
+        label,
+        budget=settings.SQL_STATEMENT_BUDGET if budget is None else budget,
+        strict=settings.SQL_MONITOR_STRICT if strict is None else strict,
+        slow_ms=settings.SQL_SLOW_QUERY_MS,
+        repeat_threshold=settings.SQL_REPEATED_STATEMENT_THRESHOLD
+    )
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        stats.finish()
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Return the stats of the current request, if it is being tracked."""
+    return _current_stats.get()
+
+
+def install_sql_monitor(engine) -> None:
+    """
+    Count and time every statement run inside track_queries.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.before(statement)
+            conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stats = _current_stats.get()
+        started = conn.info.pop("query_started", None)
+        if stats is not None and started is not None:
+            stats.after(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None:
+            context.connection.info.pop("query_started", None)
+
+
+class SQLMonitorMiddleware:
+    """
+    ASGI middleware tracking the SQL statements of every HTTP request.
+
+    Adds a `Server-Timing: db;dur=<ms>;desc="<n> statements"` header,
+    which browser developer tools show next to the request timing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = get_settings().SQL_MONITOR_ENABLED
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(f"{scope.get('method')} {scope.get('path')}") as stats:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    timing = f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} statements"'
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.encode("latin-1"))
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,247 @@
+"""Fingerprinted, pre-compressed static asset serving."""
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; gzip is always available
+    brotli = None
+
+# Cache headers for fingerprinted and for plain (revalidated) URLs
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Path of the vendored mxGraph client, relative to the static directory
+MXGRAPH_ASSET = "vendor/mxgraph/mxClient.min.js"
+
+_COMPRESSIBLE_PREFIXES = ("text/", "application/javascript", "application/json",
+                          "application/xml", "image/svg+xml")
+_MIN_COMPRESS_SIZE = 1024
+_STATIC_URL_PATTERN = re.compile(r'(src|href)="/static/([^"?#]+)"')
+
+
+@dataclass
+class StaticAsset:
+    """A static file held in memory with its compressed variants."""
+
+    path: str
+    content: bytes
+    media_type: str
+    digest: str
+    encodings: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def fingerprinted_path(self) -> str:
+        """Path with the content hash inserted before the extension."""
+        stem, dot, ext = self.path.rpartition(".")
+        if not dot:
+            return f"{self.path}.{self.digest}"
+        return f"{stem}.{self.digest}.{ext}"
+
+
+def _compress(asset: StaticAsset) -> None:
+    """Precompute gzip and (if available) brotli variants that save bytes."""
+    if len(asset.content) < _MIN_COMPRESS_SIZE or \
+            not asset.media_type.startswith(_COMPRESSIBLE_PREFIXES):
+        return
+    variants = {"gzip": gzip.compress(asset.content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(asset.content, quality=9)
+    for encoding, data in variants.items():
+        if len(data) < len(asset.content):
+            asset.encodings[encoding] = data
+
+
+def _choose_encoding(asset: StaticAsset, accept_encoding: str) -> Optional[str]:
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in asset.encodings:
+            return encoding
+    return None
+
+
+class AssetManifest:
+    """
+    In-memory manifest of the frontend static directory.
+
+    Every file is read once at startup, hashed and compressed. Assets are
+    addressable both by their plain path (revalidated with ETags) and by a
+    fingerprinted path containing the content hash (cached forever with
+    `Cache-Control: immutable`). HTML pages are rewritten to reference the
+    fingerprinted URLs, so a deploy changes the URL of every changed asset
+    and repeat visits transfer nothing else.
+    """
+
+    def __init__(self, directory: Path, fallbacks: Optional[Dict[str, str]] = None):
+        """
+        Initialize the manifest by loading all files under a directory.
+
+        Args:
+            directory: Static files root
+            fallbacks: External URLs used for assets missing on disk,
+                keyed by path relative to the static root
+        """
+        self.directory = directory
+        self.fallbacks = fallbacks or {}
+        self.assets: Dict[str, StaticAsset] = {}
+        self._by_fingerprint: Dict[str, StaticAsset] = {}
+
+        for file_path in sorted(directory.rglob("*")):
+            if not file_path.is_file() or file_path.name.startswith("."):
+                continue
+            relative = file_path.relative_to(directory).as_posix()
+            content = file_path.read_bytes()
+            media_type = mimetypes.guess_type(relative)[0] or "application/octet-stream"
+            asset = StaticAsset(
+                path=relative,
+                content=content,
+                media_type=media_type,
+                digest=hashlib.sha256(content).hexdigest()[:12],
+            )
+            _compress(asset)
+            self.assets[relative] = asset
+            self._by_fingerprint[asset.fingerprinted_path] = asset
+
+    def url_for(self, path: str) -> str:
+        """
+        Get the URL to reference an asset with.
+
+        Args:
+            path: Asset path relative to the static root
+
+        Returns:
+            Fingerprinted /static URL, the configured fallback URL if the
+            asset is missing, or the plain /static URL otherwise
+        """
+        asset = self.assets.get(path)
+        if asset is not None:
+            return f"/static/{asset.fingerprinted_path}"
+        fallback = self.fallbacks.get(path)
+        if fallback:
+            return fallback
+        return f"/static/{path}"
+
+    def missing(self, paths: List[str]) -> List[str]:
+        """
+        List required assets that are neither on disk nor have a fallback URL.
+
+        Args:
+            paths: Asset paths relative to the static root
+
+        Returns:
+            The paths that pages referencing them could not load
+        """
+        return [path for path in paths if path not in self.assets and not self.fallbacks.get(path)]
+
+    def rewrite_html(self, html: str) -> str:
+        """Replace /static references in an HTML document with url_for URLs."""
+        return _STATIC_URL_PATTERN.sub(
+            lambda match: f'{match.group(1)}="{self.url_for(match.group(2))}"', html
+        )
+
+    def lookup(self, path: str) -> Tuple[Optional[StaticAsset], bool]:
+        """
+        Find an asset by plain or fingerprinted path.
+
+        Args:
+            path: Requested path relative to the static root
+
+        Returns:
+            Tuple of (asset or None, whether the path was fingerprinted)
+        """
+        asset = self._by_fingerprint.get(path)
+        if asset is not None:
+            return asset, True
+        return self.assets.get(path), False
+
+
+def asset_response(
+    asset: StaticAsset,
+    request: Request,
+    immutable: bool,
+    media_type: Optional[str] = None
+) -> Response:
+    """
+    Build the response for an asset, honouring ETags and Accept-Encoding.
+
+    Args:
+        asset: Asset to serve
+        request: Incoming request
+        immutable: Whether the URL is fingerprinted and may be cached forever
+        media_type: Override for the asset media type
+
+    Returns:
+        304 response if the client copy is current, otherwise the asset body
+    """
+    encoding = _choose_encoding(asset, request.headers.get("accept-encoding", ""))
+    etag = f'"{asset.digest}-{encoding}"' if encoding else f'"{asset.digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+
+    if asset.digest in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    body = asset.content
+    if encoding:
+        body = asset.encodings[encoding]
+        headers["Content-Encoding"] = encoding
+    if request.method == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(content=body, media_type=media_type or asset.media_type, headers=headers)
+
+
+def html_asset(path: str, html: str) -> StaticAsset:
+    """
+    Create a compressed in-memory asset for a rendered HTML page.
+
+    Args:
+        path: Logical path of the page
+        html: Rendered HTML
+
+    Returns:
+        StaticAsset holding the page
+    """
+    content = html.encode("utf-8")
+    asset = StaticAsset(
+        path=path,
+        content=content,
+        media_type="text/html",
+        digest=hashlib.sha256(content).hexdigest()[:12],
+    )
+    _compress(asset)
+    return asset
+
+
+def vendor_asset(url: str, destination: Path) -> int:
+    """
+    Download a third-party asset into the static directory.
+
+    Run once when preparing a release for network-restricted deployments
+    (e.g. `python main.py --vendor-assets`), then commit or ship the file.
+
+    Args:
+        url: Source URL
+        destination: File to write
+
+    Returns:
+        Number of bytes written
+    """
+    import httpx
+
+    response = httpx.get(url, follow_redirects=True, timeout=60.0)
+    response.raise_for_status()
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    destination.write_bytes(response.content)
+    return len(response.content)
@@ -0,0 +1,75 @@
+"""Tokenization for the full-text search index, including CJK text."""
+import re
+from collections import Counter
+from typing import Any, Dict, List
+
+# Longest term stored in the index
+MAX_TERM_LENGTH = 32
+
+# Runs of CJK ideographs, or runs of ASCII letters and digits
+_TOKEN_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+
+
+def _is_cjk_run(run: str) -> bool:
+    return not run[0].isascii()
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into index terms.
+
+    Chinese has no word delimiters, so CJK runs are split into overlapping
+    character bigrams ("提交申请" -> "提交", "交申", "申请"), which matches
+    any query of two or more characters without a segmentation
+    dictionary. Other text is split into lowercase alphanumeric words.
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        Terms in order of appearance (with repeats)
+    """
+    terms: List[str] = []
+    for run in _TOKEN_PATTERN.findall(text.lower()):
+        if _is_cjk_run(run):
+            if len(run) == 1:
+                terms.append(run)
+            else:
+                terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            terms.append(run[:MAX_TERM_LENGTH])
+    return terms
+
+
+def term_frequencies(text: str) -> Counter:
+    """Count the index terms of a text."""
+    return Counter(tokenize(text))
+
+
+def flow_labels(flow_data: Dict[str, Any]) -> List[str]:
+    """
+    Collect the node labels of a business flow, UI flow or prototype.
+
+    Args:
+        flow_data: Parsed business flow with processes and decisions, or
+            UI flow / prototype with screens
+
+    Returns:
+        Process names and actors, decision names and branch targets;
+        screen names and descriptions, component labels and navigation
+        actions
+    """
+    labels: List[str] = []
+    for process in (flow_data or {}).get("processes", []):
+        labels.extend(v for v in (process.get("name"), process.get("actor")) if v)
+    for decision in (flow_data or {}).get("decisions", []):
+        labels.extend(
+            v for v in (decision.get("name"), decision.get("true_branch"), decision.get("false_branch")) if v
+        )
+    for screen in (flow_data or {}).get("screens", []):
+        labels.extend(v for v in (screen.get("name"), screen.get("description")) if v)
+        labels.extend(c["label"] for c in screen.get("components", []) if c.get("label"))
+    for transition in (flow_data or {}).get("transitions", []):
+        if transition.get("action"):
+            labels.append(transition["action"])
+    return labels
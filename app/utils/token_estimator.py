@@ -0,0 +1,62 @@
+"""Offline token estimation for prompt budgeting."""
+import math
+
+
+def _is_cjk(char: str) -> bool:
+    """Return True if the character is a CJK ideograph or CJK punctuation."""
+    code = ord(char)
+    return (
+        0x4E00 <= code <= 0x9FFF      # CJK Unified Ideographs
+        or 0x3400 <= code <= 0x4DBF   # CJK Extension A
+        or 0x3000 <= code <= 0x303F   # CJK Symbols and Punctuation
+        or 0xFF00 <= code <= 0xFFEF   # Full-width forms
+        or 0xF900 <= code <= 0xFAFF   # CJK Compatibility Ideographs
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a text without calling a tokenizer.
+
+    CJK characters are counted as one token each, other characters are
+    counted at roughly four characters per token. This slightly
+    over-estimates for BPE tokenizers, which is the safe side for budgeting.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+
+    cjk = sum(1 for char in text if _is_cjk(char))
+    other = len(text) - cjk
+    return cjk + math.ceil(other / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = "…") -> str:
+    """
+    Truncate text so that its estimated token count fits in max_tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum estimated tokens
+        marker: Suffix appended when text is truncated
+
+    Returns:
+        Original text if it fits, otherwise the truncated text with marker
+    """
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    budget = max_tokens - estimate_tokens(marker)
+    used = 0.0
+    for index, char in enumerate(text):
+        used += 1 if _is_cjk(char) else 0.25
+        if used > budget:
+            return text[:index] + marker
+    return text
@@ -0,0 +1,380 @@
+"""Request tracing: nested timed spans exported per trace."""
+import importlib
+from abc import ABC, abstractmethod
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import get_settings
+
+# W3C trace context header: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# Longest string attribute value kept on a span (e.g. SQL statements)
+_MAX_ATTRIBUTE_LENGTH = 500
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class SpanExporter(ABC):
+    """Receives finished spans; subclass and set TRACING_EXPORTER to plug one in."""
+
+    @abstractmethod
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        """
+        Export finished spans.
+
+        Args:
+            spans: Span dictionaries (see Span.to_dict), usually one trace
+        """
+
+    def shutdown(self) -> None:
+        """Flush and release resources."""
+
+
+class JSONLinesExporter(SpanExporter):
+    """Append spans to a local JSON-lines file, one span per line."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the exporter.
+
+        Args:
+            path: File to append to; its directory is created if needed
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        lines = "".join(json.dumps(span, ensure_ascii=False, default=str) + "\n" for span in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class Trace:
+    """Spans of one trace, exported together when the root span ends."""
+
+    def __init__(self, trace_id: str, exporter: SpanExporter):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.finished: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._root_ended = False
+
+    def add(self, span: "Span", is_root: bool) -> None:
+        with self._lock:
+            self.finished.append(span.to_dict())
+            if not (is_root or self._root_ended):
+                return
+            # Spans ending after the root (background work) go out on their own
+            self._root_ended = True
+            spans, self.finished = self.finished, []
+        try:
+            self.exporter.export(spans)
+        except Exception as e:
+            print(f"Trace export failed: {e}")
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = {}
+        self.set_attributes(**attributes)
+        self.status = "ok"
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value continuing the trace from this span."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute; long strings are truncated."""
+        if isinstance(value, str) and len(value) > _MAX_ATTRIBUTE_LENGTH:
+            value = value[:_MAX_ATTRIBUTE_LENGTH] + "…"
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        """Set several attributes; None values are skipped."""
+        for key, value in attributes.items():
+            if value is not None:
+                self.set_attribute(key, value)
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        self.status = "error"
+        self.set_attribute("error", f"{type(error).__name__}: {error}")
+
+    def end(self) -> None:
+        """Finish the span and hand it to the trace."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        self.trace.add(self, is_root=self.parent_id is None or self.attributes.get("remote_parent") is True)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Creates traces and spans and hands finished traces to an exporter."""
+
+    def __init__(self, exporter: Optional[SpanExporter], sample_rate: float = 1.0):
+        """
+        Initialize the tracer.
+
+        Args:
+            exporter: Span exporter, or None to disable tracing
+            sample_rate: Fraction of new traces that are recorded; traces
+                continued from a sampled incoming traceparent are always
+                recorded
+        """
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None, **attributes: Any) -> Optional[Span]:
+        """
+        Start the root span of a request, continuing an incoming trace if given.
+
+        Args:
+            name: Span name
+            traceparent: Incoming W3C traceparent header, if any
+            **attributes: Span attributes
+
+        Returns:
+            Root span, or None if tracing is disabled or the trace is not sampled
+        """
+        if self.exporter is None:
+            return None
+        match = _TRACEPARENT.match((traceparent or "").strip().lower())
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not int(flags, 16) & 1:
+                return None
+            span = Span(Trace(trace_id, self.exporter), name, parent_id, attributes)
+            # The parent lives in the caller's process; this span ends our part
+            span.set_attribute("remote_parent", True)
+            return span
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        return Span(Trace(os.urandom(16).hex(), self.exporter), name, None, attributes)
+
+    def start_span(self, name: str, **attributes: Any) -> Optional[Span]:
+        """
+        Start a child of the current span without making it current.
+
+        Used for leaf operations timed from callbacks, such as SQL
+        statements. Nothing is recorded outside a trace.
+
+        Returns:
+            Span, or None if no trace is active
+        """
+        parent = _current_span.get()
+        if parent is None:
+            return None
+        return Span(parent.trace, name, parent.span_id, attributes)
+
+
+class _NoopSpan:
+    """Stand-in used when no trace is active, so call sites need no checks."""
+
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Any]:
+    """
+    Make a span current for the duration of the block and end it afterwards.
+
+    Args:
+        span: Span from Tracer.start_trace, or None (no-op)
+
+    Yields:
+        The span, or a no-op span
+    """
+    if span is None:
+        yield _NOOP_SPAN
+        return
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def span(name: str, **attributes: Any):
+    """
+    Time a block as a child of the current span.
+
+    Works in sync and async code alike, and across asyncio.to_thread since
+    the current span lives in a context variable. Outside a trace the
+    block runs with a no-op span.
+
+    Example:
+        with span("diagram.layout", steps=12) as s:
+            ...
+            s.set_attribute("pages", 2)
+
+    Args:
+        name: Span name
+        **attributes: Span attributes
+
+    Returns:
+        Context manager yielding the span
+    """
+    return use_span(get_tracer().start_span(name, **attributes))
+
+
+def current_span() -> Optional[Span]:
+    """Return the active span, if any."""
+    return _current_span.get()
+
+
+def _load_exporter(name: str) -> Optional[SpanExporter]:
+    """Build the exporter selected by TRACING_EXPORTER."""
+    settings = get_settings()
+    if name in ("", "none"):
+        return None
+    if name == "jsonl":
+        return JSONLinesExporter(settings.TRACING_JSONL_PATH)
+    # Dotted path of a SpanExporter subclass, e.g. "mypackage.tracing.OTLPExporter"
+    module_name, _, class_name = name.rpartition(".")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+@lru_cache()
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer configured from settings."""
+    settings = get_settings()
+    exporter = _load_exporter(settings.TRACING_EXPORTER) if settings.TRACING_ENABLED else None
+    return Tracer(exporter, settings.TRACING_SAMPLE_RATE)
+
+
+def install_sql_tracing(engine) -> None:
+    """
+    Record a span for every SQL statement executed inside a trace.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        db_span = get_tracer().start_span(
+            "db.query",
+            statement=" ".join(statement.split()),
+            executemany=executemany or None
+        )
+        conn.info.setdefault("trace_spans", []).append(db_span)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get("trace_spans")
+        db_span = spans.pop() if spans else None
+        if db_span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                db_span.set_attribute("rows", cursor.rowcount)
+            db_span.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        db_span = spans.pop() if spans else None
+        if db_span is not None:
+            db_span.record_error(context.original_exception)
+            db_span.end()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware starting a trace for every HTTP request.
+
+    An incoming `traceparent` header is continued; the trace ID is
+    returned in the `traceparent` and `X-Trace-Id` response headers, so a
+    slow request can be looked up in the exported spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tracer = get_tracer()
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        root = tracer.start_trace(
+            "http.request",
+            traceparent=headers.get(b"traceparent", b"").decode("latin-1"),
+            method=scope.get("method"),
+            path=scope.get("path"),
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("status_code", message["status"])
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"traceparent", root.traceparent.encode("latin-1")),
+                    (b"x-trace-id", root.trace_id.encode("latin-1")),
+                ]
+            await send(message)
+
+        with use_span(root):
+            await self.app(scope, receive, send_with_trace)
@@ -10,9 +10,10 @@ const api = {
      * Send a message to the AI and get response
      * @param {string} message - User message content
      * @param {number|null} conversationId - Conversation ID (null for new conversation)
+     * @param {number|null} baseDiagramId - Diagram shown in the viewer; requests a delta response
      * @returns {Promise<Object>} Response with message and generated content
      */
-    async sendMessage(message, conversationId = null) {
+    async sendMessage(message, conversationId = null, baseDiagramId = null) {
         const response = await fetch(`${API_BASE}/chat/message`, {
             method: 'POST',
             headers: {
@@ -20,7 +21,9 @@ const api = {
             },
             body: JSON.stringify({
                 message: message,
-                conversation_id: conversationId
+                conversation_id: conversationId,
+                base_diagram_id: baseDiagramId,
+                response_mode: baseDiagramId ? 'delta' : 'full'
             })
         });
 
@@ -92,6 +95,62 @@ const api = {
         window.URL.revokeObjectURL(url);
     },
 
+    /**
+     * Get the full DrawIO XML of a diagram
+     * @param {number} diagramId - Diagram ID
+     * @returns {Promise<string>} DrawIO XML
+     */
+    async getDiagramXML(diagramId) {
+        const response = await fetch(`${API_BASE}/export/drawio/${diagramId}`);
+
+        if (!response.ok) {
+            throw new Error('Failed to fetch diagram');
+        }
+
+        return await response.text();
+    },
+
+    /**
+     * Get one page of a multi-page diagram
+     * @param {number} diagramId - Diagram ID
+     * @param {number} pageIndex - 0-based page index
+     * @returns {Promise<string>} Single-page DrawIO XML
+     */
+    async getDiagramPage(diagramId, pageIndex) {
+        const response = await fetch(`${API_BASE}/export/drawio/${diagramId}/pages/${pageIndex}`);
+
+        if (!response.ok) {
+            throw new Error('Failed to fetch diagram page');
+        }
+
+        return await response.text();
+    },
+
+    /**
+     * Import an existing .drawio file
+     * @param {File} file - Selected .drawio file, sent as the raw request body
+     * @param {number|null} conversationId - Conversation to add it to (null for a new one)
+     * @returns {Promise<Object>} Conversation, design and page summaries with the first page
+     */
+    async importDrawio(file, conversationId = null) {
+        const params = new URLSearchParams({ filename: file.name });
+        if (conversationId) params.set('conversation_id', conversationId);
+        const response = await fetch(`${API_BASE}/import/drawio?${params}`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/xml',
+            },
+            body: file
+        });
+
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.detail || 'Failed to import diagram');
+        }
+
+        return await response.json();
+    },
+
     /**
      * Get all diagrams for a design
      * @param {number} designId - Design ID
@@ -107,6 +166,16 @@ const api = {
         return await response.json();
     },
 
+    /**
+     * Open the WebSocket channel of a conversation
+     * @param {number} conversationId - Conversation ID
+     * @returns {WebSocket} Socket speaking the JSON event protocol
+     */
+    openConversationSocket(conversationId) {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        return new WebSocket(`${scheme}://${window.location.host}${API_BASE}/chat/ws/${conversationId}`);
+    },
+
     /**
      * Check API health
      * @returns {Promise<Object>} Health status
@@ -1,6 +1,6 @@
 /**
  * Main Application Module
- * Handles export functionality
+ * Handles import and export functionality
  */
 
 class App {
@@ -10,6 +10,32 @@ class App {
 
     init() {
         this.setupExportButton();
+        this.setupImportButton();
+    }
+
+    setupImportButton() {
+        const importButton = document.getElementById('importBusinessFlow');
+        const fileInput = document.getElementById('importFile');
+        if (importButton && fileInput) {
+            importButton.addEventListener('click', () => fileInput.click());
+            fileInput.addEventListener('change', () => {
+                const file = fileInput.files[0];
+                fileInput.value = '';
+                if (file) this.importBusinessFlow(file);
+            });
+        }
+    }
+
+    async importBusinessFlow(file) {
+        try {
+            const result = await api.importDrawio(file, chat.currentConversationId);
+            chat.currentConversationId = result.conversation_id;
+            chat.addMessage(result.message, 'bot');
+            await chat.updateBusinessFlow(result.generated_content);
+            this.showNotification('Diagram imported successfully!', 'success');
+        } catch (error) {
+            this.showNotification(`Import failed: ${error.message}`, 'error');
+        }
     }
 
     setupExportButton() {
@@ -22,13 +48,19 @@ class App {
         }
     }
 
-    exportBusinessFlow() {
+    async exportBusinessFlow() {
         try {
             // Use the stored XML from chat module
             const xml = chat.currentFlowXML;
 
             if (!xml) {
-                throw new Error('No diagram available for export');
+                // Delta responses leave the full XML on the server
+                if (!chat.currentDiagramId) {
+                    throw new Error('No diagram available for export');
+                }
+                await api.exportDiagram(chat.currentDiagramId, `business_flow_${Date.now()}.drawio`);
+                this.showNotification('Diagram exported successfully!', 'success');
+                return;
             }
 
             // Create blob and download
@@ -3,6 +3,14 @@
  * Handles chat message display and user interaction
  */
 
+// Typing indicator text for pipeline stages pushed over the socket
+const STAGE_LABELS = {
+    generating: 'AI is analyzing...',
+    reused: 'Reusing a matching diagram...',
+    rendering: 'Rendering diagram...',
+    saving: 'Saving diagram...'
+};
+
 class ChatInterface {
     constructor() {
         this.messagesContainer = document.getElementById('chatMessages');
@@ -12,6 +20,9 @@ class ChatInterface {
         this.currentConversationId = null;
         this.currentDiagramId = null;
         this.currentFlowXML = null;
+        this.socket = null;
+        this.socketConversationId = null;
+        this.pendingRequest = null;
 
         this.init();
     }
@@ -50,7 +61,14 @@ class ChatInterface {
         this.showTypingIndicator();
 
         try {
-            const response = await api.sendMessage(message, this.currentConversationId);
+            let response;
+            try {
+                response = await this.sendOverSocket(message);
+            } catch (error) {
+                if (!error.socketUnavailable) throw error;
+                // WebSocket blocked (e.g. by a proxy): fall back to HTTP
+                response = await api.sendMessage(message, this.currentConversationId, this.shownDiagramId());
+            }
 
             // Update conversation ID
             this.currentConversationId = response.conversation_id;
@@ -62,11 +80,15 @@ class ChatInterface {
             this.addMessage(response.message, 'bot');
 
             // Update business flow diagram
-            this.updateBusinessFlow(response.generated_content);
+            await this.updateBusinessFlow(response.generated_content);
 
         } catch (error) {
             this.hideTypingIndicator();
-            this.addMessage(`Error: ${error.message}`, 'bot', true);
+            if (error.cancelled) {
+                this.addMessage('Generation stopped.', 'bot');
+            } else {
+                this.addMessage(`Error: ${error.message}`, 'bot', true);
+            }
         } finally {
             // Re-enable input
             this.setInputEnabled(true);
@@ -74,8 +96,134 @@ class ChatInterface {
         }
     }
 
+    /**
+     * Connect the conversation socket, creating the conversation if needed
+     * @returns {Promise<WebSocket>} Open socket
+     */
+    async connectSocket() {
+        if (!this.currentConversationId) {
+            const conversation = await api.newConversation();
+            this.currentConversationId = conversation.id;
+        }
+
+        if (this.socket && this.socketConversationId === this.currentConversationId &&
+                this.socket.readyState === WebSocket.OPEN) {
+            return this.socket;
+        }
+        this.closeSocket();
+
+        const socket = api.openConversationSocket(this.currentConversationId);
+        await new Promise((resolve, reject) => {
+            socket.onopen = resolve;
+            socket.onerror = () => {
+                const error = new Error('WebSocket unavailable');
+                error.socketUnavailable = true;
+                reject(error);
+            };
+        });
+
+        socket.onmessage = (event) => this.handleSocketEvent(JSON.parse(event.data));
+        socket.onclose = () => {
+            if (this.socket === socket) this.socket = null;
+            if (this.pendingRequest) {
+                this.pendingRequest.reject(new Error('Connection closed'));
+                this.pendingRequest = null;
+            }
+        };
+        this.socket = socket;
+        this.socketConversationId = this.currentConversationId;
+        return socket;
+    }
+
+    closeSocket() {
+        if (this.socket) {
+            this.socket.close();
+            this.socket = null;
+        }
+    }
+
+    /**
+     * Send a message over the conversation socket
+     * @param {string} message - User message content
+     * @returns {Promise<Object>} Final result event (same shape as the HTTP response)
+     */
+    async sendOverSocket(message) {
+        const socket = await this.connectSocket();
+        const requestId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+
+        return new Promise((resolve, reject) => {
+            const baseDiagramId = this.shownDiagramId();
+            this.pendingRequest = { requestId, baseDiagramId, resolve, reject };
+            socket.send(JSON.stringify({
+                type: 'message',
+                message,
+                request_id: requestId,
+                base_diagram_id: baseDiagramId,
+                response_mode: baseDiagramId ? 'delta' : 'full'
+            }));
+        });
+    }
+
+    /**
+     * ID of the diagram the viewer shows, used as the base for delta responses
+     * @returns {number|null}
+     */
+    shownDiagramId() {
+        return drawioViewer ? drawioViewer.currentDiagramId : null;
+    }
+
+    cancelGeneration() {
+        if (this.socket && this.pendingRequest) {
+            this.socket.send(JSON.stringify({
+                type: 'cancel',
+                request_id: this.pendingRequest.requestId
+            }));
+        }
+    }
+
+    handleSocketEvent(event) {
+        if (event.type === 'ping') {
+            this.socket.send(JSON.stringify({ type: 'pong' }));
+            return;
+        }
+
+        const pending = this.pendingRequest;
+        if (!pending || (event.request_id && event.request_id !== pending.requestId)) {
+            return;
+        }
+
+        switch (event.type) {
+            case 'status':
+                this.setTypingStatus(STAGE_LABELS[event.stage] || event.stage);
+                break;
+            case 'partial_flow':
+                // Keep the base of a delta request on screen until the patch arrives
+                if (drawioViewer && !pending.baseDiagramId) {
+                    drawioViewer.clearPages();
+                    drawioViewer.renderFromJSON(event.flow);
+                }
+                break;
+            case 'result':
+                this.pendingRequest = null;
+                pending.resolve(event);
+                break;
+            case 'cancelled': {
+                this.pendingRequest = null;
+                const error = new Error('Cancelled');
+                error.cancelled = true;
+                pending.reject(error);
+                break;
+            }
+            case 'error':
+                this.pendingRequest = null;
+                pending.reject(new Error(event.detail || 'Failed to send message'));
+                break;
+        }
+    }
+
     async newConversation() {
         try {
+            this.closeSocket();
             await api.newConversation();
             this.currentConversationId = null;
             this.currentDiagramId = null;
@@ -125,13 +273,25 @@ class ChatInterface {
         indicator.innerHTML = `
             <div class="message-content">
                 <span class="loading-spinner"></span>
-                <span style="margin-left: 8px;">AI is analyzing...</span>
+                <span class="typing-status" style="margin-left: 8px;">AI is analyzing...</span>
+                <a href="#" class="typing-stop" style="margin-left: 8px;">Stop</a>
             </div>
         `;
+        indicator.querySelector('.typing-stop').addEventListener('click', (e) => {
+            e.preventDefault();
+            this.cancelGeneration();
+        });
         this.messagesContainer.appendChild(indicator);
         this.scrollToBottom();
     }
 
+    setTypingStatus(text) {
+        const status = document.querySelector('#typingIndicator .typing-status');
+        if (status) {
+            status.textContent = text;
+        }
+    }
+
     hideTypingIndicator() {
         const indicator = document.getElementById('typingIndicator');
         if (indicator) {
@@ -139,7 +299,7 @@ class ChatInterface {
         }
     }
 
-    updateBusinessFlow(content) {
+    async updateBusinessFlow(content) {
         if (!content || !content.business_flow) {
             return;
         }
@@ -151,14 +311,26 @@ class ChatInterface {
             this.currentDiagramId = businessFlow.diagram_id;
         }
 
-        // Store XML for rendering and export
-        if (businessFlow.xml) {
-            this.currentFlowXML = businessFlow.xml;
-
-            // Render the diagram using DrawIO viewer
+        if (businessFlow.pages && businessFlow.pages.length > 1) {
+            // Large flows arrive as their first page; export fetches the whole document
+            this.currentFlowXML = null;
             if (drawioViewer) {
-                drawioViewer.renderFromXML(businessFlow.xml);
+                await drawioViewer.setPages(businessFlow.diagram_id, businessFlow.pages, businessFlow.xml);
             }
+        } else if (businessFlow.delta) {
+            // Only changed cells were sent; the full XML stays on the server
+            this.currentFlowXML = null;
+            const applied = drawioViewer && drawioViewer.applyDelta(businessFlow.delta);
+            if (applied) {
+                drawioViewer.currentDiagramId = businessFlow.diagram_id;
+            } else {
+                this.currentFlowXML = await api.getDiagramXML(businessFlow.diagram_id);
+                this.renderDiagram(businessFlow.diagram_id, this.currentFlowXML);
+            }
+        } else if (businessFlow.xml) {
+            // Store XML for rendering and export
+            this.currentFlowXML = businessFlow.xml;
+            this.renderDiagram(businessFlow.diagram_id, businessFlow.xml);
         }
 
         // Show export button
@@ -178,6 +350,15 @@ class ChatInterface {
         }
     }
 
+    renderDiagram(diagramId, xml) {
+        // Render the diagram using DrawIO viewer
+        if (drawioViewer) {
+            drawioViewer.clearPages();
+            drawioViewer.renderFromXML(xml);
+            drawioViewer.currentDiagramId = diagramId;
+        }
+    }
+
     setInputEnabled(enabled) {
         this.userInput.disabled = !enabled;
         this.sendButton.disabled = !enabled;
@@ -6,6 +6,10 @@ class DrawIOViewer {
         this.container = document.getElementById(containerId);
         this.graph = null;
         this.currentDiagramId = null;
+        this.pageTabs = document.getElementById('page-tabs');
+        this.pages = [];
+        this.pageCache = new Map();
+        this.currentPage = 0;
 
         if (!this.container) {
             console.error('Container not found:', containerId);
@@ -46,6 +50,24 @@ class DrawIOViewer {
             mxUtils.clone(this.graph.getStylesheet().getDefaultEdgeStyle())
         );
 
+        // Cells wrapped in a UserObject (e.g. off-page connectors) keep their label in an attribute
+        const graph = this.graph;
+        graph.convertValueToString = function(cell) {
+            if (mxUtils.isNode(cell.value)) {
+                return cell.value.getAttribute('label') || '';
+            }
+            return mxGraph.prototype.convertValueToString.apply(this, arguments);
+        };
+
+        // Off-page connectors open the page they link to
+        graph.addListener(mxEvent.CLICK, (sender, evt) => {
+            const cell = evt.getProperty('cell');
+            const link = cell && mxUtils.isNode(cell.value) ? cell.value.getAttribute('link') : null;
+            if (link && link.startsWith('data:page/id,')) {
+                this.showPageById(link.substring('data:page/id,'.length));
+            }
+        });
+
         // Add panning
         new mxRubberband(this.graph);
 
@@ -99,6 +121,159 @@ class DrawIOViewer {
         }
     }
 
+    /**
+     * Show a multi-page diagram; other pages are fetched when first opened
+     * @param {number} diagramId - Diagram ID
+     * @param {Array<Object>} pages - Pages ({index, page_id, name})
+     * @param {string} firstPageXML - XML of the first page
+     */
+    setPages(diagramId, pages, firstPageXML) {
+        this.pages = pages;
+        this.pageCache = new Map([[0, firstPageXML]]);
+        this.currentDiagramId = diagramId;
+        return this.showPage(0);
+    }
+
+    /**
+     * Render one page of the current multi-page diagram
+     * @param {number} index - 0-based page index
+     */
+    async showPage(index) {
+        const diagramId = this.currentDiagramId;
+        let xml = this.pageCache.get(index);
+        if (xml === undefined) {
+            try {
+                xml = await api.getDiagramPage(diagramId, index);
+            } catch (error) {
+                console.error('Error loading diagram page:', error);
+                this.showError('Failed to load page');
+                return;
+            }
+            // Another diagram was shown while the page was loading
+            if (diagramId !== this.currentDiagramId) return;
+            this.pageCache.set(index, xml);
+        }
+        this.currentPage = index;
+        this.renderFromXML(xml);
+        this.renderPageTabs();
+    }
+
+    showPageById(pageId) {
+        const page = this.pages.find((p) => p.page_id === pageId);
+        if (page) this.showPage(page.index);
+    }
+
+    renderPageTabs() {
+        if (!this.pageTabs) return;
+        this.pageTabs.innerHTML = '';
+        if (this.pages.length < 2) {
+            this.pageTabs.style.display = 'none';
+            return;
+        }
+        for (const page of this.pages) {
+            const tab = document.createElement('button');
+            tab.className = page.index === this.currentPage ? 'page-tab active' : 'page-tab';
+            tab.textContent = page.name;
+            tab.addEventListener('click', () => this.showPage(page.index));
+            this.pageTabs.appendChild(tab);
+        }
+        this.pageTabs.style.display = 'flex';
+    }
+
+    clearPages() {
+        this.pages = [];
+        this.pageCache = new Map();
+        this.currentPage = 0;
+        this.renderPageTabs();
+    }
+
+    /**
+     * Apply a cell-level delta ({added, changed, removed}) to the current model
+     * @param {Object} delta - Delta from the server, relative to currentDiagramId
+     * @returns {boolean} False if the delta does not apply to the shown diagram
+     */
+    applyDelta(delta) {
+        if (!this.graph || delta.base_diagram_id !== this.currentDiagramId) {
+            return false;
+        }
+
+        const model = this.graph.getModel();
+        const parsed = [...delta.added, ...delta.changed].map((xml) => this.parseCell(xml));
+
+        model.beginUpdate();
+        try {
+            const removed = delta.removed.map((id) => model.getCell(id)).filter(Boolean);
+            // Edges of removed vertices are listed in the delta themselves
+            this.graph.removeCells(removed, false);
+
+            // Create or update cells first, then connect edges once all vertices exist
+            for (const data of parsed) {
+                let cell = model.getCell(data.id);
+                if (!cell) {
+                    cell = new mxCell(data.value, data.geometry, data.style);
+                    cell.setId(data.id);
+                    cell.setVertex(data.vertex);
+                    cell.setEdge(data.edge);
+                    model.add(model.getCell(data.parent) || this.graph.getDefaultParent(), cell);
+                } else {
+                    model.setValue(cell, data.value);
+                    model.setStyle(cell, data.style);
+                    model.setGeometry(cell, data.geometry);
+                }
+            }
+            for (const data of parsed) {
+                if (!data.edge) continue;
+                const cell = model.getCell(data.id);
+                model.setTerminal(cell, model.getCell(data.source), true);
+                model.setTerminal(cell, model.getCell(data.target), false);
+            }
+        } finally {
+            model.endUpdate();
+        }
+
+        this.showContainer();
+        return true;
+    }
+
+    /**
+     * Parse a serialized mxCell element, or a UserObject/object wrapping one,
+     * into plain attributes
+     */
+    parseCell(xml) {
+        let node = mxUtils.parseXml(xml).documentElement;
+        let value = null;
+        const id = node.getAttribute('id');
+        if (node.nodeName !== 'mxCell') {
+            // The wrapper (without its mxCell) is the cell value, as when loading a file
+            value = node.cloneNode(false);
+            node = node.getElementsByTagName('mxCell')[0];
+        }
+        const geometryNode = node.getElementsByTagName('mxGeometry')[0];
+        let geometry = null;
+
+        if (geometryNode) {
+            geometry = new mxGeometry(
+                parseFloat(geometryNode.getAttribute('x') || 0),
+                parseFloat(geometryNode.getAttribute('y') || 0),
+                parseFloat(geometryNode.getAttribute('width') || 0),
+                parseFloat(geometryNode.getAttribute('height') || 0)
+            );
+            geometry.relative = geometryNode.getAttribute('relative') === '1';
+        }
+
+        return {
+            id: id,
+            value: value || node.getAttribute('value') || '',
+            style: node.getAttribute('style'),
+            parent: node.getAttribute('parent'),
+            source: node.getAttribute('source'),
+            target: node.getAttribute('target'),
+            vertex: node.getAttribute('vertex') === '1',
+            edge: node.getAttribute('edge') === '1',
+            geometry: geometry
+        };
+    }
+
     /**
      * Create a simple flow diagram from JSON data (fallback)
      */
@@ -111,6 +286,10 @@ class DrawIOViewer {
         try {
             const parent = this.graph.getDefaultParent();
             this.graph.getModel().beginUpdate();
+            this.currentDiagramId = null;
+
+            // Replace any previous rendering (e.g. an earlier partial flow)
+            this.graph.removeCells(this.graph.getChildCells(parent, true, true));
 
             const processes = flowData.processes || [];
             const decisions = flowData.decisions || [];
@@ -256,6 +435,8 @@ class DrawIOViewer {
     }
 
     clear() {
+        this.currentDiagramId = null;
+        this.clearPages();
         if (this.graph) {
             this.graph.getModel().clear();
         }
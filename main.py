@@ -1,15 +1,78 @@
 """Application entry point using uvicorn."""
-import uvicorn
+import argparse
+from pathlib import Path
+
 from app.config import get_settings
+from app.server import run
 
 settings = get_settings()
 
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "app.main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="debug" if settings.DEBUG else "info",
+    parser = argparse.ArgumentParser(description="Run the DrawIO Agent server")
+    parser.add_argument(
+        "--profile-imports",
+        nargs="?",
+        const=25,
+        type=int,
+        metavar="TOP",
+        help="print the slowest imports of the application and exit",
+    )
+    parser.add_argument(
+        "--vendor-assets",
+        action="store_true",
+        help="download third-party frontend assets into frontend/static/vendor and exit",
+    )
+    parser.add_argument(
+        "--reindex-search",
+        action="store_true",
+        help="rebuild the full-text search and similar-flow indexes from all messages and diagrams and exit",
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="purge deleted conversations, archive old ones into cold storage and exit",
+    )
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="create missing tables and indexes from the ORM models and exit",
+    )
+    args = parser.parse_args()
+
+    if args.profile_imports:
+        from app.utils.import_profile import format_report, profile_imports
+        print(format_report(profile_imports("app.main"), top=args.profile_imports))
+    elif args.vendor_assets:
+        from app.utils.static_assets import MXGRAPH_ASSET, vendor_asset
+        destination = Path(__file__).parent / "frontend" / "static" / MXGRAPH_ASSET
+        size = vendor_asset(settings.MXGRAPH_DOWNLOAD_URL, destination)
+        print(f"Vendored {destination} ({size} bytes)")
+    elif args.reindex_search:
+        from app.models.base import get_session_local
+        from app.services.search_service import SearchService
+        from app.services.similar_flow_service import SimilarFlowService
+        db = get_session_local()()
+        try:
+            counts = SearchService(db).reindex()
+            similar_count = SimilarFlowService(db).reindex()
+        finally:
+            db.close()
+        print(f"Indexed {counts['messages']} messages and {counts['diagrams']} diagrams for search")
+        print(f"Indexed {similar_count} diagrams for similar-flow retrieval")
+    elif args.compact:
+        from app.services.retention_service import run_compaction
+        stats = run_compaction()
+        if stats is None:
+            print("Another worker is compacting; skipped")
+        else:
+            print(
+                f"Purged {stats['purged']} and archived {stats['archived']} conversations, "
+                f"created {stats['partitions']} partitions"
+            )
+    elif args.create_schema:
+        from app.models.base import create_schema
+        create_schema()
+        print(f"Schema created for {settings.DATABASE_URL.split('://', 1)[0]}")
+    else:
+        run(settings)
@@ -0,0 +1,27 @@
+-- Optional: partition the messages table by month (MySQL 8.0+)
+--
+-- Old months can then be dropped or exchanged as a whole, and queries
+-- filtered by created_at only touch the partitions they need. Run once on
+-- an existing database, then list the table in RETENTION_PARTITIONED_TABLES
+-- so the retention job (python main.py --compact, or RETENTION_ENABLED)
+-- keeps RETENTION_PARTITION_MONTHS_AHEAD future partitions split off pmax.
+--
+-- MySQL requires the partitioning column in every unique key and does not
+-- support foreign keys on partitioned InnoDB tables, so the primary key is
+-- widened to (id, created_at) and the conversation foreign key is dropped;
+-- the application deletes messages explicitly (see RetentionService).
+
+USE drawio_agent;
+
+ALTER TABLE messages DROP FOREIGN KEY messages_ibfk_1;
+
+ALTER TABLE messages
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at);
+
+-- Rows older than the first boundary all land in the first partition
+ALTER TABLE messages PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p202601 VALUES LESS THAN (UNIX_TIMESTAMP('2026-02-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
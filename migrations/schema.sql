@@ -35,8 +35,8 @@ CREATE TABLE messages (
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
-    INDEX idx_conversation_id (conversation_id),
-    INDEX idx_created_at (created_at)
+    INDEX idx_messages_conversation_id (conversation_id),
+    INDEX idx_messages_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Designs/Projects table
@@ -50,7 +50,7 @@ CREATE TABLE designs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
-    INDEX idx_conversation_id (conversation_id)
+    INDEX idx_designs_conversation_id (conversation_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Diagrams table
@@ -68,6 +68,100 @@ CREATE TABLE diagrams (
     INDEX idx_diagram_type (diagram_type)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- Pages of multi-page diagrams, loaded one at a time by the viewer
+CREATE TABLE diagram_pages (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    diagram_id INT NOT NULL,
+    page_index INT NOT NULL,
+    page_id VARCHAR(64) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    drawio_xml LONGTEXT NOT NULL,
+    UNIQUE KEY uq_diagram_page (diagram_id, page_index),
+    FOREIGN KEY (diagram_id) REFERENCES diagrams(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Full-text search index (see app/services/search_service.py)
+CREATE TABLE search_documents (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    doc_type VARCHAR(16) NOT NULL,
+    doc_id INT NOT NULL,
+    conversation_id INT NOT NULL,
+    length INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_search_doc (doc_type, doc_id),
+    INDEX idx_search_documents_conversation (conversation_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE search_postings (
+    term VARCHAR(32) NOT NULL,
+    document_id INT NOT NULL,
+    tf SMALLINT NOT NULL,
+    PRIMARY KEY (term, document_id),
+    FOREIGN KEY (document_id) REFERENCES search_documents(id) ON DELETE CASCADE,
+    INDEX idx_search_postings_document (document_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+
+-- Near-duplicate flow index (see app/services/similar_flow_service.py)
+CREATE TABLE flow_signatures (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    diagram_id INT NOT NULL,
+    kind VARCHAR(8) NOT NULL,
+    signature BLOB NOT NULL,
+    UNIQUE KEY uq_flow_signature (diagram_id, kind),
+    FOREIGN KEY (diagram_id) REFERENCES diagrams(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE flow_lsh_buckets (
+    bucket VARCHAR(32) NOT NULL,
+    signature_id INT NOT NULL,
+    PRIMARY KEY (bucket, signature_id),
+    FOREIGN KEY (signature_id) REFERENCES flow_signatures(id) ON DELETE CASCADE,
+    INDEX idx_flow_lsh_buckets_signature (signature_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_bin;
+
+-- Cold storage of compacted conversations (see app/services/retention_service.py)
+CREATE TABLE conversation_archives (
+    conversation_id INT PRIMARY KEY,
+    payload LONGBLOB NOT NULL,
+    message_count INT NOT NULL,
+    diagram_count INT NOT NULL,
+    raw_bytes INT NOT NULL,
+    compressed_bytes INT NOT NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE archived_diagrams (
+    diagram_id INT PRIMARY KEY,
+    conversation_id INT NOT NULL,
+    FOREIGN KEY (conversation_id) REFERENCES conversation_archives(conversation_id) ON DELETE CASCADE,
+    INDEX idx_archived_diagrams_conversation (conversation_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- LLM call ledger (see app/services/usage_ledger.py); no foreign keys so
+-- cost history outlives purged conversations
+CREATE TABLE llm_usage (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    conversation_id INT,
+    user_id INT,
+    purpose VARCHAR(16) NOT NULL,
+    backend VARCHAR(64),
+    model VARCHAR(128),
+    status VARCHAR(16) NOT NULL,
+    prompt_tokens INT NOT NULL DEFAULT 0,
+    completion_tokens INT NOT NULL DEFAULT 0,
+    total_tokens INT NOT NULL DEFAULT 0,
+    cached_tokens INT,
+    cache_hit BOOLEAN,
+    latency_ms INT NOT NULL,
+    first_token_ms INT,
+    hedged BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at DATETIME NOT NULL,
+    INDEX idx_llm_usage_conversation (conversation_id),
+    INDEX idx_llm_usage_user_created (user_id, created_at),
+    INDEX idx_llm_usage_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Export history table
 CREATE TABLE export_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
@@ -0,0 +1,25 @@
+"""Shared fixtures."""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every model on Base)
+from app.models.base import Base, _create_sqlite_engine
+
+
+@pytest.fixture
+def sqlite_engine():
+    """In-memory SQLite engine configured like the SQLite deployment mode."""
+    engine = _create_sqlite_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(sqlite_engine):
+    """Session on the in-memory SQLite database."""
+    session = sessionmaker(autocommit=False, autoflush=False, bind=sqlite_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,71 @@
+"""Tests for cell-level diagram diffs."""
+from app.utils.drawio_diff import diff_diagrams, extract_cells
+
+
+def model(*cells: str) -> str:
+    return (
+        '<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>'
+        + "".join(cells)
+        + "</root></mxGraphModel>"
+    )
+
+
+def vertex(cell_id: str, value: str, x: int = 0) -> str:
+    return (
+        f'<mxCell id="{cell_id}" value="{value}" style="rounded=1;" vertex="1" parent="1">'
+        f'<mxGeometry x="{x}" y="0" width="120" height="60" as="geometry"/></mxCell>'
+    )
+
+
+def user_object(cell_id: str, label: str, link: str, x: int = 0, tag: str = "UserObject") -> str:
+    return (
+        f'<{tag} label="{label}" link="{link}" id="{cell_id}">'
+        f'<mxCell style="shape=offPageConnector;" vertex="1" parent="1">'
+        f'<mxGeometry x="{x}" y="0" width="120" height="50" as="geometry"/></mxCell></{tag}>'
+    )
+
+
+def test_wrapped_cells_are_keyed_by_wrapper_id():
+    cells = extract_cells(model(vertex("a", "Start"), user_object("link-1", "Next", "data:page/id,p2")))
+
+    assert list(cells) == ["a", "link-1"]
+    assert cells["link-1"].startswith("<UserObject")
+    assert "offPageConnector" in cells["link-1"]
+
+
+def test_object_wrapper_is_indexed_like_user_object():
+    cells = extract_cells(model(user_object("o1", "Doc", "https://example.com", tag="object")))
+
+    assert list(cells) == ["o1"]
+
+
+def test_wrapper_attribute_change_is_a_changed_cell():
+    base = model(vertex("a", "Start"), user_object("link-1", "Next", "data:page/id,p2"))
+    new = model(vertex("a", "Start"), user_object("link-1", "Continue", "data:page/id,p2"))
+
+    delta = diff_diagrams(base, new)
+
+    assert delta["added"] == [] and delta["removed"] == []
+    assert len(delta["changed"]) == 1
+    assert 'label="Continue"' in delta["changed"][0]
+
+
+def test_inner_cell_change_is_a_changed_cell():
+    base = model(user_object("link-1", "Next", "data:page/id,p2", x=0))
+    new = model(user_object("link-1", "Next", "data:page/id,p2", x=40))
+
+    delta = diff_diagrams(base, new)
+
+    assert len(delta["changed"]) == 1
+    assert 'id="link-1"' in delta["changed"][0]
+
+
+def test_added_and_removed_wrapped_cells():
+    base = model(vertex("a", "Start"), user_object("old", "Old", "data:page/id,p2"))
+    new = model(vertex("a", "Start"), user_object("new", "New", "data:page/id,p3"))
+
+    delta = diff_diagrams(base, new)
+
+    assert delta["removed"] == ["old"]
+    assert len(delta["added"]) == 1 and 'id="new"' in delta["added"][0]
+    assert delta["changed"] == []
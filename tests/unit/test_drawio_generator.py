@@ -0,0 +1,91 @@
+"""Tests for the business flow layout and render caching."""
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from app.config import get_settings
+from app.services.drawio_generator import DrawIOGenerator
+from app.utils.render_cache import get_render_cache
+
+
+@pytest.fixture(autouse=True)
+def no_render_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "RENDER_CACHE_ENABLED", False)
+
+
+def render_pages(flow_data, max_steps):
+    settings = get_settings()
+    previous = settings.DIAGRAM_PAGE_MAX_STEPS
+    settings.DIAGRAM_PAGE_MAX_STEPS = max_steps
+    try:
+        xml = DrawIOGenerator().generate_business_flow_diagram(flow_data)
+    finally:
+        settings.DIAGRAM_PAGE_MAX_STEPS = previous
+    return ET.fromstring(xml).findall("diagram")
+
+
+def cells(page):
+    return page.findall(".//mxCell")
+
+
+def incoming(page, cell_id):
+    return [c for c in cells(page) if c.get("edge") == "1" and c.get("target") == cell_id]
+
+
+def end_cell(page):
+    return next(c for c in cells(page) if c.get("id", "").startswith("end-"))
+
+
+def test_single_page_flow_connects_last_step_to_end():
+    (page,) = render_pages({"processes": [{"name": "提交"}, {"name": "审核"}]}, max_steps=50)
+
+    sources = [edge.get("source") for edge in incoming(page, end_cell(page).get("id"))]
+    assert len(sources) == 1
+    assert next(c for c in cells(page) if c.get("id") == sources[0]).get("value") == "审核"
+
+
+def test_branch_ends_connect_to_end():
+    flow = {
+        "processes": [{"name": "提交"}],
+        "decisions": [{"name": "通过?", "true_branch": "归档", "false_branch": "退回"}],
+    }
+    (page,) = render_pages(flow, max_steps=50)
+
+    assert len(incoming(page, end_cell(page).get("id"))) == 2
+
+
+def test_last_page_without_branches_connects_to_end():
+    # Steps run processes first, then decisions: pages [提交, 通过?] and [复核?, 确认?]
+    flow = {
+        "processes": [{"name": "提交"}],
+        "decisions": [
+            {"name": "通过?", "true_branch": "归档", "false_branch": "退回"},
+            {"name": "复核?"},
+            {"name": "确认?"},
+        ],
+    }
+    first, last = render_pages(flow, max_steps=2)
+
+    end_id = end_cell(last).get("id")
+    sources = {edge.get("source") for edge in incoming(last, end_id)}
+    last_decision = next(c for c in cells(last) if c.get("value") == "确认?")
+    assert sources == {last_decision.get("id")}
+
+    # The branches of the first page reach the end through an off-page connector
+    end_links = [link for link in first.findall(".//UserObject") if link.get("label") == "结束"]
+    assert len(end_links) == 1
+    assert end_links[0].get("link") == "data:page/id,page-2"
+    assert len(incoming(first, end_links[0].get("id"))) == 2
+
+
+def test_repeated_render_is_served_from_cache(monkeypatch):
+    monkeypatch.setattr(get_settings(), "RENDER_CACHE_ENABLED", True)
+    get_render_cache().clear()
+    generator = DrawIOGenerator()
+    flow = {"processes": [{"name": "提交"}]}
+
+    first = generator.render_business_flow(flow)
+    second = generator.render_business_flow({"processes": [{"name": "提交"}]})
+
+    assert second is first
+    assert set(first) == {"xml"}
@@ -0,0 +1,52 @@
+"""Tests for sparse field selection."""
+import orjson
+
+from app.schemas.message import MessageResponse
+from app.utils.field_selection import parse_fields, select_fields, sparse_response
+
+CONTENT = {
+    "business_flow": {
+        "diagram_id": 7,
+        "xml": "<mxfile/>",
+        "pages": [
+            {"index": 0, "name": "Main", "xml": "<mxfile/>"},
+            {"index": 1, "name": "Approval", "xml": "<mxfile/>"},
+        ],
+    }
+}
+
+
+def body(response):
+    return orjson.loads(response.body)
+
+
+def test_parse_fields_builds_nested_spec():
+    assert parse_fields("a,b.c,b.d") == {"a": True, "b": {"c": True, "d": True}}
+    assert parse_fields("b,b.c") == {"b": True}
+    assert parse_fields(" , ") is None
+
+
+def test_select_fields_applies_spec_to_every_list_element():
+    spec = parse_fields("business_flow.pages.index")
+
+    assert select_fields(CONTENT, spec) == {"business_flow": {"pages": [{"index": 0}, {"index": 1}]}}
+
+
+def test_model_response_selects_inside_lists_like_dicts():
+    fields = "message_id,generated_content.business_flow.pages.index"
+    model = MessageResponse(message_id=1, conversation_id=2, message="ok", generated_content=CONTENT)
+
+    from_model = body(sparse_response(model, fields))
+    from_dict = body(sparse_response(model.model_dump(mode="json"), fields))
+
+    assert from_model == {
+        "message_id": 1,
+        "generated_content": {"business_flow": {"pages": [{"index": 0}, {"index": 1}]}},
+    }
+    assert from_model == from_dict
+
+
+def test_without_fields_content_is_returned_unchanged():
+    model = MessageResponse(message_id=1, conversation_id=2, message="ok")
+
+    assert sparse_response(model, None) is model
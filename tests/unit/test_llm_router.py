@@ -0,0 +1,195 @@
+"""Tests for LLMRouter driven by fake chat clients."""
+import asyncio
+import random
+import time
+from collections import Counter
+
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+from app.services.llm_router import CircuitBreaker, LLMBackend, LLMRouter, NoBackendAvailableError
+
+MESSAGES = [HumanMessage(content="hello")]
+
+
+class FakeClient:
+    """Chat client streaming a fixed text after a delay, or failing."""
+
+    def __init__(self, text: str = "PROCESS: step", delay: float = 0.0, error: Exception = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        for word in self.text.split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+
+def make_router(clients, weights=None, **options):
+    weights = weights or {}
+    backends = [
+        LLMBackend(name=name, base_url=f"http://{name}.invalid/v1", model="fake", weight=weights.get(name, 1.0))
+        for name in clients
+    ]
+    options.setdefault("hedge_enabled", False)
+    options.setdefault("breaker_failure_threshold", 3)
+    options.setdefault("breaker_reset_timeout", 30.0)
+    return LLMRouter(backends, client_factory=lambda backend: clients[backend.name], **options)
+
+
+def invoke(router):
+    return asyncio.run(router.ainvoke(MESSAGES, timeout=5.0))
+
+
+def test_fails_over_to_next_backend():
+    clients = {"broken": FakeClient(error=RuntimeError("boom")), "healthy": FakeClient(text="done")}
+    router = make_router(clients, weights={"broken": 1000.0, "healthy": 0.0001})
+    random.seed(0)
+
+    result = invoke(router)
+
+    assert result.backend == "healthy"
+    assert result.content.strip() == "done"
+    assert clients["broken"].calls == 1
+    assert router.breakers["broken"].failures == 1
+    assert router.breakers["healthy"].state == CircuitBreaker.CLOSED
+
+
+def test_raises_when_every_backend_fails():
+    clients = {"a": FakeClient(error=RuntimeError("a")), "b": FakeClient(error=RuntimeError("b"))}
+    router = make_router(clients)
+
+    with pytest.raises(NoBackendAvailableError):
+        invoke(router)
+    assert clients["a"].calls == clients["b"].calls == 1
+
+
+def test_hedges_slow_primary_and_cancels_loser():
+    clients = {"slow": FakeClient(text="slow", delay=2.0), "fast": FakeClient(text="fast")}
+    router = make_router(
+        clients,
+        weights={"slow": 1000.0, "fast": 0.0001},
+        hedge_enabled=True,
+        hedge_min_delay=0.01,
+        hedge_default_delay=0.05,
+    )
+    random.seed(0)
+
+    started = time.monotonic()
+    result = invoke(router)
+
+    assert time.monotonic() - started < 1.0
+    assert result.backend == "fast"
+    assert result.hedged
+    assert clients["slow"].cancelled == 1
+    # The cancelled loser still contributes a (lower-bound) latency sample
+    assert len(router._first_token_latencies["slow"]) == 1
+    assert router._first_token_latencies["slow"][0] >= 0.05
+
+
+def test_no_hedge_when_primary_answers_in_time():
+    clients = {"primary": FakeClient(text="ok"), "spare": FakeClient(text="spare")}
+    router = make_router(
+        clients,
+        weights={"primary": 1000.0, "spare": 0.0001},
+        hedge_enabled=True,
+        hedge_min_delay=0.5,
+        hedge_default_delay=0.5,
+    )
+    random.seed(0)
+
+    result = invoke(router)
+
+    assert result.backend == "primary"
+    assert not result.hedged
+    assert clients["spare"].calls == 0
+
+
+def test_open_breaker_rejects_without_calling_backend():
+    client = FakeClient(error=RuntimeError("down"))
+    router = make_router({"only": client}, breaker_failure_threshold=2)
+
+    for _ in range(2):
+        with pytest.raises(NoBackendAvailableError):
+            invoke(router)
+    assert router.breakers["only"].state == CircuitBreaker.OPEN
+
+    with pytest.raises(NoBackendAvailableError, match="unavailable"):
+        invoke(router)
+    assert client.calls == 2
+
+
+def test_half_open_breaker_probes_once_and_closes_on_success():
+    client = FakeClient(error=RuntimeError("down"))
+    router = make_router({"only": client}, breaker_failure_threshold=1, breaker_reset_timeout=0.05)
+    breaker = router.breakers["only"]
+
+    with pytest.raises(NoBackendAvailableError):
+        invoke(router)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available()
+
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.state == CircuitBreaker.OPEN  # inspecting changes nothing
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()  # one probe at a time
+
+    breaker.record_failure()
+    time.sleep(0.06)
+    client.error = None
+    result = invoke(router)
+
+    assert result.backend == "only"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_is_not_claimed_by_unused_candidates():
+    clients = {"healthy": FakeClient(text="ok"), "recovering": FakeClient(text="ok")}
+    router = make_router(
+        clients,
+        weights={"healthy": 1000.0, "recovering": 0.0001},
+        breaker_failure_threshold=1,
+        breaker_reset_timeout=0.05,
+    )
+    recovering = router.breakers["recovering"]
+    recovering.record_failure()
+    time.sleep(0.06)
+    random.seed(0)
+
+    result = invoke(router)
+
+    assert result.backend == "healthy"
+    assert clients["recovering"].calls == 0
+    assert recovering._probe_started_at is None
+    assert recovering.available()
+
+
+def test_weighted_selection_follows_weights():
+    clients = {"heavy": FakeClient(), "light": FakeClient()}
+    router = make_router(clients, weights={"heavy": 3.0, "light": 1.0})
+    random.seed(1234)
+
+    firsts = Counter(router._candidates()[0].name for _ in range(4000))
+
+    assert 0.72 < firsts["heavy"] / 4000 < 0.78
+    assert router.primary.name == "heavy"
+
+
+def test_open_backends_are_left_out_of_selection():
+    clients = {"up": FakeClient(), "down": FakeClient()}
+    router = make_router(clients, breaker_failure_threshold=1)
+    router.breakers["down"].record_failure()
+
+    assert [b.name for b in router._candidates()] == ["up"]
@@ -0,0 +1,75 @@
+"""Tests for token-budgeted prompt assembly."""
+import pytest
+
+from app.services.prompt_assembler import (
+    NO_HISTORY_PLACEHOLDER,
+    NO_REFERENCE_PLACEHOLDER,
+    PromptAssembler,
+    PromptBudgetExceededError,
+)
+from app.utils.token_estimator import estimate_tokens
+
+SYSTEM = "你是业务流程设计助手。"
+TEMPLATE = "参考:\n{reference_flow}\n历史:\n{conversation_history}\n需求:\n{requirements}"
+REQUIREMENTS = "员工提交报销申请，经理审批后财务付款"
+
+
+def history(messages: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"第{i}条历史消息，" + "内容" * 40}
+        for i in range(messages)
+    ]
+
+
+def fixed_tokens() -> int:
+    return estimate_tokens(SYSTEM) + estimate_tokens(
+        TEMPLATE.format(requirements="", conversation_history="", reference_flow="")
+    )
+
+
+def test_everything_fits_within_a_large_budget():
+    prompt = PromptAssembler(token_budget=10000, max_history_messages=10).assemble(
+        SYSTEM, TEMPLATE, REQUIREMENTS, history(4), reference="步骤一\n步骤二"
+    )
+
+    assert prompt.user.endswith(REQUIREMENTS)
+    assert prompt.history_included == 4
+    assert prompt.reference_included
+    assert not prompt.requirements_truncated
+
+
+def test_exhausted_budget_keeps_requirements_and_trims_history_and_reference():
+    budget = fixed_tokens() + estimate_tokens(REQUIREMENTS) + 5
+    reference = "\n".join(f"参考步骤{i}" for i in range(50))
+
+    prompt = PromptAssembler(token_budget=budget, max_history_messages=10).assemble(
+        SYSTEM, TEMPLATE, REQUIREMENTS, history(10), reference=reference
+    )
+
+    assert prompt.user.endswith(f"需求:\n{REQUIREMENTS}")
+    assert not prompt.requirements_truncated
+    assert prompt.history_included == 0
+    assert prompt.history_dropped == 10
+    assert NO_HISTORY_PLACEHOLDER in prompt.user
+    assert not prompt.reference_included
+    assert NO_REFERENCE_PLACEHOLDER in prompt.user
+
+
+def test_oversized_requirements_are_truncated_but_never_empty():
+    requirements = "需求" * 500
+    budget = fixed_tokens() + 100
+
+    prompt = PromptAssembler(token_budget=budget, max_history_messages=10).assemble(
+        SYSTEM, TEMPLATE, requirements, history(6), reference="步骤一"
+    )
+
+    assert prompt.requirements_truncated
+    assert "需求需求" in prompt.user
+    assert prompt.history_included == 0
+
+
+def test_budget_without_room_for_requirements_fails_clearly():
+    assembler = PromptAssembler(token_budget=fixed_tokens(), max_history_messages=10)
+
+    with pytest.raises(PromptBudgetExceededError, match="PROMPT_TOKEN_BUDGET"):
+        assembler.assemble(SYSTEM, TEMPLATE, REQUIREMENTS, history(4), reference="步骤一")
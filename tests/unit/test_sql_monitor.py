@@ -0,0 +1,116 @@
+"""Tests for the per-request SQL statement monitor against SQLite."""
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.config import get_settings
+from app.models.base import _install_instrumentation
+from app.utils.deadline import deadline_scope
+from app.utils.sql_monitor import StatementBudgetExceededError, install_sql_monitor, track_queries
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    install_sql_monitor(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE pages (id INTEGER PRIMARY KEY, diagram_id INTEGER, name TEXT)"))
+        conn.execute(
+            text("INSERT INTO pages (diagram_id, name) VALUES (:diagram_id, :name)"),
+            [{"diagram_id": i, "name": f"Page {i}"} for i in range(10)]
+        )
+    yield engine
+    engine.dispose()
+
+
+def load_pages_one_by_one(conn, diagram_ids):
+    return [
+        conn.execute(text("SELECT name FROM pages WHERE diagram_id = :id"), {"id": diagram_id}).scalar()
+        for diagram_id in diagram_ids
+    ]
+
+
+def test_counts_statements_inside_block_only(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with track_queries("count", budget=0, strict=True) as stats:
+            conn.execute(text("SELECT count(*) FROM pages"))
+            conn.execute(text("SELECT name FROM pages WHERE id = 1"))
+
+    assert stats.count == 2
+    assert stats.total_time > 0
+    assert not stats.over_budget
+
+
+def test_strict_budget_raises(engine):
+    with engine.connect() as conn:
+        with pytest.raises(StatementBudgetExceededError, match="budget of 3"):
+            with track_queries("list pages", budget=3, strict=True) as stats:
+                load_pages_one_by_one(conn, range(10))
+
+    # The statement over budget is refused before it reaches the database
+    assert stats.count == 4
+
+
+def test_non_strict_budget_only_reports(engine):
+    with engine.connect() as conn:
+        with track_queries("list pages", budget=3, strict=False) as stats:
+            names = load_pages_one_by_one(conn, range(10))
+
+    assert len(names) == 10
+    assert stats.over_budget
+    assert stats.summary()["over_budget"]
+
+
+def test_n_plus_one_loop_is_reported_as_repeated(engine):
+    threshold = get_settings().SQL_REPEATED_STATEMENT_THRESHOLD
+
+    with engine.connect() as conn:
+        with track_queries("list pages", budget=0, strict=True) as stats:
+            load_pages_one_by_one(conn, range(threshold + 2))
+
+    assert len(stats.repeated) == 1
+    assert "WHERE diagram_id = ?" in stats.repeated[0]
+    assert stats.summary()["repeated"][0]["count"] == threshold + 2
+
+
+def test_n_plus_one_is_detected_under_deadline_hints(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "SQL_MONITOR_ENABLED", True)
+    engine = create_engine("sqlite://")
+    # Pose as MySQL so SELECTs get the MAX_EXECUTION_TIME hint (a comment to SQLite)
+    monkeypatch.setattr(engine.dialect, "name", "mysql")
+    _install_instrumentation(engine, settings)
+    threshold = settings.SQL_REPEATED_STATEMENT_THRESHOLD
+
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE pages (id INTEGER PRIMARY KEY, diagram_id INTEGER)"))
+        with deadline_scope(30.0), track_queries("list pages", budget=0) as stats:
+            for diagram_id in range(threshold + 2):
+                conn.execute(text("SELECT id FROM pages WHERE diagram_id = :id"), {"id": diagram_id})
+                # Let the time left, and so the hint text, change between calls
+                time.sleep(0.002)
+    engine.dispose()
+
+    assert len(stats.repeated) == 1
+    assert "MAX_EXECUTION_TIME" not in stats.repeated[0]
+
+
+def test_single_query_is_not_reported_as_repeated(engine):
+    with engine.connect() as conn:
+        with track_queries("list pages", budget=1, strict=True) as stats:
+            conn.execute(text("SELECT name FROM pages WHERE diagram_id IN (1, 2, 3)")).all()
+
+    assert stats.repeated == []
+
+
+def test_slow_statements_are_logged(engine, monkeypatch):
+    monkeypatch.setattr(get_settings(), "SQL_SLOW_QUERY_MS", 0.000001)
+
+    with engine.connect() as conn:
+        with track_queries("slow") as stats:
+            conn.execute(text("SELECT count(*) FROM pages"))
+
+    assert len(stats.slow) == 1
+    assert stats.slow[0]["statement"] == "SELECT count(*) FROM pages"
@@ -0,0 +1,84 @@
+"""Tests for the ORM models on SQLite."""
+import pytest
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Conversation, Design, Diagram, DiagramPage, Message
+
+FLOW_DATA = {"nodes": [{"id": "n1", "label": "登录页面"}, {"id": "n2", "label": "Überblick ✓"}]}
+
+
+def make_design(db) -> Design:
+    conversation = Conversation(title="Checkout")
+    conversation.messages.append(Message(role="user", content="设计一个登录流程"))
+    design = Design(name="Checkout design")
+    design.diagrams.append(Diagram(
+        diagram_type="business_flow",
+        title="Flow",
+        drawio_xml="<mxfile/>",
+        flow_data=FLOW_DATA,
+        pages=[DiagramPage(page_index=0, page_id="p0", name="Page-1", drawio_xml="<mxfile/>")]
+    ))
+    conversation.designs.append(design)
+    db.add(conversation)
+    db.commit()
+    return design
+
+
+def count(db, model) -> int:
+    return db.scalar(select(func.count()).select_from(model))
+
+
+def test_enum_and_json_columns_round_trip(db):
+    diagram_id = make_design(db).diagrams[0].id
+    db.expunge_all()
+
+    diagram = db.get(Diagram, diagram_id)
+    assert diagram.diagram_type == "business_flow"
+    assert diagram.flow_data == FLOW_DATA
+    assert db.get(Conversation, diagram.design.conversation_id).status == "active"
+
+
+def test_json_is_stored_without_ascii_escapes(db):
+    diagram_id = make_design(db).diagrams[0].id
+
+    stored = db.execute(text("SELECT flow_data FROM diagrams WHERE id = :id"), {"id": diagram_id}).scalar()
+
+    assert "登录页面" in stored
+    assert "\\u" not in stored
+
+
+def test_enum_check_constraint_rejects_unknown_values(db):
+    design = make_design(db)
+
+    db.add(Diagram(design_id=design.id, diagram_type="sequence", title="Bad", drawio_xml="<mxfile/>"))
+    with pytest.raises(IntegrityError, match="CHECK constraint"):
+        db.commit()
+    db.rollback()
+
+    with pytest.raises(IntegrityError):
+        db.execute(text("UPDATE messages SET role = 'robot'"))
+    db.rollback()
+
+
+def test_deleting_conversation_cascades_in_the_database(db):
+    make_design(db)
+
+    # A bulk delete bypasses ORM cascades, so this relies on ON DELETE CASCADE
+    db.execute(delete(Conversation))
+    db.commit()
+
+    for model in (Message, Design, Diagram, DiagramPage):
+        assert count(db, model) == 0
+
+
+def test_deleting_diagram_through_orm_removes_pages(db):
+    design = make_design(db)
+    db.add(Diagram(design_id=design.id, diagram_type="prototype", title="Other", drawio_xml="<mxfile/>"))
+    db.commit()
+
+    db.delete(design.diagrams[0])
+    db.commit()
+
+    assert count(db, Diagram) == 1
+    assert count(db, DiagramPage) == 0